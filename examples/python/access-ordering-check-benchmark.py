@@ -0,0 +1,113 @@
+# Compares the cost of the dependency queries made by
+# loopy.check.check_variable_access_ordered on a synthetic kernel with 5000
+# instructions, using the transitive closure computed by
+# loopy.check.IndirectDependencyEdgeFinder and using a memoized depth-first
+# search per query (the approach it replaced).
+
+from time import time
+
+import loopy as lp
+
+
+NGROUPS = 50
+GROUP_SIZE = 100
+
+
+class MemoizedSearchEdgeFinder(object):
+    def __init__(self, kernel):
+        self.kernel = kernel
+        self.dep_edge_cache = {}
+
+    def __call__(self, depender_id, dependee_id):
+        cache_key = (depender_id, dependee_id)
+
+        try:
+            return self.dep_edge_cache[cache_key]
+        except KeyError:
+            pass
+
+        depender = self.kernel.id_to_insn[depender_id]
+
+        if dependee_id in depender.depends_on:
+            self.dep_edge_cache[cache_key] = True
+            return True
+
+        for dep in depender.depends_on:
+            if self(dep, dependee_id):
+                self.dep_edge_cache[cache_key] = True
+                return True
+
+        self.dep_edge_cache[cache_key] = False
+        return False
+
+
+def make_knl():
+    # Each group of instructions updates its own variable in a chain of
+    # dependencies.
+    insns = []
+    for igroup in range(NGROUPS):
+        for i in range(GROUP_SIZE):
+            if i:
+                insns.append("t{g} = t{g} + 1 {{id=g{g}_{i},dep=g{g}_{prev}}}"
+                        .format(g=igroup, i=i, prev=i-1))
+            else:
+                insns.append("t{g} = 0 {{id=g{g}_{i}}}".format(g=igroup, i=i))
+
+    return lp.make_kernel(
+            "{:}",
+            insns,
+            [lp.TemporaryVariable("t%d" % igroup, dtype=lp.auto)
+                for igroup in range(NGROUPS)],
+            target=lp.CTarget())
+
+
+def get_queries(knl):
+    # the pairs of instructions for which check_variable_access_ordered asks
+    # for a dependency relationship
+    wmap = knl.writer_map()
+    rmap = knl.reader_map()
+
+    queries = []
+    for name, writers in wmap.items():
+        for writer_id in writers:
+            for other_id in rmap.get(name, set()) | writers:
+                if writer_id != other_id:
+                    queries.append((writer_id, other_id))
+                    queries.append((other_id, writer_id))
+
+    return queries
+
+
+def time_finder(finder_class, knl, queries):
+    start = time()
+    finder = finder_class(knl)
+    results = [finder(a, b) for a, b in queries]
+    return time() - start, results
+
+
+def main():
+    knl = make_knl()
+    queries = get_queries(knl)
+    print("%d instructions, %d queries" % (len(knl.instructions), len(queries)))
+
+    from loopy.check import IndirectDependencyEdgeFinder
+    closure_time, closure_results = time_finder(
+            IndirectDependencyEdgeFinder, knl, queries)
+    search_time, search_results = time_finder(
+            MemoizedSearchEdgeFinder, knl, queries)
+
+    assert closure_results == search_results
+
+    print("memoized search:    %.3f s" % search_time)
+    print("transitive closure: %.3f s (%.1fx faster)"
+            % (closure_time, search_time/closure_time))
+
+    from loopy.check import check_variable_access_ordered
+    knl = lp.set_options(knl, enforce_variable_access_ordered=True)
+    start = time()
+    check_variable_access_ordered(knl)
+    print("check_variable_access_ordered: %.3f s" % (time() - start))
+
+
+if __name__ == "__main__":
+    main()
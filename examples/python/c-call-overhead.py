@@ -0,0 +1,49 @@
+# Measures the per-call Python overhead of a small kernel run through the
+# executable C target, with and without the c_exec_fast_call option.
+
+import loopy as lp
+import numpy as np
+from time import time
+
+from loopy.target.c import ExecutableCTarget
+
+
+NCALLS = 20000
+
+
+def make_knl(fast_call):
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = out[i] + a[i]",
+            [
+                lp.GlobalArg("out", np.float64, shape=lp.auto),
+                lp.GlobalArg("a", np.float64, shape=lp.auto),
+                "..."
+                ],
+            target=ExecutableCTarget())
+    return lp.set_options(knl, c_exec_fast_call=fast_call)
+
+
+def main():
+    a = np.ones(4)
+
+    for fast_call in [False, True]:
+        knl = make_knl(fast_call)
+        out = np.zeros(4)
+
+        # warm up: build the kernel and the invoker
+        knl(a=a, out=out)
+
+        start = time()
+        for i in range(NCALLS):
+            knl(a=a, out=out)
+        elapsed = time() - start
+
+        assert np.allclose(out, NCALLS + 1)
+
+        print("c_exec_fast_call=%s: %.2f us per call"
+                % (fast_call, elapsed/NCALLS*1e6))
+
+
+if __name__ == "__main__":
+    main()
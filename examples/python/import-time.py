@@ -0,0 +1,52 @@
+# Measures the time taken by "import loopy" in a fresh interpreter, and the
+# time until a first kernel is created. Exits with an error if the median
+# import time exceeds the budget given (in milliseconds) as the first
+# command line argument, so that it can be used to catch regressions.
+
+import sys
+from subprocess import check_output
+
+
+NRUNS = 10
+
+MEASURE_CODE = """
+from time import time
+start = time()
+import loopy as lp
+imported = time()
+lp.make_kernel("{[i]: 0<=i<n}", "out[i] = 2*a[i]")
+created = time()
+print(imported - start, created - start)
+"""
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    import_times = []
+    creation_times = []
+
+    for i in range(NRUNS):
+        import_time, creation_time = [
+                float(x) for x in check_output(
+                    [sys.executable, "-c", MEASURE_CODE]).decode().split()]
+        import_times.append(import_time)
+        creation_times.append(creation_time)
+
+    import_ms = median(import_times) * 1e3
+    print("import loopy:                 %.1f ms" % import_ms)
+    print("import loopy, create kernel:  %.1f ms"
+            % (median(creation_times) * 1e3))
+
+    if len(sys.argv) > 1:
+        budget_ms = float(sys.argv[1])
+        if import_ms > budget_ms:
+            print("import time exceeds budget of %.1f ms" % budget_ms)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
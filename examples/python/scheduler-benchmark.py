@@ -0,0 +1,60 @@
+# Measures the time taken by loopy.get_one_scheduled_kernel for kernels made
+# up of many instructions, up to around 10000, with Python's default
+# recursion limit. The instructions form groups updating a variable of their
+# own in a chain of dependencies, within a loop shared by all groups.
+#
+# The sizes to try may be given on the command line.
+
+import sys
+from time import time
+
+import loopy as lp
+
+
+GROUP_SIZE = 100
+
+
+def make_knl(ninsns):
+    insns = []
+    temporaries = []
+    for igroup in range(ninsns // GROUP_SIZE):
+        temporaries.append(lp.TemporaryVariable(
+            "t%d" % igroup, dtype=lp.auto))
+
+        for i in range(GROUP_SIZE):
+            if i:
+                insns.append(
+                        "t{g} = t{g} + i {{id=g{g}_{i},dep=g{g}_{prev}}}"
+                        .format(g=igroup, i=i, prev=i-1))
+            else:
+                insns.append("t{g} = 0 {{id=g{g}_{i}}}".format(g=igroup, i=i))
+
+    return lp.make_kernel(
+            "{[i]: 0<=i<n}",
+            insns,
+            temporaries + ["..."],
+            target=lp.CTarget())
+
+
+def main():
+    if len(sys.argv) > 1:
+        sizes = [int(arg) for arg in sys.argv[1:]]
+    else:
+        sizes = [1000, 2000, 5000, 10000]
+
+    print("recursion limit: %d" % sys.getrecursionlimit())
+
+    for ninsns in sizes:
+        with lp.CacheMode(False):
+            knl = lp.preprocess_kernel(make_knl(ninsns))
+
+            start = time()
+            sched_knl = lp.get_one_scheduled_kernel(knl)
+            elapsed = time() - start
+
+        print("%6d instructions: %8.2f s (%d schedule items)"
+                % (ninsns, elapsed, len(sched_knl.schedule)))
+
+
+if __name__ == "__main__":
+    main()
@@ -23,128 +23,108 @@ THE SOFTWARE.
 """
 
 
+import sys
+
 import six
 from six.moves import range, zip
 
-from loopy.symbolic import (
-        TaggedVariable, Reduction, LinearSubscript, TypeCast)
 from loopy.diagnostic import LoopyError, LoopyWarning
+from loopy.version import VERSION, MOST_RECENT_LANGUAGE_VERSION
 
 
 # {{{ imported user interface
 
-from loopy.library.function import (
-        default_function_mangler, single_arg_function_mangler)
-
-from loopy.kernel.instruction import (
-        memory_ordering, memory_scope, VarAtomicity, AtomicInit, AtomicUpdate,
-        InstructionBase,
-        MultiAssignmentBase, Assignment, ExpressionInstruction,
-        CallInstruction, CInstruction, NoOpInstruction, BarrierInstruction)
-from loopy.kernel.data import (
-        auto,
-        KernelArgument,
-        ValueArg, GlobalArg, ConstantArg, ImageArg,
-        temp_var_scope, TemporaryVariable,
-        SubstitutionRule,
-        CallMangleInfo)
-
-from loopy.kernel import LoopKernel, kernel_state
-from loopy.kernel.tools import (
-        get_dot_dependency_graph,
-        show_dependency_graph,
-        add_dtypes,
-        add_and_infer_dtypes,
-        get_global_barrier_order,
-        find_most_recent_global_barrier,
-        get_subkernels,
-        get_subkernel_to_insn_id_map)
-from loopy.types import to_loopy_type
-from loopy.kernel.creation import make_kernel, UniqueName
-from loopy.library.reduction import register_reduction_parser
-
-# {{{ import transforms
-
-from loopy.version import VERSION, MOST_RECENT_LANGUAGE_VERSION
-
-from loopy.transform.iname import (
-        set_loop_priority, prioritize_loops,
-        split_iname, chunk_iname, join_inames, tag_inames, duplicate_inames,
-        rename_iname, remove_unused_inames,
-        split_reduction_inward, split_reduction_outward,
-        affine_map_inames, find_unused_axis_tag,
-        make_reduction_inames_unique,
-        has_schedulable_iname_nesting, get_iname_duplication_options,
-        add_inames_to_insn)
-
-from loopy.transform.instruction import (
-        find_instructions, map_instructions,
-        set_instruction_priority, add_dependency,
-        remove_instructions,
-        replace_instruction_ids,
-        tag_instructions,
-        add_nosync)
-
-from loopy.transform.data import (
-        add_prefetch, change_arg_to_image,
-        tag_array_axes, tag_data_axes,
-        set_array_axis_names, set_array_dim_names,
-        remove_unused_arguments,
-        alias_temporaries, set_argument_order,
-        rename_argument,
-        set_temporary_scope)
-
-from loopy.transform.subst import (extract_subst,
-        assignment_to_subst, expand_subst, find_rules_matching,
-        find_one_rule_matching)
-
-from loopy.transform.precompute import precompute
-from loopy.transform.buffer import buffer_array
-from loopy.transform.fusion import fuse_kernels
-
-from loopy.transform.arithmetic import (
-        fold_constants,
-        collect_common_factors_on_increment)
-
-from loopy.transform.padding import (
-        split_array_axis, split_array_dim, split_arg_axis,
-        find_padding_multiple,
-        add_padding)
-
-from loopy.transform.privatize import privatize_temporaries_with_inames
-from loopy.transform.batch import to_batched
-from loopy.transform.parameter import assume, fix_parameters
-from loopy.transform.save import save_and_reload_temporaries
-from loopy.transform.add_barrier import add_barrier
-# }}}
+# The names below are imported from their modules on first access,
+# see __getattr__.
+
+_LAZY_EXPORTS = [
+        ("loopy.symbolic", ["TaggedVariable", "Reduction", "LinearSubscript",
+            "TypeCast"]),
+        ("loopy.library.function", ["default_function_mangler",
+            "single_arg_function_mangler"]),
+        ("loopy.kernel.instruction", ["memory_ordering", "memory_scope",
+            "VarAtomicity", "AtomicInit", "AtomicUpdate", "InstructionBase",
+            "MultiAssignmentBase", "Assignment", "ExpressionInstruction",
+            "CallInstruction", "CInstruction", "NoOpInstruction",
+            "BarrierInstruction"]),
+        ("loopy.kernel.data", ["auto", "KernelArgument", "ValueArg",
+            "GlobalArg", "ConstantArg", "ImageArg", "temp_var_scope",
+            "TemporaryVariable", "SubstitutionRule", "CallMangleInfo"]),
+        ("loopy.kernel", ["LoopKernel", "kernel_state"]),
+        ("loopy.kernel.tools", ["get_dot_dependency_graph",
+            "show_dependency_graph", "add_dtypes", "add_and_infer_dtypes",
+            "get_global_barrier_order", "find_most_recent_global_barrier",
+            "get_subkernels", "get_subkernel_to_insn_id_map"]),
+        ("loopy.types", ["to_loopy_type"]),
+        ("loopy.kernel.creation", ["make_kernel", "UniqueName"]),
+        ("loopy.library.reduction", ["register_reduction_parser"]),
+        ("loopy.transform.iname", ["set_loop_priority", "prioritize_loops",
+            "split_iname", "chunk_iname", "join_inames", "tag_inames",
+            "duplicate_inames", "rename_iname", "remove_unused_inames",
+            "split_reduction_inward", "split_reduction_outward",
+            "affine_map_inames", "find_unused_axis_tag",
+            "make_reduction_inames_unique", "has_schedulable_iname_nesting",
+            "get_iname_duplication_options", "add_inames_to_insn"]),
+        ("loopy.transform.instruction", ["find_instructions",
+            "map_instructions", "set_instruction_priority", "add_dependency",
+            "remove_instructions", "replace_instruction_ids",
+            "tag_instructions", "add_nosync"]),
+        ("loopy.transform.data", ["add_prefetch", "change_arg_to_image",
+            "tag_array_axes", "tag_data_axes", "set_array_axis_names",
+            "set_array_dim_names", "remove_unused_arguments",
+            "alias_temporaries", "set_argument_order", "rename_argument",
+            "set_temporary_scope"]),
+        ("loopy.transform.subst", ["extract_subst", "assignment_to_subst",
+            "expand_subst", "find_rules_matching", "find_one_rule_matching"]),
+        ("loopy.transform.precompute", ["precompute"]),
+        ("loopy.transform.buffer", ["buffer_array"]),
+        ("loopy.transform.fusion", ["fuse_kernels"]),
+        ("loopy.transform.arithmetic", ["fold_constants",
+            "collect_common_factors_on_increment"]),
+        ("loopy.transform.padding", ["split_array_axis", "split_array_dim",
+            "split_arg_axis", "find_padding_multiple", "add_padding"]),
+        ("loopy.transform.privatize", ["privatize_temporaries_with_inames"]),
+        ("loopy.transform.batch", ["to_batched"]),
+        ("loopy.transform.parameter", ["assume", "fix_parameters"]),
+        ("loopy.transform.save", ["save_and_reload_temporaries"]),
+        ("loopy.transform.add_barrier", ["add_barrier"]),
+        ("loopy.type_inference", ["infer_unknown_types"]),
+        ("loopy.preprocess", ["preprocess_kernel", "realize_reduction"]),
+        ("loopy.schedule", ["generate_loop_schedules",
+            "get_one_scheduled_kernel", "profile_scheduling"]),
+        ("loopy.schedule.ranking", ["get_best_scheduled_kernels"]),
+        ("loopy.statistics", ["ToCountMap", "CountGranularity",
+            "stringify_stats_mapping", "Op", "MemAccess", "get_op_poly",
+            "get_op_map", "get_lmem_access_poly", "get_DRAM_access_poly",
+            "get_gmem_access_poly", "get_mem_access_map",
+            "get_synchronization_poly", "get_synchronization_map",
+            "gather_access_footprints", "gather_access_footprint_bytes"]),
+        ("loopy.codegen", ["PreambleInfo", "generate_code", "generate_code_v2",
+            "generate_body"]),
+        ("loopy.codegen.result", ["GeneratedProgram", "CodeGenerationResult"]),
+        ("loopy.compiled", ["CompiledKernel"]),
+        ("loopy.options", ["Options"]),
+        ("loopy.caching", ["set_memory_cache_params", "get_cache_stats",
+            "reset_cache_stats", "CacheStats", "get_persistent_store",
+            "set_persistent_store"]),
+        ("loopy.auto_test", ["auto_test_vs_ref"]),
+        ("loopy.tuning", ["auto_tune", "AutoTuneResult"]),
+        ("loopy.frontend.fortran", ["c_preprocess",
+            "parse_transformed_fortran", "parse_fortran"]),
+        ("loopy.target", ["TargetBase", "ASTBuilderBase"]),
+        ("loopy.target.c", ["CTarget", "ExecutableCTarget", "generate_header"]),
+        ("loopy.target.cuda", ["CudaTarget"]),
+        ("loopy.target.opencl", ["OpenCLTarget"]),
+        ("loopy.target.pyopencl", ["PyOpenCLTarget"]),
+        ("loopy.target.ispc", ["ISPCTarget", "ExecutableISPCTarget"]),
+        ("loopy.target.openmp", ["OpenMPCTarget", "ExecutableOpenMPCTarget"]),
+        ("loopy.target.numba", ["NumbaTarget", "NumbaCudaTarget"]),
+        ]
 
-from loopy.type_inference import infer_unknown_types
-from loopy.preprocess import preprocess_kernel, realize_reduction
-from loopy.schedule import generate_loop_schedules, get_one_scheduled_kernel
-from loopy.statistics import (ToCountMap, CountGranularity, stringify_stats_mapping,
-        Op, MemAccess, get_op_poly, get_op_map, get_lmem_access_poly,
-        get_DRAM_access_poly, get_gmem_access_poly, get_mem_access_map,
-        get_synchronization_poly, get_synchronization_map,
-        gather_access_footprints, gather_access_footprint_bytes)
-from loopy.codegen import (
-        PreambleInfo,
-        generate_code, generate_code_v2, generate_body)
-from loopy.codegen.result import (
-        GeneratedProgram,
-        CodeGenerationResult)
-from loopy.compiled import CompiledKernel
-from loopy.options import Options
-from loopy.auto_test import auto_test_vs_ref
-from loopy.frontend.fortran import (c_preprocess, parse_transformed_fortran,
-        parse_fortran)
-
-from loopy.target import TargetBase, ASTBuilderBase
-from loopy.target.c import CTarget, ExecutableCTarget, generate_header
-from loopy.target.cuda import CudaTarget
-from loopy.target.opencl import OpenCLTarget
-from loopy.target.pyopencl import PyOpenCLTarget
-from loopy.target.ispc import ISPCTarget
-from loopy.target.numba import NumbaTarget, NumbaCudaTarget
+_LAZY_NAME_TO_MODULE = dict(
+        (name, module_name)
+        for module_name, names in _LAZY_EXPORTS
+        for name in names)
 
 
 __all__ = [
@@ -239,6 +219,7 @@ __all__ = [
 
         "preprocess_kernel", "realize_reduction",
         "generate_loop_schedules", "get_one_scheduled_kernel",
+        "get_best_scheduled_kernels", "profile_scheduling",
         "GeneratedProgram", "CodeGenerationResult",
         "PreambleInfo",
         "generate_code", "generate_code_v2", "generate_body",
@@ -252,9 +233,13 @@ __all__ = [
         "CompiledKernel",
 
         "auto_test_vs_ref",
+        "auto_tune", "AutoTuneResult",
 
         "Options",
 
+        "set_memory_cache_params", "get_cache_stats", "reset_cache_stats",
+        "CacheStats", "get_persistent_store", "set_persistent_store",
+
         "make_kernel",
         "c_preprocess", "parse_transformed_fortran", "parse_fortran",
 
@@ -263,7 +248,8 @@ __all__ = [
         "TargetBase",
         "CTarget", "ExecutableCTarget", "generate_header",
         "CudaTarget", "OpenCLTarget",
-        "PyOpenCLTarget", "ISPCTarget",
+        "PyOpenCLTarget", "ISPCTarget", "ExecutableISPCTarget",
+        "OpenMPCTarget", "ExecutableOpenMPCTarget",
         "NumbaTarget", "NumbaCudaTarget",
         "ASTBuilderBase",
 
@@ -280,6 +266,41 @@ __all__ = [
         # }}}
         ]
 
+
+def __getattr__(name):
+    try:
+        module_name = _LAZY_NAME_TO_MODULE[name]
+    except KeyError:
+        module_name = None
+
+    from importlib import import_module
+
+    if module_name is not None:
+        value = getattr(import_module(module_name), name)
+    elif not name.startswith("__"):
+        # a submodule not imported yet, as in "loopy.caching"
+        from importlib.util import find_spec
+        if find_spec("loopy." + name) is None:
+            raise AttributeError("module 'loopy' has no attribute '%s'" % name)
+
+        value = import_module("loopy." + name)
+    else:
+        raise AttributeError("module 'loopy' has no attribute '%s'" % name)
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAME_TO_MODULE))
+
+
+if sys.version_info < (3, 7):
+    # no module-level __getattr__ (PEP 562), import everything now
+    for _name in _LAZY_NAME_TO_MODULE:
+        __getattr__(_name)
+    del _name
+
 # }}}
 
 
@@ -424,6 +445,10 @@ def make_copy_kernel(new_dim_tags, old_dim_tags=None):
         old_dim_tags = parse_array_dim_tags(
                 old_dim_tags, n_axes=None)
 
+    from loopy.kernel.creation import make_kernel
+    from loopy.transform.data import tag_array_axes
+    from loopy.transform.iname import tag_inames
+
     indices = ["i%d" % i for i in range(rank)]
     shape = ["n%d" % i for i in range(rank)]
     commad_indices = ", ".join(indices)
@@ -464,20 +489,24 @@ def set_default_target(target):
     _DEFAULT_TARGET = target
 
 
-def _set_up_default_target():
-    try:
-        import pyopencl  # noqa
-    except ImportError:
-        from loopy.target.opencl import OpenCLTarget
-        target = OpenCLTarget()
-    else:
-        from loopy.target.pyopencl import PyOpenCLTarget
-        target = PyOpenCLTarget()
-
-    set_default_target(target)
-
-
-_set_up_default_target()
+def _get_default_target():
+    """Return the target of kernels created without specifying one, which is
+    determined on first use (rather than on import, to avoid importing
+    :mod:`pyopencl` just for this).
+    """
+    if _DEFAULT_TARGET is None:
+        try:
+            import pyopencl  # noqa
+        except ImportError:
+            from loopy.target.opencl import OpenCLTarget
+            target = OpenCLTarget()
+        else:
+            from loopy.target.pyopencl import PyOpenCLTarget
+            target = PyOpenCLTarget()
+
+        set_default_target(target)
+
+    return _DEFAULT_TARGET
 
 # }}}
 
@@ -34,6 +34,10 @@ from loopy.diagnostic import LoopyError, AutomaticTestFailure
 
 AUTO_TEST_SKIP_RUN = False
 
+#: Timing runs are repeated with four times as many rounds until they take at
+#: least this many seconds.
+MIN_TIMING_RUN_DURATION = 0.3
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -192,20 +196,35 @@ def make_ref_args(kernel, impl_arg_info, queue, parameters):
 
 # {{{ "full-scale" arguments
 
-def make_args(kernel, impl_arg_info, queue, ref_arg_data, parameters):
-    import pyopencl as cl
-    import pyopencl.array as cl_array
-
+def make_args(kernel, impl_arg_info, queue, ref_arg_data, parameters,
+        rng=None):
+    """Create the arguments for running *kernel* on the problem size given by
+    *parameters*.
+
+    :arg queue: a :class:`pyopencl.CommandQueue`, or *None* to create
+        :mod:`numpy` arrays.
+    :arg ref_arg_data: as returned by :func:`make_ref_args`, to copy array
+        contents from the reference arguments, or *None* to fill
+        floating point arrays with random values from the
+        :class:`numpy.random.RandomState` *rng* and other arrays, which may
+        be used as indices, with zeros.
+    """
     from loopy.kernel.data import ValueArg, GlobalArg, ImageArg,\
             TemporaryVariable, ConstantArg
 
     from pymbolic import evaluate
 
+    if ref_arg_data is None:
+        ref_arg_data = [None] * len(impl_arg_info)
+
     args = {}
     for arg, arg_desc in zip(impl_arg_info, ref_arg_data):
         kernel_arg = kernel.impl_arg_to_arg.get(arg.name)
 
         if arg.arg_class is ValueArg:
+            if arg.offset_for_name:
+                continue
+
             arg_value = parameters[arg.name]
 
             try:
@@ -223,15 +242,24 @@ def make_args(kernel, impl_arg_info, queue, ref_arg_data, parameters):
                 raise NotImplementedError("write-mode images not supported in "
                         "automatic testing")
 
+            if arg_desc is None:
+                raise LoopyError("image argument '%s' requires reference "
+                        "arguments" % arg.name)
+
             shape = evaluate_shape(arg.unvec_shape, parameters)
             assert shape == arg_desc.ref_shape
 
             # must be contiguous
+            import pyopencl as cl
             args[arg.name] = cl.image_from_array(
                     queue.context, arg_desc.ref_pre_run_array.get())
 
         elif arg.arg_class is GlobalArg or\
                 arg.arg_class is ConstantArg:
+            if arg.shape is None or any(saxis is None for saxis in arg.shape):
+                raise LoopyError("array '%s' needs known shape to use automatic "
+                        "testing" % arg.name)
+
             shape = evaluate(arg.unvec_shape, parameters)
             strides = evaluate(arg.unvec_strides, parameters)
 
@@ -242,44 +270,56 @@ def make_args(kernel, impl_arg_info, queue, ref_arg_data, parameters):
             alloc_size = sum(astrd*(alen-1) if astrd != 0 else alen-1
                     for alen, astrd in zip(shape, strides)) + 1
 
-            # use contiguous array to transfer to host
-            host_ref_contig_array = arg_desc.ref_pre_run_storage_array.get()
+            if arg_desc is None:
+                host_storage_array = np.zeros(alloc_size, dtype.numpy_dtype)
+                if dtype.numpy_dtype.kind in "fc":
+                    host_storage_array[...] = rng.rand(alloc_size)
+
+            else:
+                # use contiguous array to transfer to host
+                host_ref_contig_array = arg_desc.ref_pre_run_storage_array.get()
 
-            # use device shape/strides
-            from pyopencl.compyte.array import as_strided
-            host_ref_array = as_strided(host_ref_contig_array,
-                    arg_desc.ref_shape, arg_desc.ref_numpy_strides)
+                # use device shape/strides
+                from pyopencl.compyte.array import as_strided
+                host_ref_array = as_strided(host_ref_contig_array,
+                        arg_desc.ref_shape, arg_desc.ref_numpy_strides)
 
-            # flatten the thing
-            host_ref_flat_array = host_ref_array.flatten()
+                # flatten the thing
+                host_ref_flat_array = host_ref_array.flatten()
 
-            # create host array with test shape (but not strides)
-            host_contig_array = np.empty(shape, dtype=dtype)
+                # create host array with test shape (but not strides)
+                host_contig_array = np.empty(shape, dtype=dtype)
 
-            common_len = min(
-                    len(host_ref_flat_array),
-                    len(host_contig_array.ravel()))
-            host_contig_array.ravel()[:common_len] = \
-                    host_ref_flat_array[:common_len]
+                common_len = min(
+                        len(host_ref_flat_array),
+                        len(host_contig_array.ravel()))
+                host_contig_array.ravel()[:common_len] = \
+                        host_ref_flat_array[:common_len]
 
-            # create host array with test shape and storage layout
-            host_storage_array = np.empty(alloc_size, dtype)
-            host_array = as_strided(
-                    host_storage_array, shape, numpy_strides)
-            host_array[...] = host_contig_array
+                # create host array with test shape and storage layout
+                host_storage_array = np.empty(alloc_size, dtype)
+                host_array = as_strided(
+                        host_storage_array, shape, numpy_strides)
+                host_array[...] = host_contig_array
 
-            host_contig_array = arg_desc.ref_storage_array.get()
-            storage_array = cl_array.to_device(queue, host_storage_array)
-            ary = cl_array.as_strided(storage_array, shape, numpy_strides)
+            if queue is None:
+                args[arg.name] = np.lib.stride_tricks.as_strided(
+                        host_storage_array, shape, numpy_strides)
 
-            args[arg.name] = ary
+            else:
+                import pyopencl.array as cl_array
+                storage_array = cl_array.to_device(queue, host_storage_array)
+                ary = cl_array.as_strided(storage_array, shape, numpy_strides)
 
-            arg_desc.test_storage_array = storage_array
-            arg_desc.test_array = ary
-            arg_desc.test_shape = shape
-            arg_desc.test_strides = strides
-            arg_desc.test_numpy_strides = numpy_strides
-            arg_desc.test_alloc_size = alloc_size
+                args[arg.name] = ary
+
+                if arg_desc is not None:
+                    arg_desc.test_storage_array = storage_array
+                    arg_desc.test_array = ary
+                    arg_desc.test_shape = shape
+                    arg_desc.test_strides = strides
+                    arg_desc.test_numpy_strides = numpy_strides
+                    arg_desc.test_alloc_size = alloc_size
 
         elif arg.arg_class is TemporaryVariable:
             # global temporary, handled by invocation logic
@@ -295,6 +335,43 @@ def make_args(kernel, impl_arg_info, queue, ref_arg_data, parameters):
 # }}}
 
 
+# {{{ wall-clock timing
+
+def time_rounds(run_rounds, warmup_rounds=2, run_warmup=True):
+    """Time a kernel with the warmup and timing-round policy of
+    :func:`auto_test_vs_ref`: after *warmup_rounds* untimed rounds, time
+    at least as many rounds, quadrupling their number until they take
+    :data:`MIN_TIMING_RUN_DURATION` seconds.
+
+    :arg run_rounds: a callable taking a number of rounds, which runs the
+        kernel that many times and waits for completion.
+    :arg run_warmup: whether to run the warmup rounds. Pass *False* if the
+        caller has run them.
+    :returns: a tuple ``(elapsed_wall, timing_rounds)`` of the wall time per
+        round in seconds and the number of rounds timed.
+    """
+    from time import time
+
+    if run_warmup:
+        run_rounds(warmup_rounds)
+
+    timing_rounds = max(warmup_rounds, 1)
+
+    while True:
+        start_time = time()
+        run_rounds(timing_rounds)
+        elapsed_wall = (time() - start_time) / timing_rounds
+
+        if elapsed_wall * timing_rounds < MIN_TIMING_RUN_DURATION:
+            timing_rounds *= 4
+        else:
+            break
+
+    return elapsed_wall, timing_rounds
+
+# }}}
+
+
 # {{{ default array comparison
 
 def _default_check_result(result, ref_result):
@@ -594,22 +671,20 @@ def auto_test_vs_ref(
 
                     need_check = False
 
-        events = []
         queue.finish()
 
         logger.info("%s: warmup done" % (knl.name))
 
         logger.info("%s: timing run" % (knl.name))
 
-        timing_rounds = warmup_rounds
-
-        while True:
-            from time import time
-            start_time = time()
+        # the events of the last timed rounds
+        timing_events = {}
 
+        def run_rounds(nrounds):
+            events = []
             evt_start = cl.enqueue_marker(queue)
 
-            for i in range(timing_rounds):
+            for i in range(nrounds):
                 if not AUTO_TEST_SKIP_RUN:
                     evt, _ = compiled(queue, **args)
                     events.append(evt)
@@ -619,29 +694,31 @@ def auto_test_vs_ref(
             evt_end = cl.enqueue_marker(queue)
 
             queue.finish()
-            stop_time = time()
 
-            for evt in events:
-                evt.wait()
-            evt_start.wait()
-            evt_end.wait()
+            timing_events.update(
+                    events=events, evt_start=evt_start, evt_end=evt_end)
 
-            elapsed_event = (1e-9*events[-1].profile.END
-                    - 1e-9*events[0].profile.START) \
-                    / timing_rounds
-            try:
-                elapsed_event_marker = ((1e-9*evt_end.profile.START
-                            - 1e-9*evt_start.profile.START)
-                        / timing_rounds)
-            except cl.RuntimeError:
-                elapsed_event_marker = None
+        elapsed_wall, timing_rounds = time_rounds(
+                run_rounds, warmup_rounds, run_warmup=False)
 
-            elapsed_wall = (stop_time-start_time)/timing_rounds
+        events = timing_events["events"]
+        evt_start = timing_events["evt_start"]
+        evt_end = timing_events["evt_end"]
 
-            if elapsed_wall * timing_rounds < 0.3:
-                timing_rounds *= 4
-            else:
-                break
+        for evt in events:
+            evt.wait()
+        evt_start.wait()
+        evt_end.wait()
+
+        elapsed_event = (1e-9*events[-1].profile.END
+                - 1e-9*events[0].profile.START) \
+                / timing_rounds
+        try:
+            elapsed_event_marker = ((1e-9*evt_end.profile.START
+                        - 1e-9*evt_start.profile.START)
+                    / timing_rounds)
+        except cl.RuntimeError:
+            elapsed_event_marker = None
 
         logger.info("%s: timing run done" % (knl.name))
 
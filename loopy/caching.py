@@ -0,0 +1,791 @@
+from __future__ import division, absolute_import
+
+__copyright__ = "Copyright (C) 2018 Andreas Kloeckner"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import six
+from six.moves import cPickle as pickle
+from pytools import ImmutableRecord
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+__doc__ = """
+Loopy's caches (for preprocessing, scheduling, code generation and
+kernel invocation) are backed by a persistent store on disk, shared among
+all caches, in which results are kept in pickled form. In front of this sits
+an in-memory tier, also shared among all caches, that holds a bounded number
+of recently used results, avoiding repeated unpickling. Entries in both tiers
+are keyed by the persistent hash of the cache key. Along with each result,
+the persistent store holds the cache key itself, which is compared with the
+key being looked up, so that colliding hashes do not yield wrong results.
+
+The size of the in-memory tier defaults to the value of the environment
+variable :envvar:`LOOPY_MEMORY_CACHE_SIZE`, or 512 entries if that is not set.
+Setting it to zero disables the in-memory tier.
+
+The persistent store is configured by the following environment variables:
+
+* :envvar:`LOOPY_CACHE_BACKEND`: ``directory`` (the default) to store each
+  entry in a file of its own (see :class:`DirectoryStore`), or ``sqlite``
+  to store all entries in a single file (see :class:`SQLiteStore`).
+* :envvar:`LOOPY_CACHE_DIR`: the directory holding the store, in a
+  ``store`` subdirectory, or a ``loopy-cache.sqlite`` file. Defaults to a
+  ``loopy`` directory in the user's cache directory. Its other
+  subdirectories hold the build products of some targets, which are not
+  part of the store.
+* :envvar:`LOOPY_CACHE_MAX_SIZE`: the maximum total size of the stored
+  entries, in bytes, optionally followed by a suffix of ``K``, ``M`` or
+  ``G``. When it is exceeded, the least recently used entries are evicted.
+  Unlimited by default.
+
+The store may be inspected and pruned from the command line using
+``loopy cache stats|prune|clear``.
+
+Results of operations on ISL sets are not stored persistently, but are kept
+in a separate in-memory cache shared by all kernels, see
+:class:`loopy.isl_helpers.ISLOperationCache`.
+
+.. autofunction:: set_memory_cache_params
+
+.. autofunction:: get_persistent_store
+
+.. autofunction:: set_persistent_store
+
+.. autofunction:: get_cache_dir
+
+.. autofunction:: get_cache_stats
+
+.. autofunction:: reset_cache_stats
+
+.. autoclass:: CacheStats
+
+.. autoclass:: TieredCache
+
+.. autoclass:: PersistentStoreBase
+
+.. autoclass:: DirectoryStore
+
+.. autoclass:: SQLiteStore
+"""
+
+
+EVICTION_POLICIES = ("lru", "fifo")
+
+
+# {{{ statistics
+
+class CacheStats(ImmutableRecord):
+    """A snapshot of the usage counters of a :class:`TieredCache`.
+
+    .. attribute:: memory_hits
+
+        Number of lookups served from the in-memory tier.
+
+    .. attribute:: persistent_hits
+
+        Number of lookups served from the on-disk store.
+
+    .. attribute:: misses
+
+        Number of lookups that found no entry.
+
+    .. attribute:: evictions
+
+        Number of entries of this cache removed from the in-memory tier
+        to make room for others.
+
+    .. attribute:: hits
+    """
+
+    def __init__(self, memory_hits=0, persistent_hits=0, misses=0, evictions=0):
+        ImmutableRecord.__init__(self,
+                memory_hits=memory_hits,
+                persistent_hits=persistent_hits,
+                misses=misses,
+                evictions=evictions)
+
+    @property
+    def hits(self):
+        return self.memory_hits + self.persistent_hits
+
+    def __str__(self):
+        return ("hits: %d (memory: %d, persistent: %d), misses: %d, "
+                "evictions: %d" % (
+                    self.hits, self.memory_hits, self.persistent_hits,
+                    self.misses, self.evictions))
+
+# }}}
+
+
+# {{{ in-memory tier
+
+class _MemoryTier(object):
+    """A size-bounded mapping from ``(cache_name, hexdigest)`` to cached values,
+    shared among all instances of :class:`TieredCache`.
+    """
+
+    def __init__(self, max_entries, eviction_policy):
+        self.entries = OrderedDict()
+        self.set_params(max_entries, eviction_policy)
+
+    def set_params(self, max_entries, eviction_policy):
+        if max_entries < 0:
+            raise ValueError("max_entries must be non-negative")
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError("unknown eviction policy '%s' (must be one of %s)"
+                    % (eviction_policy, ", ".join(EVICTION_POLICIES)))
+
+        self.max_entries = max_entries
+        self.eviction_policy = eviction_policy
+        self._evict()
+
+    def __getitem__(self, key):
+        value = self.entries[key]
+        if self.eviction_policy == "lru":
+            # move to the most-recently-used end
+            del self.entries[key]
+            self.entries[key] = value
+
+        return value
+
+    def __setitem__(self, key, value):
+        if not self.max_entries:
+            return
+
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        self._evict()
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            (cache_name, _), _ = self.entries.popitem(last=False)
+
+            cache = _CACHES.get(cache_name)
+            if cache is not None:
+                cache._evictions += 1
+
+    def discard_cache(self, cache_name):
+        for key in [key for key in self.entries if key[0] == cache_name]:
+            del self.entries[key]
+
+
+_MEMORY_TIER = _MemoryTier(
+        max_entries=int(os.environ.get("LOOPY_MEMORY_CACHE_SIZE", 512)),
+        eviction_policy="lru")
+
+
+def set_memory_cache_params(max_entries=None, eviction_policy=None):
+    """Configure the in-memory tier shared by all :mod:`loopy` caches.
+
+    :arg max_entries: the maximum number of results kept in memory
+        across all caches. Zero disables the in-memory tier. If the tier
+        currently holds more entries, the excess is evicted immediately.
+    :arg eviction_policy: ``"lru"`` to evict the least recently used entry
+        first, or ``"fifo"`` to evict the least recently inserted entry
+        first.
+
+    Arguments that are not given are left unchanged.
+    """
+    if max_entries is None:
+        max_entries = _MEMORY_TIER.max_entries
+    if eviction_policy is None:
+        eviction_policy = _MEMORY_TIER.eviction_policy
+
+    _MEMORY_TIER.set_params(max_entries, eviction_policy)
+
+# }}}
+
+
+# {{{ persistent stores
+
+def parse_cache_size(size):
+    """Parse a size in bytes, optionally followed by a suffix of ``K``, ``M``
+    or ``G``, into an :class:`int`. Returns *None* for an empty string or
+    zero, denoting an unlimited size.
+    """
+    size = size.strip().upper()
+    if not size:
+        return None
+
+    factor = 1
+    for suffix, suffix_factor in [("K", 2**10), ("M", 2**20), ("G", 2**30)]:
+        if size.endswith(suffix):
+            size = size[:-1]
+            factor = suffix_factor
+            break
+
+    try:
+        result = int(float(size) * factor)
+    except ValueError:
+        raise ValueError("invalid cache size: '%s'" % size)
+
+    return result or None
+
+
+# When a store exceeds its maximum size while storing an entry, it is pruned
+# down to this fraction of the maximum size, to avoid pruning on every store.
+_AUTO_PRUNE_FRACTION = 0.9
+
+
+class PersistentStoreBase(object):
+    """An on-disk mapping from ``(namespace, key)`` pairs of strings to
+    :class:`bytes`, used as the persistent tier of all :class:`TieredCache`
+    instances. Each cache uses its own namespace. Entries are never
+    overwritten.
+
+    .. attribute:: max_size
+
+        The maximum total size in bytes of the stored entries, or *None*
+        for no limit. When exceeded, least recently used entries are evicted.
+
+    .. automethod:: fetch
+    .. automethod:: store_if_not_present
+    .. automethod:: clear
+    .. automethod:: prune
+    .. automethod:: get_usage
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+
+    def fetch(self, namespace, key):
+        """
+        :returns: the :class:`bytes` stored under *key* in *namespace*.
+        :raises KeyError: if there is no such entry.
+        """
+        raise NotImplementedError
+
+    def store_if_not_present(self, namespace, key, data):
+        raise NotImplementedError
+
+    def clear(self, namespace=None):
+        """Remove all entries in *namespace*, or in all namespaces if
+        *namespace* is *None*.
+        """
+        raise NotImplementedError
+
+    def prune(self, max_size=None):
+        """Evict least recently used entries until the total size of the
+        remaining entries is at most *max_size*, which defaults to
+        :attr:`max_size`.
+
+        :returns: the number of evicted entries.
+        """
+        raise NotImplementedError
+
+    def get_usage(self):
+        """
+        :returns: a :class:`dict` mapping each namespace to a tuple
+            ``(number_of_entries, total_size_in_bytes)``.
+        """
+        raise NotImplementedError
+
+
+class DirectoryStore(PersistentStoreBase):
+    """A :class:`PersistentStoreBase` keeping each entry in a file of its own
+    below the directory *path*. Recency of use is tracked by the modification
+    time of the files.
+    """
+
+    def __init__(self, path, max_size=None):
+        super(DirectoryStore, self).__init__(max_size)
+        self.path = path
+
+        # Estimated total size of the store, updated when entries are stored
+        # by this process. Determined lazily.
+        self._size_estimate = None
+
+    def _entry_path(self, namespace, key):
+        return os.path.join(self.path, namespace, key[:2], key[2:])
+
+    def _gen_entries(self):
+        """Generate tuples ``(namespace, filename, size, mtime)``."""
+        if not os.path.isdir(self.path):
+            return
+
+        for namespace in os.listdir(self.path):
+            namespace_dir = os.path.join(self.path, namespace)
+            if not os.path.isdir(namespace_dir):
+                continue
+
+            for dirpath, _, filenames in os.walk(namespace_dir):
+                for filename in filenames:
+                    if filename.startswith("."):
+                        # incomplete write
+                        continue
+
+                    entry_path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(entry_path)
+                    except OSError:
+                        # removed concurrently
+                        continue
+
+                    yield namespace, entry_path, st.st_size, st.st_mtime
+
+    def fetch(self, namespace, key):
+        entry_path = self._entry_path(namespace, key)
+        try:
+            with open(entry_path, "rb") as inf:
+                data = inf.read()
+        except (IOError, OSError):
+            raise KeyError(key)
+
+        try:
+            # mark as recently used
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+
+        return data
+
+    def store_if_not_present(self, namespace, key, data):
+        entry_path = self._entry_path(namespace, key)
+        if os.path.exists(entry_path):
+            return
+
+        entry_dir = os.path.dirname(entry_path)
+        try:
+            os.makedirs(entry_dir)
+        except OSError:
+            if not os.path.isdir(entry_dir):
+                raise
+
+        # Write to a temporary file and rename it into place, so that
+        # concurrent readers never see partial entries.
+        import tempfile
+        fd, temp_path = tempfile.mkstemp(dir=entry_dir, prefix=".")
+        try:
+            with os.fdopen(fd, "wb") as outf:
+                outf.write(data)
+            os.rename(temp_path, entry_path)
+        except OSError:
+            # On Windows, renaming onto an entry stored concurrently fails.
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            if not os.path.exists(entry_path):
+                raise
+
+        if self.max_size is not None:
+            if self._size_estimate is None:
+                self._size_estimate = sum(
+                        size for _, _, size, _ in self._gen_entries())
+            else:
+                self._size_estimate += len(data)
+
+            if self._size_estimate > self.max_size:
+                self.prune(int(_AUTO_PRUNE_FRACTION * self.max_size))
+
+    def clear(self, namespace=None):
+        import shutil
+        if namespace is None:
+            if os.path.isdir(self.path):
+                for namespace in os.listdir(self.path):
+                    shutil.rmtree(
+                            os.path.join(self.path, namespace),
+                            ignore_errors=True)
+        else:
+            shutil.rmtree(
+                    os.path.join(self.path, namespace),
+                    ignore_errors=True)
+
+        self._size_estimate = None
+
+    def prune(self, max_size=None):
+        if max_size is None:
+            max_size = self.max_size
+        if max_size is None:
+            return 0
+
+        entries = sorted(self._gen_entries(), key=lambda entry: entry[3])
+        total_size = sum(size for _, _, size, _ in entries)
+
+        nevicted = 0
+        for _, entry_path, size, _ in entries:
+            if total_size <= max_size:
+                break
+
+            try:
+                os.unlink(entry_path)
+            except OSError:
+                # removed concurrently
+                pass
+
+            total_size -= size
+            nevicted += 1
+
+        self._size_estimate = total_size
+
+        if nevicted:
+            logger.info("%s: evicted %d cache entries" % (self.path, nevicted))
+
+        return nevicted
+
+    def get_usage(self):
+        result = {}
+        for namespace, _, size, _ in self._gen_entries():
+            nentries, total_size = result.get(namespace, (0, 0))
+            result[namespace] = (nentries + 1, total_size + size)
+
+        return result
+
+
+class SQLiteStore(PersistentStoreBase):
+    """A :class:`PersistentStoreBase` keeping all entries in the single
+    :mod:`sqlite3` database file *filename*.
+    """
+
+    def __init__(self, filename, max_size=None):
+        super(SQLiteStore, self).__init__(max_size)
+        self.filename = filename
+
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+
+    def _get_connection(self):
+        # Connections may not be carried over into forked processes.
+        if self._connection is None or self._connection_pid != os.getpid():
+            dirname = os.path.dirname(self.filename)
+            if dirname:
+                try:
+                    os.makedirs(dirname)
+                except OSError:
+                    if not os.path.isdir(dirname):
+                        raise
+
+            import sqlite3
+            self._connection = sqlite3.connect(
+                    self.filename, timeout=60, check_same_thread=False)
+            self._connection_pid = os.getpid()
+
+            with self._connection:
+                self._connection.execute(
+                        "CREATE TABLE IF NOT EXISTS entries ("
+                        "namespace TEXT NOT NULL, "
+                        "key TEXT NOT NULL, "
+                        "value BLOB NOT NULL, "
+                        "size INTEGER NOT NULL, "
+                        "atime REAL NOT NULL, "
+                        "PRIMARY KEY (namespace, key))")
+                self._connection.execute(
+                        "CREATE INDEX IF NOT EXISTS entries_atime "
+                        "ON entries (atime)")
+
+        return self._connection
+
+    def fetch(self, namespace, key):
+        from time import time
+        with self._lock:
+            conn = self._get_connection()
+            with conn:
+                row = conn.execute(
+                        "SELECT value FROM entries "
+                        "WHERE namespace = ? AND key = ?",
+                        (namespace, key)).fetchone()
+                if row is None:
+                    raise KeyError(key)
+
+                conn.execute(
+                        "UPDATE entries SET atime = ? "
+                        "WHERE namespace = ? AND key = ?",
+                        (time(), namespace, key))
+
+        return bytes(row[0])
+
+    def store_if_not_present(self, namespace, key, data):
+        import sqlite3
+        from time import time
+        with self._lock:
+            conn = self._get_connection()
+            with conn:
+                conn.execute(
+                        "INSERT OR IGNORE INTO entries "
+                        "(namespace, key, value, size, atime) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (namespace, key, sqlite3.Binary(data), len(data),
+                            time()))
+
+            if self.max_size is None:
+                return
+
+            total_size, = conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+        if total_size > self.max_size:
+            self.prune(int(_AUTO_PRUNE_FRACTION * self.max_size))
+
+    def clear(self, namespace=None):
+        with self._lock:
+            conn = self._get_connection()
+            with conn:
+                if namespace is None:
+                    conn.execute("DELETE FROM entries")
+                else:
+                    conn.execute(
+                            "DELETE FROM entries WHERE namespace = ?",
+                            (namespace,))
+
+            conn.execute("VACUUM")
+
+    def prune(self, max_size=None):
+        if max_size is None:
+            max_size = self.max_size
+        if max_size is None:
+            return 0
+
+        with self._lock:
+            conn = self._get_connection()
+            with conn:
+                total_size, = conn.execute(
+                        "SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+                evicted = []
+                if total_size > max_size:
+                    for namespace, key, size in conn.execute(
+                            "SELECT namespace, key, size FROM entries "
+                            "ORDER BY atime"):
+                        if total_size <= max_size:
+                            break
+                        evicted.append((namespace, key))
+                        total_size -= size
+
+                conn.executemany(
+                        "DELETE FROM entries WHERE namespace = ? AND key = ?",
+                        evicted)
+
+        if evicted:
+            logger.info("%s: evicted %d cache entries"
+                    % (self.filename, len(evicted)))
+
+        return len(evicted)
+
+    def get_usage(self):
+        with self._lock:
+            conn = self._get_connection()
+            return dict(
+                    (namespace, (nentries, total_size))
+                    for namespace, nentries, total_size in conn.execute(
+                        "SELECT namespace, COUNT(*), SUM(size) FROM entries "
+                        "GROUP BY namespace"))
+
+
+def get_cache_dir():
+    """
+    :returns: the directory named by :envvar:`LOOPY_CACHE_DIR`, or
+        the default cache directory of :mod:`loopy`. Besides the persistent
+        store, this also holds the build products of some targets, each in
+        a subdirectory of its own.
+    """
+    cache_dir = os.environ.get("LOOPY_CACHE_DIR")
+    if cache_dir is None:
+        import appdirs
+        cache_dir = appdirs.user_cache_dir("loopy", "loopy")
+
+    return cache_dir
+
+
+def _make_default_store():
+    cache_dir = get_cache_dir()
+
+    max_size = parse_cache_size(os.environ.get("LOOPY_CACHE_MAX_SIZE", ""))
+
+    backend = os.environ.get("LOOPY_CACHE_BACKEND", "directory")
+    if backend == "directory":
+        # Keep the namespaces apart from build products, which would
+        # otherwise be taken for namespaces of the store.
+        return DirectoryStore(os.path.join(cache_dir, "store"),
+                max_size=max_size)
+    elif backend == "sqlite":
+        return SQLiteStore(
+                os.path.join(cache_dir, "loopy-cache.sqlite"),
+                max_size=max_size)
+    else:
+        raise ValueError("unknown value of LOOPY_CACHE_BACKEND: '%s' "
+                "(must be 'directory' or 'sqlite')" % backend)
+
+
+_PERSISTENT_STORE = None
+
+
+def get_persistent_store():
+    """
+    :returns: the :class:`PersistentStoreBase` used by all of :mod:`loopy`'s
+        caches. Unless set by :func:`set_persistent_store`, it is created
+        on first use according to the environment variables described above.
+    """
+    global _PERSISTENT_STORE
+    if _PERSISTENT_STORE is None:
+        _PERSISTENT_STORE = _make_default_store()
+
+    return _PERSISTENT_STORE
+
+
+def set_persistent_store(store):
+    """Use the :class:`PersistentStoreBase` *store* for all of :mod:`loopy`'s
+    caches. Passing *None* reverts to the store configured by environment
+    variables.
+    """
+    global _PERSISTENT_STORE
+    _PERSISTENT_STORE = store
+
+# }}}
+
+
+# {{{ tiered cache
+
+_CACHES = {}
+
+
+def _register_cache(cache):
+    """Make *cache* report its statistics through :func:`get_cache_stats`.
+
+    :arg cache: an object with a unique ``name`` attribute and methods
+        ``get_stats`` (returning a :class:`CacheStats`) and ``_reset_stats``.
+    """
+    if cache.name in _CACHES:
+        raise ValueError("cache '%s' already exists" % cache.name)
+
+    _CACHES[cache.name] = cache
+
+
+class TieredCache(object):
+    """A write-once cache with the interface of
+    :class:`pytools.persistent_dict.WriteOncePersistentDict`, with lookups
+    going through the shared in-memory tier before reaching the persistent
+    store.
+
+    .. attribute:: name
+
+        A short, unique identifier under which statistics are reported
+        by :func:`get_cache_stats`.
+
+    .. automethod:: __getitem__
+    .. automethod:: store_if_not_present
+    .. automethod:: clear
+    .. automethod:: get_stats
+    """
+
+    def __init__(self, name, identifier, key_builder):
+        """
+        :arg identifier: the namespace of this cache's entries in the
+            persistent store. Should be changed whenever the format of
+            the stored results changes.
+        """
+        self.name = name
+        self.identifier = identifier
+        self.key_builder = key_builder
+
+        self._reset_stats()
+
+        _register_cache(self)
+
+    def _reset_stats(self):
+        self._memory_hits = 0
+        self._persistent_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __getitem__(self, key):
+        key_hash = self.key_builder(key)
+        memory_key = (self.name, key_hash)
+
+        try:
+            result = _MEMORY_TIER[memory_key]
+        except KeyError:
+            pass
+        else:
+            self._memory_hits += 1
+            return result
+
+        try:
+            stored_key, result = pickle.loads(
+                    get_persistent_store().fetch(self.identifier, key_hash))
+        except KeyError:
+            self._misses += 1
+            raise
+        except Exception as e:
+            logger.warning("%s: unreadable cache entry '%s' ignored (%s: %s)"
+                    % (self.name, key_hash, type(e).__name__, e))
+            self._misses += 1
+            raise KeyError(key)
+
+        if stored_key != key:
+            logger.warning("%s: cache entry '%s' ignored, as it was stored "
+                    "for a different key with the same hash"
+                    % (self.name, key_hash))
+            self._misses += 1
+            raise KeyError(key)
+
+        self._persistent_hits += 1
+        _MEMORY_TIER[memory_key] = result
+        return result
+
+    def store_if_not_present(self, key, value):
+        key_hash = self.key_builder(key)
+        get_persistent_store().store_if_not_present(
+                self.identifier, key_hash,
+                pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL))
+        _MEMORY_TIER[(self.name, key_hash)] = value
+
+    def clear(self):
+        """Remove all entries of this cache, both in memory and on disk."""
+        _MEMORY_TIER.discard_cache(self.name)
+        get_persistent_store().clear(self.identifier)
+
+    def get_stats(self):
+        """
+        :returns: a :class:`CacheStats`
+        """
+        return CacheStats(
+                memory_hits=self._memory_hits,
+                persistent_hits=self._persistent_hits,
+                misses=self._misses,
+                evictions=self._evictions)
+
+
+def get_cache_stats():
+    """
+    :returns: a :class:`dict` mapping the :attr:`TieredCache.name` of each of
+        :mod:`loopy`'s caches to a :class:`CacheStats` instance. Once ISL
+        operations have been performed, this includes the in-memory
+        :class:`loopy.isl_helpers.ISLOperationCache` as ``"isl_operations"``.
+    """
+    return dict(
+            (name, cache.get_stats())
+            for name, cache in six.iteritems(_CACHES))
+
+
+def reset_cache_stats():
+    """Reset the usage counters of all of :mod:`loopy`'s caches to zero."""
+    for cache in six.itervalues(_CACHES):
+        cache._reset_stats()
+
+# }}}
+
+# vim: foldmethod=marker
@@ -252,10 +252,17 @@ def check_for_data_dependent_parallel_bounds(kernel):
 # {{{ check access bounds
 
 class _AccessCheckMapper(WalkMapper):
-    def __init__(self, kernel, domain, insn_id):
+    """Collects the ranges of array accesses into *access_ranges*, a mapping
+    from array names to lists of tuples ``(access_range, expr, insn_id)``.
+    """
+
+    def __init__(self, kernel, domain, insn_id, access_ranges):
         self.kernel = kernel
         self.domain = domain
         self.insn_id = insn_id
+        self.access_ranges = access_ranges
+
+        self.available_vars = set(domain.get_var_dict())
 
     def map_subscript(self, expr):
         WalkMapper.map_subscript(self, expr)
@@ -281,14 +288,13 @@ class _AccessCheckMapper(WalkMapper):
             from loopy.symbolic import (get_dependencies, get_access_range,
                     UnableToDetermineAccessRange)
 
-            available_vars = set(self.domain.get_var_dict())
             shape_deps = set()
             for shape_axis in shape:
                 if shape_axis is not None:
                     shape_deps.update(get_dependencies(shape_axis))
 
-            if not (get_dependencies(subscript) <= available_vars
-                    and shape_deps <= available_vars):
+            if not (get_dependencies(subscript) <= self.available_vars
+                    and shape_deps <= self.available_vars):
                 return
 
             if len(subscript) != len(shape):
@@ -304,34 +310,70 @@ class _AccessCheckMapper(WalkMapper):
                 # Likely: index was non-affine, nothing we can do.
                 return
 
-            shape_domain = isl.BasicSet.universe(access_range.get_space())
-            for idim in range(len(subscript)):
-                shape_axis = shape[idim]
+            self.access_ranges.setdefault(var_name, []).append(
+                    (access_range, expr, self.insn_id))
 
-                if shape_axis is not None:
-                    from loopy.isl_helpers import make_slab
-                    slab = make_slab(
-                            shape_domain.get_space(), (dim_type.in_, idim),
-                            0, shape_axis)
 
-                    shape_domain = shape_domain.intersect(slab)
+def _get_shape_domain(kernel, var_name, space, shape_domain_cache):
+    """Return the set of indices within the shape of the array *var_name*,
+    in *space*. Results are kept in *shape_domain_cache*.
+    """
+    cache_key = (var_name, tuple(space.get_var_names(dim_type.param)))
+    try:
+        return shape_domain_cache[cache_key]
+    except KeyError:
+        pass
+
+    if var_name in kernel.arg_dict:
+        shape = kernel.arg_dict[var_name].shape
+    else:
+        shape = kernel.temporary_variables[var_name].shape
+
+    from loopy.isl_helpers import make_slab
+
+    shape_domain = isl.BasicSet.universe(space)
+    for idim, shape_axis in enumerate(shape):
+        if shape_axis is not None:
+            slab = make_slab(
+                    shape_domain.get_space(), (dim_type.in_, idim),
+                    0, shape_axis)
 
-            if not access_range.is_subset(shape_domain):
-                raise LoopyError("'%s' in instruction '%s' "
-                        "accesses out-of-bounds array element"
-                        % (expr, self.insn_id))
+            shape_domain = shape_domain.intersect(slab)
+
+    shape_domain_cache[cache_key] = shape_domain
+    return shape_domain
 
 
 def check_bounds(kernel):
+    """Check that no array access in *kernel* is out of bounds, to the extent
+    that this can be shown using :mod:`islpy`.
+
+    The ranges of the accesses to each array from instructions within the same
+    loop domain are combined, so that containment in the array's shape is
+    tested once for each pair of domain and array.
+    """
     temp_var_names = set(kernel.temporary_variables)
+
+    # {{{ gather access ranges by domain
+
+    # maps frozenset of inames -> (domain, {array name: [access info]})
+    inames_to_accesses = {}
+
     for insn in kernel.instructions:
-        domain = kernel.get_inames_domain(kernel.insn_inames(insn))
+        insn_inames = kernel.insn_inames(insn)
+
+        try:
+            domain, access_ranges = inames_to_accesses[insn_inames]
+        except KeyError:
+            domain = kernel.get_inames_domain(insn_inames)
+            access_ranges = {}
+            inames_to_accesses[insn_inames] = domain, access_ranges
 
         # data-dependent bounds? can't do much
         if set(domain.get_var_names(dim_type.param)) & temp_var_names:
             continue
 
-        acm = _AccessCheckMapper(kernel, domain, insn.id)
+        acm = _AccessCheckMapper(kernel, domain, insn.id, access_ranges)
 
         def run_acm(expr):
             acm(expr)
@@ -339,6 +381,34 @@ def check_bounds(kernel):
 
         insn.with_transformed_expressions(run_acm)
 
+    # }}}
+
+    # {{{ check access ranges against shapes
+
+    shape_domain_cache = {}
+
+    for _, access_ranges in six.itervalues(inames_to_accesses):
+        for var_name, access_infos in six.iteritems(access_ranges):
+            combined_range = access_infos[0][0]
+            for access_range, _, _ in access_infos[1:]:
+                combined_range = combined_range | access_range
+
+            shape_domain = _get_shape_domain(
+                    kernel, var_name, combined_range.get_space(),
+                    shape_domain_cache)
+
+            if combined_range.is_subset(shape_domain):
+                continue
+
+            # Find the offending access for the error message.
+            for access_range, expr, insn_id in access_infos:
+                if not access_range.is_subset(shape_domain):
+                    raise LoopyError("'%s' in instruction '%s' "
+                            "accesses out-of-bounds array element"
+                            % (expr, insn_id))
+
+    # }}}
+
 # }}}
 
 
@@ -392,31 +462,48 @@ def check_has_schedulable_iname_nesting(kernel):
 # {{{ check_variable_access_ordered
 
 class IndirectDependencyEdgeFinder(object):
+    """Determines whether an instruction depends, directly or indirectly, on
+    another one.
+
+    The transitive closure of the dependency graph is computed once on
+    construction, by visiting its strongly connected components in
+    topological order. The instructions reachable from each instruction are
+    stored as a bitset (an :class:`int`), so that each query takes
+    constant time.
+    """
+
     def __init__(self, kernel):
         self.kernel = kernel
-        self.dep_edge_cache = {}
 
-    def __call__(self, depender_id, dependee_id):
-        cache_key = (depender_id, dependee_id)
+        self.insn_id_to_bit = dict(
+                (insn.id, 1 << i) for i, insn in enumerate(kernel.instructions))
 
-        try:
-            return self.dep_edge_cache[cache_key]
-        except KeyError:
-            pass
+        dep_graph = dict(
+                (insn.id, [dep_id for dep_id in insn.depends_on
+                    if dep_id in self.insn_id_to_bit])
+                for insn in kernel.instructions)
 
-        depender = self.kernel.id_to_insn[depender_id]
+        # compute_sccs returns the components with dependencies first.
+        from loopy.tools import compute_sccs
 
-        if dependee_id in depender.depends_on:
-            self.dep_edge_cache[cache_key] = True
-            return True
+        self.insn_id_to_reachable = reachable = {}
+        for scc in compute_sccs(dep_graph):
+            scc_reachable = 0
+            for insn_id in scc:
+                for dep_id in dep_graph[insn_id]:
+                    # Dependencies within the SCC have not been visited yet,
+                    # but the instructions in an SCC of size greater than one
+                    # all reach each other (and themselves) anyway.
+                    scc_reachable |= (
+                            self.insn_id_to_bit[dep_id]
+                            | reachable.get(dep_id, 0))
 
-        for dep in depender.depends_on:
-            if self(dep, dependee_id):
-                self.dep_edge_cache[cache_key] = True
-                return True
+            for insn_id in scc:
+                reachable[insn_id] = scc_reachable
 
-        self.dep_edge_cache[cache_key] = False
-        return False
+    def __call__(self, depender_id, dependee_id):
+        return bool(self.insn_id_to_reachable[depender_id]
+                & self.insn_id_to_bit[dependee_id])
 
 
 def declares_nosync_with(kernel, var_scope, dep_a, dep_b):
@@ -591,22 +678,266 @@ def check_variable_access_ordered(kernel):
 # }}}
 
 
+# {{{ check levels and reports
+
+CHECK_LEVELS = ("none", "cheap", "full")
+
+# checks that are skipped at check level "cheap"
+_EXPENSIVE_CHECK_NAMES = frozenset([
+        "check_for_write_races",
+        "check_bounds",
+        "check_has_schedulable_iname_nesting",
+        "check_variable_access_ordered",
+        "check_implemented_domains",
+        ])
+
+
+def get_check_level(kernel):
+    """Return the check level (one of :data:`CHECK_LEVELS`) selected by
+    :attr:`loopy.Options.check_level` for *kernel*.
+    """
+    check_level = kernel.options.check_level
+    if check_level is None:
+        return "full"
+
+    if check_level not in CHECK_LEVELS:
+        raise LoopyError("invalid check level '%s' (must be one of %s)"
+                % (check_level, ", ".join(CHECK_LEVELS)))
+
+    return check_level
+
+
+CODEGEN_VERIFICATION_MODES = ("off", "sampled", "full")
+
+
+def get_codegen_verification(kernel):
+    """Return the mode of verification of generated code (one of
+    :data:`CODEGEN_VERIFICATION_MODES`) selected by
+    :attr:`loopy.Options.codegen_verification` for *kernel*.
+    """
+    mode = kernel.options.codegen_verification
+    if mode is None:
+        return "full" if get_check_level(kernel) == "full" else "off"
+
+    if mode not in CODEGEN_VERIFICATION_MODES:
+        raise LoopyError("invalid code generation verification mode '%s' "
+                "(must be one of %s)"
+                % (mode, ", ".join(CODEGEN_VERIFICATION_MODES)))
+
+    return mode
+
+
+class CheckReport(object):
+    """The checks run on a kernel in one of the stages at which loopy checks
+    kernels, together with the time they took.
+
+    .. attribute:: kernel_name
+
+    .. attribute:: stage
+
+        One of ``"pre_schedule"``, ``"pre_codegen"`` and ``"post_codegen"``.
+
+    .. attribute:: check_level
+
+        One of :data:`CHECK_LEVELS`.
+
+    .. attribute:: check_times
+
+        A list of tuples ``(check_name, seconds)``, in the order in which the
+        checks were run. For checks run in worker processes (see
+        :attr:`loopy.Options.check_processes`), the times are measured in the
+        workers.
+
+    .. attribute:: skipped_checks
+
+        A list of the names of the checks that were skipped because of
+        :attr:`check_level`.
+
+    .. automethod:: total_time
+    """
+
+    def __init__(self, kernel_name, stage, check_level):
+        self.kernel_name = kernel_name
+        self.stage = stage
+        self.check_level = check_level
+        self.check_times = []
+        self.skipped_checks = []
+
+    def total_time(self):
+        return sum(seconds for _, seconds in self.check_times)
+
+    def __str__(self):
+        lines = ["%s checks on %s (level: %s, %.3f s)" % (
+                self.stage, self.kernel_name, self.check_level,
+                self.total_time())]
+        for check_name, seconds in self.check_times:
+            lines.append("  %-60s %.3f s" % (check_name, seconds))
+        for check_name in self.skipped_checks:
+            lines.append("  %-60s skipped" % check_name)
+
+        return "\n".join(lines)
+
+
+_check_report_lists = []
+
+
+class collect_check_reports(object):  # noqa: N801
+    """A context manager that gathers the :class:`CheckReport` of each stage
+    of checks run while it is active in a list, which it returns on entry::
+
+        with collect_check_reports() as reports:
+            code = lp.generate_code_v2(knl).device_code()
+
+        for report in reports:
+            print(report)
+    """
+
+    def __enter__(self):
+        self.reports = []
+        _check_report_lists.append(self.reports)
+        return self.reports
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _check_report_lists.remove(self.reports)
+
+
+def _select_checks(check_level, named_checks, report):
+    if check_level == "none":
+        selected_checks = []
+    elif check_level == "cheap":
+        selected_checks = [
+                (check_name, check) for check_name, check in named_checks
+                if check_name not in _EXPENSIVE_CHECK_NAMES]
+    else:
+        selected_checks = list(named_checks)
+
+    selected_names = set(check_name for check_name, _ in selected_checks)
+    report.skipped_checks.extend(
+            check_name for check_name, _ in named_checks
+            if check_name not in selected_names)
+
+    return selected_checks
+
+
+def _run_checks(kernel, stage, named_checks, nprocesses=0,
+        selected_names=None):
+    """Run those of *named_checks*, a list of tuples ``(name, check)``, that
+    are selected by the check level of *kernel*, and publish and return a
+    :class:`CheckReport`.
+
+    :arg selected_names: if not *None*, the names of the checks to run,
+        overriding the selection by check level.
+    """
+    check_level = get_check_level(kernel)
+    report = CheckReport(kernel.name, stage, check_level)
+
+    if selected_names is None:
+        selected_checks = _select_checks(check_level, named_checks, report)
+    else:
+        selected_checks = [
+                (check_name, check) for check_name, check in named_checks
+                if check_name in selected_names]
+        report.skipped_checks.extend(
+                check_name for check_name, _ in named_checks
+                if check_name not in selected_names)
+
+    if nprocesses > 1 and len(selected_checks) > 1:
+        _run_checks_in_processes(
+                kernel, [check_name for check_name, _ in selected_checks],
+                nprocesses, report)
+    else:
+        from time import time
+        for check_name, check in selected_checks:
+            start_time = time()
+            check(kernel)
+            report.check_times.append((check_name, time() - start_time))
+
+    logger.debug(str(report))
+    for report_list in _check_report_lists:
+        report_list.append(report)
+
+    return report
+
+# }}}
+
+
+# {{{ running checks in worker processes
+
+_worker_kernel = None
+
+
+def _init_check_worker(kernel):
+    global _worker_kernel
+    _worker_kernel = kernel
+
+
+def _run_check_in_worker(check_name):
+    import warnings
+    from time import time
+
+    with warnings.catch_warnings(record=True) as caught_warnings:
+        warnings.simplefilter("always")
+        start_time = time()
+        globals()[check_name](_worker_kernel)
+        seconds = time() - start_time
+
+    return seconds, [(str(w.message), w.category) for w in caught_warnings]
+
+
+def _run_checks_in_processes(kernel, check_names, nprocesses, report):
+    """Run each of the module-level checks named in *check_names* on *kernel*
+    in a pool of *nprocesses* worker processes, recording their times in
+    *report*. Warnings issued by the checks are reissued in this process.
+    As when running them in sequence, the exception raised by the first
+    failing check (in the order of *check_names*) is propagated.
+    """
+    from multiprocessing import Pool
+    from warnings import warn
+
+    pool = Pool(nprocesses,
+            initializer=_init_check_worker, initargs=(kernel,))
+    try:
+        for check_name, (seconds, check_warnings) in zip(
+                check_names, pool.imap(_run_check_in_worker, check_names)):
+            report.check_times.append((check_name, seconds))
+            for message, category in check_warnings:
+                warn(message, category)
+    finally:
+        pool.terminate()
+        pool.join()
+
+# }}}
+
+
+_PRE_SCHEDULE_CHECKS = [
+        check_for_duplicate_insn_ids,
+        check_for_orphaned_user_hardware_axes,
+        check_for_double_use_of_hw_axes,
+        check_insn_attributes,
+        check_loop_priority_inames_known,
+        check_for_inactive_iname_access,
+        check_for_write_races,
+        check_for_data_dependent_parallel_bounds,
+        check_bounds,
+        check_write_destinations,
+        check_has_schedulable_iname_nesting,
+        check_variable_access_ordered,
+        ]
+
+
 def pre_schedule_checks(kernel):
+    """Run the checks on *kernel* that precede scheduling, as selected by
+    :attr:`loopy.Options.check_level`, in
+    :attr:`loopy.Options.check_processes` worker processes if more than one.
+
+    :returns: a :class:`CheckReport`.
+    """
     try:
         logger.debug("%s: pre-schedule check: start" % kernel.name)
 
-        check_for_duplicate_insn_ids(kernel)
-        check_for_orphaned_user_hardware_axes(kernel)
-        check_for_double_use_of_hw_axes(kernel)
-        check_insn_attributes(kernel)
-        check_loop_priority_inames_known(kernel)
-        check_for_inactive_iname_access(kernel)
-        check_for_write_races(kernel)
-        check_for_data_dependent_parallel_bounds(kernel)
-        check_bounds(kernel)
-        check_write_destinations(kernel)
-        check_has_schedulable_iname_nesting(kernel)
-        check_variable_access_ordered(kernel)
+        report = _run_checks(kernel, "pre_schedule",
+                [(check.__name__, check) for check in _PRE_SCHEDULE_CHECKS],
+                nprocesses=kernel.options.check_processes)
 
         logger.debug("%s: pre-schedule check: done" % kernel.name)
     except KeyboardInterrupt:
@@ -619,6 +950,8 @@ def pre_schedule_checks(kernel):
         print(75*"=")
         raise
 
+    return report
+
 
 # {{{ post-schedule / pre-code-generation checks
 
@@ -858,15 +1191,23 @@ def check_that_shapes_and_strides_are_arguments(kernel):
 
 
 def pre_codegen_checks(kernel):
+    """Run the checks on the scheduled *kernel* that precede code generation,
+    as selected by :attr:`loopy.Options.check_level`.
+
+    :returns: a :class:`CheckReport`.
+    """
     try:
         logger.debug("pre-codegen check %s: start" % kernel.name)
 
-        check_for_unused_hw_axes_in_insns(kernel)
-        check_that_atomic_ops_are_used_exactly_on_atomic_arrays(kernel)
-        check_that_temporaries_are_defined_in_subkernels_where_used(kernel)
-        check_that_all_insns_are_scheduled(kernel)
-        kernel.target.pre_codegen_check(kernel)
-        check_that_shapes_and_strides_are_arguments(kernel)
+        report = _run_checks(kernel, "pre_codegen", [
+            (check.__name__, check) for check in [
+                check_for_unused_hw_axes_in_insns,
+                check_that_atomic_ops_are_used_exactly_on_atomic_arrays,
+                check_that_temporaries_are_defined_in_subkernels_where_used,
+                check_that_all_insns_are_scheduled]]
+            + [("target_pre_codegen_check", kernel.target.pre_codegen_check),
+                ("check_that_shapes_and_strides_are_arguments",
+                    check_that_shapes_and_strides_are_arguments)])
 
         logger.debug("pre-codegen check %s: done" % kernel.name)
     except Exception:
@@ -877,12 +1218,31 @@ def pre_codegen_checks(kernel):
         print(75*"=")
         raise
 
+    return report
+
 # }}}
 
 
 # {{{ sanity-check for implemented domains of each instruction
 
-def check_implemented_domains(kernel, implemented_domains, code=None):
+def sample_insn_ids(insn_ids, sample_size):
+    """Return a subset of *insn_ids* of at most *sample_size* instruction ids.
+    The subset is chosen by hashing the ids, so that it is the same across
+    runs.
+    """
+    from hashlib import sha1
+    return frozenset(sorted(
+        insn_ids,
+        key=lambda insn_id: sha1(insn_id.encode("utf-8")).hexdigest()
+        )[:sample_size])
+
+
+def check_implemented_domains(kernel, implemented_domains, code=None,
+        insn_ids=None):
+    """
+    :arg insn_ids: if not *None*, only the instructions with ids in this set
+        are checked.
+    """
     from islpy import dim_type
 
     from islpy import align_two
@@ -891,6 +1251,9 @@ def check_implemented_domains(kernel, implemented_domains, code=None):
     last_insn_inames = None
 
     for insn_id, idomains in six.iteritems(implemented_domains):
+        if insn_ids is not None and insn_id not in insn_ids:
+            continue
+
         insn = kernel.id_to_insn[insn_id]
 
         assert idomains
@@ -1002,6 +1365,31 @@ def check_implemented_domains(kernel, implemented_domains, code=None):
     # placate the assert at the call site
     return True
 
+
+def post_codegen_checks(kernel, codegen_result):
+    """Run the checks on the code generated for *kernel*, as selected by
+    :attr:`loopy.Options.codegen_verification`.
+
+    :arg codegen_result: a :class:`loopy.codegen.result.CodeGenerationResult`.
+    :returns: a :class:`CheckReport`.
+    """
+    verification = get_codegen_verification(kernel)
+
+    insn_ids = None
+    if verification == "sampled":
+        insn_ids = sample_insn_ids(
+                codegen_result.implemented_domains,
+                kernel.options.codegen_verification_sample_size)
+
+    def check_implemented_domains_of_result(kernel):
+        check_implemented_domains(kernel, codegen_result.implemented_domains,
+                codegen_result.device_code(), insn_ids=insn_ids)
+
+    return _run_checks(kernel, "post_codegen", [
+        ("check_implemented_domains", check_implemented_domains_of_result)],
+        selected_names=(
+            [] if verification == "off" else ["check_implemented_domains"]))
+
 # }}}
 
 
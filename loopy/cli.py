@@ -1,7 +1,9 @@
-from __future__ import print_function
+from __future__ import division, print_function
 
 import sys
 
+import six
+
 import loopy as lp
 import numpy as np
 
@@ -53,88 +55,134 @@ def defines_to_python_code(defines_str):
     return "\n".join(result)
 
 
-def main():
+def format_size(nbytes):
+    for unit in ["bytes", "KiB", "MiB"]:
+        if nbytes < 2**10:
+            return "%.4g %s" % (nbytes, unit)
+        nbytes /= 2**10
+
+    return "%.4g GiB" % nbytes
+
+
+def cache_main(argv):
     from argparse import ArgumentParser
 
-    parser = ArgumentParser(description="Stand-alone loopy frontend")
+    parser = ArgumentParser(prog="loopy cache",
+            description="Inspect and manage loopy's persistent cache")
+    parser.add_argument("command", choices=("stats", "prune", "clear"))
+    parser.add_argument("--max-size",
+            help="For 'prune': the total size to prune the cache to, "
+            "e.g. 500M. Defaults to $LOOPY_CACHE_MAX_SIZE.")
+    parser.add_argument("--namespace",
+            help="For 'clear': only remove the entries in this namespace.")
+    args = parser.parse_args(argv)
+
+    from loopy.caching import get_persistent_store, parse_cache_size
+    store = get_persistent_store()
+
+    if args.command == "stats":
+        usage = store.get_usage()
+
+        total_entries = 0
+        total_size = 0
+        for namespace in sorted(usage):
+            nentries, size = usage[namespace]
+            print("%-60s %8d entries %12s" % (
+                namespace, nentries, format_size(size)))
+            total_entries += nentries
+            total_size += size
+
+        print("%-60s %8d entries %12s" % (
+            "TOTAL", total_entries, format_size(total_size)))
+        if store.max_size is not None:
+            print("maximum size: %s" % format_size(store.max_size))
+
+    elif args.command == "prune":
+        if args.max_size is not None:
+            max_size = parse_cache_size(args.max_size)
+        else:
+            max_size = store.max_size
 
-    parser.add_argument("infile", metavar="INPUT_FILE")
-    parser.add_argument("outfile", default="-", metavar="OUTPUT_FILE",
-            help="Defaults to stdout ('-').", nargs='?')
-    parser.add_argument("--lang", metavar="LANGUAGE", help="loopy|fortran")
-    parser.add_argument("--target", choices=(
-        "opencl", "ispc", "ispc-occa", "c", "c-fortran", "cuda"),
-        default="opencl")
-    parser.add_argument("--name")
-    parser.add_argument("--transform")
-    parser.add_argument("--edit-code", action="store_true")
-    parser.add_argument("--occa-defines")
-    parser.add_argument("--occa-add-dummy-arg", action="store_true")
-    parser.add_argument("--print-ir", action="store_true")
-    args = parser.parse_args()
+        if max_size is None:
+            parser.error("no maximum size given (use --max-size or set "
+                    "$LOOPY_CACHE_MAX_SIZE)")
 
-    if args.target == "opencl":
+        print("evicted %d entries" % store.prune(max_size))
+
+    elif args.command == "clear":
+        store.clear(args.namespace)
+
+    else:
+        raise ValueError("unknown command: %s" % args.command)
+
+
+# {{{ reading and generating code for kernels
+
+TARGET_NAMES = ("opencl", "ispc", "ispc-occa", "c", "c-fortran", "cuda")
+
+# file name extensions of the generated code
+TARGET_EXTENSIONS = {
+        "opencl": ".cl",
+        "ispc": ".ispc",
+        "ispc-occa": ".ispc",
+        "c": ".c",
+        "c-fortran": ".c",
+        "cuda": ".cu",
+        }
+
+LANG_EXTENSIONS = {
+        ".py": "loopy",
+        ".loopy": "loopy",
+        ".floopy": "fortran",
+        ".f90": "fortran",
+        ".fpp": "fortran",
+        ".f": "fortran",
+        ".f77": "fortran",
+        }
+
+
+def get_target(target_name):
+    if target_name == "opencl":
         from loopy.target.opencl import OpenCLTarget
-        target = OpenCLTarget()
-    elif args.target == "ispc":
+        return OpenCLTarget()
+    elif target_name == "ispc":
         from loopy.target.ispc import ISPCTarget
-        target = ISPCTarget()
-    elif args.target == "ispc-occa":
+        return ISPCTarget()
+    elif target_name == "ispc-occa":
         from loopy.target.ispc import ISPCTarget
-        target = ISPCTarget(occa_mode=True)
-    elif args.target == "c":
+        return ISPCTarget(occa_mode=True)
+    elif target_name == "c":
         from loopy.target.c import CTarget
-        target = CTarget()
-    elif args.target == "c-fortran":
+        return CTarget()
+    elif target_name == "c-fortran":
         from loopy.target.c import CTarget
-        target = CTarget(fortran_abi=True)
-    elif args.target == "cuda":
+        return CTarget(fortran_abi=True)
+    elif target_name == "cuda":
         from loopy.target.cuda import CudaTarget
-        target = CudaTarget()
-    else:
-        raise ValueError("unknown target: %s" % target)
-
-    lp.set_default_target(target)
-
-    lang = None
-    if args.infile == "-":
-        infile_content = sys.stdin.read()
+        return CudaTarget()
     else:
-        from os.path import splitext
-        _, ext = splitext(args.infile)
+        raise ValueError("unknown target: %s" % target_name)
 
-        lang = {
-                ".py": "loopy",
-                ".loopy": "loopy",
-                ".floopy": "fortran",
-                ".f90": "fortran",
-                ".fpp": "fortran",
-                ".f": "fortran",
-                ".f77": "fortran",
-                }.get(ext)
-        with open(args.infile, "r") as infile_fd:
-            infile_content = infile_fd.read()
-
-    if args.lang is not None:
-        lang = args.lang
-
-    if lang is None:
-        raise RuntimeError("unable to deduce input language "
-                "(wrong input file extension? --lang flag?)")
 
+def read_kernels(infile, infile_content, lang, name=None, transform=None,
+        occa_defines=None):
+    """Return the kernels defined by *infile_content*, read from the file
+    *infile*, with the target set by :func:`loopy.set_default_target`.
+    """
     if lang == "loopy":
         # {{{ path wrangling
 
         from os.path import dirname, abspath
         from os import getcwd
 
-        infile_dirname = dirname(args.infile)
+        infile_dirname = dirname(infile)
         if infile_dirname:
             infile_dirname = abspath(infile_dirname)
         else:
             infile_dirname = getcwd()
 
-        sys.path.append(infile_dirname)
+        if infile_dirname not in sys.path:
+            sys.path.append(infile_dirname)
 
         # }}}
 
@@ -142,18 +190,17 @@ def main():
         data_dic["lp"] = lp
         data_dic["np"] = np
 
-        if args.occa_defines:
-            with open(args.occa_defines, "r") as defines_fd:
+        if occa_defines:
+            with open(occa_defines, "r") as defines_fd:
                 occa_define_code = defines_to_python_code(defines_fd.read())
-            exec(compile(occa_define_code, args.occa_defines, "exec"), data_dic)
+            exec(compile(occa_define_code, occa_defines, "exec"), data_dic)
 
-        with open(args.infile, "r") as infile_fd:
-            exec(compile(infile_content, args.infile, "exec"), data_dic)
+        exec(compile(infile_content, infile, "exec"), data_dic)
 
-        if args.transform:
-            with open(args.transform, "r") as xform_fd:
+        if transform:
+            with open(transform, "r") as xform_fd:
                 exec(compile(xform_fd.read(),
-                    args.transform, "exec"), data_dic)
+                    transform, "exec"), data_dic)
 
         try:
             kernel = data_dic["lp_knl"]
@@ -161,57 +208,54 @@ def main():
             raise RuntimeError("loopy-lang requires 'lp_knl' "
                     "to be defined on exit")
 
-        if args.name is not None:
-            kernel = kernel.copy(name=args.name)
+        if name is not None:
+            kernel = kernel.copy(name=name)
 
         kernels = [kernel]
 
     elif lang in ["fortran", "floopy", "fpp"]:
         pre_transform_code = None
-        if args.transform:
-            with open(args.transform, "r") as xform_fd:
+        if transform:
+            with open(transform, "r") as xform_fd:
                 pre_transform_code = xform_fd.read()
 
-        if args.occa_defines:
+        if occa_defines:
             if pre_transform_code is None:
                 pre_transform_code = ""
 
-            with open(args.occa_defines, "r") as defines_fd:
+            with open(occa_defines, "r") as defines_fd:
                 pre_transform_code = (
                         defines_to_python_code(defines_fd.read())
                         + pre_transform_code)
 
         kernels = lp.parse_transformed_fortran(
                 infile_content, pre_transform_code=pre_transform_code,
-                filename=args.infile)
+                filename=infile)
 
-        if args.name is not None:
+        if name is not None:
             kernels = [kernel for kernel in kernels
-                    if kernel.name == args.name]
+                    if kernel.name == name]
 
         if not kernels:
             raise RuntimeError("no kernels found (name specified: %s)"
-                    % args.name)
+                    % name)
 
     else:
         raise RuntimeError("unknown language: '%s'"
-                % args.lang)
+                % lang)
 
-    if args.print_ir:
-        for kernel in kernels:
-            print(kernel, file=sys.stderr)
+    return kernels
 
-    if args.occa_add_dummy_arg:
-        new_kernels = []
-        for kernel in kernels:
-            new_args = [
-                    lp.GlobalArg("occa_info", np.int32, shape=None)
-                    ] + kernel.args
-            new_kernels.append(kernel.copy(args=new_args))
 
-        kernels = new_kernels
-        del new_kernels
+def add_occa_dummy_arg(kernels):
+    return [
+            kernel.copy(args=[
+                lp.GlobalArg("occa_info", np.int32, shape=None)
+                ] + kernel.args)
+            for kernel in kernels]
 
+
+def generate_code_for_kernels(kernels):
     codes = []
     from loopy.codegen import generate_code
     for kernel in kernels:
@@ -219,12 +263,350 @@ def main():
         code, impl_arg_info = generate_code(kernel)
         codes.append(code)
 
+    return "\n\n".join(codes)
+
+# }}}
+
+
+# {{{ batch mode
+
+# Next to each output file, batch mode stores the hash of the kernels from
+# which it was generated in a file with this suffix.
+HASH_FILE_SUFFIX = ".lpyhash"
+
+
+def get_kernels_hash(kernels):
+    """Return a hex digest identifying *kernels*, and so the code generated
+    for them by this version of :mod:`loopy`.
+    """
+    from loopy.tools import LoopyKeyBuilder
+    from loopy.version import DATA_MODEL_VERSION
+    return LoopyKeyBuilder()((DATA_MODEL_VERSION, tuple(kernels)))
+
+
+def _read_kernels_hash(outfile):
+    try:
+        with open(outfile + HASH_FILE_SUFFIX, "r") as hash_fd:
+            return hash_fd.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def run_batch_job(job):
+    """Generate code for the input file described by *job*, a :class:`dict`
+    as returned by :func:`get_batch_jobs`, unless its output file exists and
+    was generated from the same kernels.
+
+    :returns: a :class:`dict` describing the outcome and the time taken, as
+        included in the report of ``loopy batch``.
+    """
+    import os
+    from time import time
+
+    start_time = time()
+    result = {"input": job["input"], "output": job["output"]}
+
+    try:
+        lp.set_default_target(get_target(job["target"]))
+
+        with open(job["input"], "r") as infile_fd:
+            infile_content = infile_fd.read()
+
+        kernels = read_kernels(job["input"], infile_content, job["lang"],
+                name=job["name"], transform=job["transform"],
+                occa_defines=job["occa_defines"])
+        if job["occa_add_dummy_arg"]:
+            kernels = add_occa_dummy_arg(kernels)
+
+        kernels_hash = get_kernels_hash(kernels)
+        result["kernels"] = [kernel.name for kernel in kernels]
+        result["hash"] = kernels_hash
+        result["read_time"] = time() - start_time
+
+        if (not job["force"]
+                and os.path.exists(job["output"])
+                and _read_kernels_hash(job["output"]) == kernels_hash):
+            result["status"] = "skipped"
+        else:
+            codegen_start_time = time()
+            code = generate_code_for_kernels(kernels)
+            result["codegen_time"] = time() - codegen_start_time
+
+            output_dir = os.path.dirname(job["output"])
+            if output_dir and not os.path.isdir(output_dir):
+                try:
+                    os.makedirs(output_dir)
+                except OSError:
+                    # created concurrently by another job
+                    if not os.path.isdir(output_dir):
+                        raise
+
+            # Remove the hash first, so that an interrupted write is never
+            # mistaken for an up-to-date output.
+            if os.path.exists(job["output"] + HASH_FILE_SUFFIX):
+                os.unlink(job["output"] + HASH_FILE_SUFFIX)
+
+            with open(job["output"], "w") as outfile_fd:
+                outfile_fd.write(code)
+            with open(job["output"] + HASH_FILE_SUFFIX, "w") as hash_fd:
+                hash_fd.write(kernels_hash + "\n")
+
+            result["status"] = "generated"
+
+    except Exception:
+        from traceback import format_exc
+        result["status"] = "failed"
+        result["error"] = format_exc()
+
+    result["total_time"] = time() - start_time
+    return result
+
+
+def get_batch_jobs(parser, args):
+    """Return a list of the jobs (see :func:`run_batch_job`) for the input
+    files given by the parsed command line *args* of ``loopy batch``,
+    reporting errors through *parser*.
+    """
+    import os
+
+    entries = [(infile, {}) for infile in args.infiles]
+
+    if args.manifest is not None:
+        import json
+        with open(args.manifest, "r") as manifest_fd:
+            manifest = json.load(manifest_fd)
+
+        manifest_dir = os.path.dirname(os.path.abspath(args.manifest))
+
+        def from_manifest_dir(path):
+            if path is None:
+                return None
+            return os.path.join(manifest_dir, path)
+
+        for entry in manifest:
+            if isinstance(entry, six.string_types):
+                entry = {"input": entry}
+
+            entry = dict(entry)
+            for key in ["input", "output", "transform", "occa_defines"]:
+                if key in entry:
+                    entry[key] = from_manifest_dir(entry[key])
+
+            entries.append((entry.pop("input"), entry))
+
+    if not entries:
+        parser.error("no input files given")
+
+    jobs = []
+    outfiles = set()
+    for infile, entry in entries:
+        base_name, ext = os.path.splitext(infile)
+
+        lang = entry.get("lang", args.lang) or LANG_EXTENSIONS.get(ext)
+        if lang is None:
+            parser.error("unable to deduce input language of '%s' "
+                    "(wrong input file extension? --lang flag?)" % infile)
+
+        target = entry.get("target", args.target)
+        if target not in TARGET_NAMES:
+            parser.error("unknown target '%s' for '%s'" % (target, infile))
+
+        outfile = entry.get("output")
+        if outfile is None:
+            if args.output_dir is not None:
+                base_name = os.path.join(
+                        args.output_dir, os.path.basename(base_name))
+            outfile = base_name + TARGET_EXTENSIONS[target]
+
+        if os.path.abspath(outfile) in outfiles:
+            parser.error("more than one input file would be written "
+                    "to '%s'" % outfile)
+        outfiles.add(os.path.abspath(outfile))
+
+        jobs.append({
+            "input": infile,
+            "output": outfile,
+            "lang": lang,
+            "target": target,
+            "name": entry.get("name"),
+            "transform": entry.get("transform", args.transform),
+            "occa_defines": entry.get("occa_defines", args.occa_defines),
+            "occa_add_dummy_arg": entry.get(
+                "occa_add_dummy_arg", args.occa_add_dummy_arg),
+            "force": args.force,
+            })
+
+    return jobs
+
+
+def batch_main(argv):
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(prog="loopy batch",
+            description="Generate code for many input files at once, "
+            "using a pool of processes that share loopy's persistent cache. "
+            "Input files whose kernels are unchanged since their output was "
+            "generated are skipped.")
+    parser.add_argument("infiles", metavar="INPUT_FILE", nargs="*")
+    parser.add_argument("--manifest", metavar="MANIFEST_FILE",
+            help="A JSON file containing a list of input files. Instead of "
+            "a file name, an entry may be an object with an 'input' key and "
+            "optionally any of 'output', 'lang', 'target', 'name', "
+            "'transform', 'occa_defines' and 'occa_add_dummy_arg'. Paths are "
+            "relative to the directory of the manifest.")
+    parser.add_argument("--output-dir",
+            help="Defaults to the directory of each input file.")
+    parser.add_argument("--lang", metavar="LANGUAGE", help="loopy|fortran")
+    parser.add_argument("--target", choices=TARGET_NAMES, default="opencl")
+    parser.add_argument("--transform")
+    parser.add_argument("--occa-defines")
+    parser.add_argument("--occa-add-dummy-arg", action="store_true")
+    parser.add_argument("-j", "--jobs", type=int,
+            help="The number of processes. Defaults to the number of CPUs.")
+    parser.add_argument("--force", action="store_true",
+            help="Generate code even for unchanged input files.")
+    parser.add_argument("--report", metavar="REPORT_FILE",
+            help="Write the outcome and the time taken for each input file "
+            "to this file as JSON.")
+    args = parser.parse_args(argv)
+
+    jobs = get_batch_jobs(parser, args)
+
+    nprocesses = args.jobs
+    if nprocesses is None:
+        from multiprocessing import cpu_count
+        nprocesses = cpu_count()
+    nprocesses = max(1, min(nprocesses, len(jobs)))
+
+    from time import time
+    start_time = time()
+
+    results = []
+
+    def record(result):
+        results.append(result)
+        print("%-10s %s (%.2f s)" % (
+            result["status"], result["input"], result["total_time"]))
+        if result["status"] == "failed":
+            print(result["error"], file=sys.stderr)
+
+    if nprocesses > 1:
+        from multiprocessing import Pool
+        pool = Pool(nprocesses)
+        try:
+            for result in pool.imap(run_batch_job, jobs):
+                record(result)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for job in jobs:
+            record(run_batch_job(job))
+
+    total_time = time() - start_time
+
+    nfailed = sum(1 for result in results if result["status"] == "failed")
+    print("%d files: %d generated, %d skipped, %d failed (%.2f s)" % (
+        len(results),
+        sum(1 for result in results if result["status"] == "generated"),
+        sum(1 for result in results if result["status"] == "skipped"),
+        nfailed, total_time))
+
+    if args.report is not None:
+        import json
+        with open(args.report, "w") as report_fd:
+            json.dump({
+                "nprocesses": nprocesses,
+                "total_time": total_time,
+                "files": results,
+                }, report_fd, indent=2, sort_keys=True)
+
+    if nfailed:
+        sys.exit(1)
+
+# }}}
+
+
+SUBCOMMANDS = {
+        "cache": cache_main,
+        "batch": batch_main,
+        }
+
+
+def get_subcommand_main(argv):
+    """Return the function implementing the subcommand named by the first
+    of the command line arguments *argv*, or *None* if there is none. An
+    existing input file of the same name takes precedence over a subcommand.
+    """
+    if not argv or argv[0] not in SUBCOMMANDS:
+        return None
+
+    import os
+    if os.path.exists(argv[0]):
+        return None
+
+    return SUBCOMMANDS[argv[0]]
+
+
+def main():
+    subcommand_main = get_subcommand_main(sys.argv[1:])
+    if subcommand_main is not None:
+        return subcommand_main(sys.argv[2:])
+
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Stand-alone loopy frontend")
+
+    parser.add_argument("infile", metavar="INPUT_FILE")
+    parser.add_argument("outfile", default="-", metavar="OUTPUT_FILE",
+            help="Defaults to stdout ('-').", nargs='?')
+    parser.add_argument("--lang", metavar="LANGUAGE", help="loopy|fortran")
+    parser.add_argument("--target", choices=TARGET_NAMES, default="opencl")
+    parser.add_argument("--name")
+    parser.add_argument("--transform")
+    parser.add_argument("--edit-code", action="store_true")
+    parser.add_argument("--occa-defines")
+    parser.add_argument("--occa-add-dummy-arg", action="store_true")
+    parser.add_argument("--print-ir", action="store_true")
+    args = parser.parse_args()
+
+    lp.set_default_target(get_target(args.target))
+
+    lang = None
+    if args.infile == "-":
+        infile_content = sys.stdin.read()
+    else:
+        from os.path import splitext
+        _, ext = splitext(args.infile)
+
+        lang = LANG_EXTENSIONS.get(ext)
+        with open(args.infile, "r") as infile_fd:
+            infile_content = infile_fd.read()
+
+    if args.lang is not None:
+        lang = args.lang
+
+    if lang is None:
+        raise RuntimeError("unable to deduce input language "
+                "(wrong input file extension? --lang flag?)")
+
+    kernels = read_kernels(args.infile, infile_content, lang,
+            name=args.name, transform=args.transform,
+            occa_defines=args.occa_defines)
+
+    if args.print_ir:
+        for kernel in kernels:
+            print(kernel, file=sys.stderr)
+
+    if args.occa_add_dummy_arg:
+        kernels = add_occa_dummy_arg(kernels)
+
     if args.outfile is not None:
         outfile = args.outfile
     else:
         outfile = "-"
 
-    code = "\n\n".join(codes)
+    code = generate_code_for_kernels(kernels)
 
     # {{{ edit code if requested
 
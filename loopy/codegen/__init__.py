@@ -28,7 +28,7 @@ from loopy.diagnostic import LoopyError, warn
 from pytools import ImmutableRecord
 import islpy as isl
 
-from pytools.persistent_dict import WriteOncePersistentDict
+from loopy.caching import TieredCache
 from loopy.tools import LoopyKeyBuilder
 from loopy.version import DATA_MODEL_VERSION
 
@@ -357,10 +357,18 @@ class CodeGenerationState(object):
 # }}}
 
 
-code_gen_cache = WriteOncePersistentDict(
+code_gen_cache = TieredCache(
+         "code_gen",
          "loopy-code-gen-cache-v3-"+DATA_MODEL_VERSION,
          key_builder=LoopyKeyBuilder())
 
+# Holds the code generated for each CallKernel block of a schedule, see
+# :func:`loopy.codegen.control.generate_device_program`.
+device_program_cache = TieredCache(
+         "device_program",
+         "loopy-device-program-cache-v1-"+DATA_MODEL_VERSION,
+         key_builder=LoopyKeyBuilder())
+
 
 class PreambleInfo(ImmutableRecord):
     """
@@ -477,11 +485,10 @@ def generate_code_v2(kernel):
             codegen_state,
             schedule_index=0)
 
-    device_code_str = codegen_result.device_code()
-
-    from loopy.check import check_implemented_domains
-    assert check_implemented_domains(kernel, codegen_result.implemented_domains,
-            device_code_str)
+    from loopy.check import post_codegen_checks
+    verification_report = post_codegen_checks(kernel, codegen_result)
+    logger.info("%s: generate code: verification took %.3f s"
+            % (kernel.name, verification_report.total_time()))
 
     # {{{ handle preambles
 
@@ -32,6 +32,9 @@ from loopy.schedule import (
         gather_schedule_block, generate_sub_sched_items)
 from loopy.diagnostic import LoopyError
 
+import logging
+logger = logging.getLogger(__name__)
+
 
 def get_admissible_conditional_inames_for(codegen_state, sched_index):
     """This function disallows conditionals on local-idx tagged
@@ -89,6 +92,128 @@ def synthesize_idis_for_extra_args(kernel, schedule_index):
     return idis
 
 
+# {{{ device program generation
+
+_IDI_KEY_FIELDS = (
+        "name", "dtype", "arg_class", "base_name", "shape", "strides",
+        "unvec_shape", "unvec_strides", "offset_for_name",
+        "stride_for_name_and_axis", "allows_offset", "is_written")
+
+
+def _get_device_program_cache_key(codegen_state, sched_index, past_end_i):
+    """Return a key capturing everything that the device program generated
+    for the :class:`loopy.schedule.CallKernel` at *sched_index* depends on.
+
+    Rather than the whole kernel, this includes only the slice of the
+    schedule making up the subkernel, the instructions run within it and the
+    temporaries these access, so that changes elsewhere in the kernel leave
+    the key unchanged.
+    """
+    kernel = codegen_state.kernel
+
+    from loopy.schedule import get_insn_ids_for_block_at, find_active_inames_at
+    insn_ids = get_insn_ids_for_block_at(kernel.schedule, sched_index)
+
+    touched_vars = set(kernel.schedule[sched_index].extra_args)
+    touched_vars.update(kernel.all_params())
+    for insn_id in insn_ids:
+        touched_vars.update(kernel.id_to_insn[insn_id].dependency_names())
+
+    # Temporaries sharing storage are declared in every device program.
+    subkernel_temporaries = dict(
+            (name, tv)
+            for name, tv in six.iteritems(kernel.temporary_variables)
+            if name in touched_vars or tv.base_storage is not None)
+
+    subkernel = kernel.copy(
+            instructions=[
+                insn for insn in kernel.instructions if insn.id in insn_ids],
+            temporary_variables=subkernel_temporaries,
+            schedule=kernel.schedule[sched_index:past_end_i])
+
+    return (
+            subkernel,
+            # not among the fields hashed for the kernel
+            str(kernel.index_dtype),
+            tuple(
+                tuple(str(getattr(idi, field)) for field in _IDI_KEY_FIELDS)
+                for idi in codegen_state.implemented_data_info),
+            str(codegen_state.implemented_domain),
+            tuple(sorted(str(pred)
+                for pred in codegen_state.implemented_predicates)),
+            tuple(sorted(
+                (name, str(value))
+                for name, value in six.iteritems(codegen_state.var_subst_map))),
+            tuple(sorted(find_active_inames_at(kernel, sched_index))),
+            codegen_state.allow_complex,
+            codegen_state.gen_program_name,
+            codegen_state.schedule_index_end - sched_index)
+
+
+def generate_device_program(codegen_state, sched_index, past_end_i):
+    """Generate the device program for the :class:`loopy.schedule.CallKernel`
+    at *sched_index*, whose block ends before *past_end_i*.
+
+    The result is cached per subkernel, so that kernels differing only
+    outside of this subkernel reuse its generated code.
+
+    :returns: a :class:`loopy.codegen.result.CodeGenerationResult`
+    """
+    from loopy.codegen.result import generate_host_or_device_program
+    from loopy import CACHING_ENABLED
+
+    if not CACHING_ENABLED:
+        return generate_host_or_device_program(codegen_state, sched_index)
+
+    from loopy.codegen import device_program_cache
+    cache_key = _get_device_program_cache_key(
+            codegen_state, sched_index, past_end_i)
+
+    try:
+        codegen_result, seen_dtypes, seen_functions, seen_atomic_dtypes = \
+                device_program_cache[cache_key]
+    except KeyError:
+        # Record the types and functions used by this subkernel on its own,
+        # so that they can be replayed into the preamble information of
+        # kernels reusing it.
+        device_codegen_state = codegen_state.copy()
+        device_codegen_state.seen_dtypes = seen_dtypes = set()
+        device_codegen_state.seen_functions = seen_functions = set()
+        device_codegen_state.seen_atomic_dtypes = seen_atomic_dtypes = set()
+
+        codegen_result = generate_host_or_device_program(
+                device_codegen_state, sched_index)
+
+        # Types recorded during code generation need not know their target,
+        # which they need to be pickled.
+        target = codegen_state.kernel.target
+
+        def with_target(dtype):
+            return dtype.with_target(target) if dtype is not None else None
+
+        device_program_cache.store_if_not_present(cache_key, (
+                codegen_result,
+                set(with_target(dtype) for dtype in seen_dtypes),
+                set(
+                    seen_func.copy(arg_dtypes=(
+                        tuple(with_target(dtype)
+                            for dtype in seen_func.arg_dtypes)
+                        if seen_func.arg_dtypes is not None else None))
+                    for seen_func in seen_functions),
+                set(with_target(dtype) for dtype in seen_atomic_dtypes)))
+    else:
+        logger.debug("%s: device program cache hit for '%s'"
+                % (codegen_state.kernel.name, codegen_state.gen_program_name))
+
+    codegen_state.seen_dtypes.update(seen_dtypes)
+    codegen_state.seen_functions.update(seen_functions)
+    codegen_state.seen_atomic_dtypes.update(seen_atomic_dtypes)
+
+    return codegen_result
+
+# }}}
+
+
 def generate_code_for_sched_index(codegen_state, sched_index):
     kernel = codegen_state.kernel
     sched_item = kernel.schedule[sched_index]
@@ -109,9 +234,8 @@ def generate_code_for_sched_index(codegen_state, sched_index):
                 implemented_data_info=(codegen_state.implemented_data_info
                     + extra_args))
 
-        from loopy.codegen.result import generate_host_or_device_program
-        codegen_result = generate_host_or_device_program(
-                new_codegen_state, sched_index)
+        codegen_result = generate_device_program(
+                new_codegen_state, sched_index, past_end_i)
 
         glob_grid, loc_grid = kernel.get_grid_sizes_for_insn_ids_as_exprs(
                 get_insn_ids_for_block_at(kernel.schedule, sched_index))
@@ -25,6 +25,10 @@ THE SOFTWARE.
 """
 
 
+import os
+import threading
+from collections import OrderedDict
+
 from six.moves import range, zip
 
 from loopy.diagnostic import StaticValueFindingError
@@ -33,6 +37,136 @@ import islpy as isl
 from islpy import dim_type
 
 
+# {{{ process-wide operation cache
+
+def _get_isl_cache_key(obj):
+    if isinstance(obj, (list, tuple)):
+        return tuple(_get_isl_cache_key(item) for item in obj)
+    elif hasattr(obj, "get_ctx"):
+        # an islpy object
+        return (type(obj).__name__, str(obj))
+    else:
+        return obj
+
+
+class ISLOperationCache(object):
+    """A size-bounded cache of the results of operations on :mod:`islpy`
+    objects, shared by all kernels in the process. :mod:`islpy` objects
+    among the arguments of an operation are keyed by their type and string
+    representation, so that equal objects created independently (for
+    instance, by different kernels) share results. The least recently used
+    entries are evicted first.
+
+    The maximum number of entries defaults to the value of the environment
+    variable :envvar:`LOOPY_ISL_CACHE_SIZE`, or 4096 if that is not set. Usage
+    statistics are reported by :func:`loopy.get_cache_stats` under
+    :attr:`name`, with all hits counted as
+    :attr:`loopy.caching.CacheStats.memory_hits`.
+
+    .. attribute:: name
+    .. attribute:: max_entries
+
+    .. automethod:: __call__
+    .. automethod:: set_max_entries
+    .. automethod:: clear
+    .. automethod:: get_stats
+    """
+
+    name = "isl_operations"
+
+    def __init__(self, max_entries):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+        self._reset_stats()
+
+        from loopy.caching import _register_cache
+        _register_cache(self)
+
+    def _reset_stats(self):
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _store(self, key, entry):
+        with self.lock:
+            if not self.max_entries:
+                return
+
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self._evictions += 1
+
+    def __call__(self, op_name, op, args, cached_exceptions=()):
+        """Return ``op(*args)``, from the cache if an operation named
+        *op_name* was performed on equal *args* before.
+
+        :arg cached_exceptions: a tuple of exception types that, when raised
+            by *op*, are remembered and raised again on subsequent calls.
+        """
+        key = (op_name, _get_isl_cache_key(args))
+
+        with self.lock:
+            try:
+                is_exception, result = self.entries.pop(key)
+            except KeyError:
+                self._misses += 1
+            else:
+                # move to the most-recently-used end
+                self.entries[key] = (is_exception, result)
+                self._hits += 1
+
+                if is_exception:
+                    raise type(result)(*result.args)
+                return result
+
+        try:
+            result = op(*args)
+        except cached_exceptions as e:
+            self._store(key, (True, e))
+            raise
+
+        self._store(key, (False, result))
+        return result
+
+    def set_max_entries(self, max_entries):
+        """Set :attr:`max_entries`, evicting excess entries immediately. Zero
+        disables the cache.
+        """
+        if max_entries < 0:
+            raise ValueError("max_entries must be non-negative")
+
+        with self.lock:
+            self.max_entries = max_entries
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self):
+        """
+        :returns: a :class:`loopy.caching.CacheStats`
+        """
+        from loopy.caching import CacheStats
+        return CacheStats(
+                memory_hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions)
+
+
+isl_operation_cache = ISLOperationCache(
+        max_entries=int(os.environ.get("LOOPY_ISL_CACHE_SIZE", 4096)))
+
+# }}}
+
+
 def pw_aff_to_aff(pw_aff):
     if isinstance(pw_aff, isl.Aff):
         return pw_aff
@@ -255,19 +389,31 @@ def static_extremum_of_pw_aff(pw_aff, constants_only, set_method, what, context)
             % (what, pw_aff))
 
 
+def _cached_static_extremum_of_pw_aff(
+        pw_aff, constants_only, set_method, what, context):
+    def find_extremum(pw_aff, constants_only, context):
+        return static_extremum_of_pw_aff(
+                pw_aff, constants_only, set_method, what, context)
+
+    return isl_operation_cache(
+            "static_%s_of_pw_aff" % what, find_extremum,
+            (pw_aff, constants_only, context),
+            cached_exceptions=(StaticValueFindingError,))
+
+
 def static_min_of_pw_aff(pw_aff, constants_only, context=None):
-    return static_extremum_of_pw_aff(pw_aff, constants_only, isl.PwAff.ge_set,
-            "minimum", context)
+    return _cached_static_extremum_of_pw_aff(pw_aff, constants_only,
+            isl.PwAff.ge_set, "minimum", context)
 
 
 def static_max_of_pw_aff(pw_aff, constants_only, context=None):
-    return static_extremum_of_pw_aff(pw_aff, constants_only, isl.PwAff.le_set,
-            "maximum", context)
+    return _cached_static_extremum_of_pw_aff(pw_aff, constants_only,
+            isl.PwAff.le_set, "maximum", context)
 
 
 def static_value_of_pw_aff(pw_aff, constants_only, context=None):
-    return static_extremum_of_pw_aff(pw_aff, constants_only, isl.PwAff.eq_set,
-            "value", context)
+    return _cached_static_extremum_of_pw_aff(pw_aff, constants_only,
+            isl.PwAff.eq_set, "value", context)
 
 # }}}
 
@@ -381,6 +527,14 @@ def convexify(domain):
 # {{{ boxify
 
 def boxify(cache_manager, domain, box_inames, context):
+    def boxify_uncached(domain, box_inames, context):
+        return _boxify(cache_manager, domain, box_inames, context)
+
+    return isl_operation_cache("boxify", boxify_uncached,
+            (domain, tuple(box_inames), context))
+
+
+def _boxify(cache_manager, domain, box_inames, context):
     var_dict = domain.get_var_dict(dim_type.set)
     box_iname_indices = [var_dict[iname][1] for iname in box_inames]
     n_nonbox_inames = min(box_iname_indices)
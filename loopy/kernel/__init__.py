@@ -44,6 +44,56 @@ from loopy.tools import natsorted
 from loopy.diagnostic import StaticValueFindingError
 
 
+# {{{ memoization shared between kernels with the same domains
+
+def memoize_on_domains(extra_key=None):
+    """Like :func:`pytools.memoize_method`, but for methods of
+    :class:`LoopKernel` whose results depend mostly on
+    :attr:`LoopKernel.domains`. Results are shared among all kernels with the
+    same (as in identical) domains that share a
+    :attr:`LoopKernel.cache_manager`, i.e. that were derived from one another
+    by :meth:`LoopKernel.copy`.
+
+    :arg extra_key: a function of the kernel returning a hashable value
+        capturing everything else the result depends on.
+    """
+
+    def decorator(method):
+        method_name = method.__name__
+
+        def wrapper(self, *args, **kwargs):
+            key = (method_name, args)
+            if kwargs:
+                key += (frozenset(six.iteritems(kwargs)),)
+            if extra_key is not None:
+                key += (extra_key(self),)
+
+            cache = self._get_domain_query_cache()
+            try:
+                return cache[key]
+            except KeyError:
+                result = method(self, *args, **kwargs)
+                cache[key] = result
+                return result
+
+        from functools import update_wrapper
+        return update_wrapper(wrapper, method)
+
+    return decorator
+
+
+def _get_domain_nesting_key(kernel):
+    return kernel._get_data_dependent_domain_key()
+
+
+def _get_domain_bounds_key(kernel):
+    from loopy.kernel.tools import _IdentityKey
+    return (kernel._get_data_dependent_domain_key(),
+            _IdentityKey(kernel.assumptions))
+
+# }}}
+
+
 # {{{ unique var names
 
 class _UniqueVarNameGenerator(UniqueNameGenerator):
@@ -295,6 +345,7 @@ class LoopKernel(ImmutableRecordWithoutPickling):
                 _cached_written_variables=_cached_written_variables)
 
         self._kernel_executor_cache = {}
+        self._hash_field_digests = {}
 
     # }}}
 
@@ -428,6 +479,30 @@ class LoopKernel(ImmutableRecordWithoutPickling):
     # {{{ domain wrangling
 
     @memoize_method
+    def _get_domain_query_cache(self):
+        return self.cache_manager.get_domain_query_cache(self.domains)
+
+    @memoize_method
+    def _get_data_dependent_domain_key(self):
+        """Return a hashable value capturing what the nesting of
+        :attr:`domains` depends on beyond the domains themselves: the inames
+        of the instructions writing parameters of the domains that are
+        temporary variables.
+        """
+        data_dependent_params = sorted(
+                par for par in self.all_params()
+                if par in self.temporary_variables)
+        if not data_dependent_params:
+            return ()
+
+        writer_map = self.writer_map()
+        return tuple(
+                (par, frozenset(
+                    self.insn_inames(insn_id)
+                    for insn_id in writer_map.get(par, ())))
+                for par in data_dependent_params)
+
+    @memoize_on_domains(extra_key=_get_domain_nesting_key)
     def parents_per_domain(self):
         """Return a list corresponding to self.domains (by index)
         containing domain indices which are nested around this
@@ -491,7 +566,7 @@ class LoopKernel(ImmutableRecordWithoutPickling):
 
         return result
 
-    @memoize_method
+    @memoize_on_domains(extra_key=_get_domain_nesting_key)
     def all_parents_per_domain(self):
         """Return a list corresponding to self.domains (by index)
         containing domain indices which are nested around this
@@ -514,7 +589,7 @@ class LoopKernel(ImmutableRecordWithoutPickling):
 
         return result
 
-    @memoize_method
+    @memoize_on_domains()
     def _get_home_domain_map(self):
         return dict(
                 (iname, i_domain)
@@ -531,7 +606,7 @@ class LoopKernel(ImmutableRecordWithoutPickling):
 
         assert False
 
-    @memoize_method
+    @memoize_on_domains()
     def combine_domains(self, domains):
         """
         :arg domains: domain indices of domains to be combined. More 'dominant'
@@ -570,7 +645,7 @@ class LoopKernel(ImmutableRecordWithoutPickling):
 
         return self._get_inames_domain_backend(inames)
 
-    @memoize_method
+    @memoize_on_domains(extra_key=_get_domain_nesting_key)
     def get_leaf_domain_indices(self, inames):
         """Find the leaves of the domain tree needed to cover all inames.
 
@@ -616,7 +691,7 @@ class LoopKernel(ImmutableRecordWithoutPickling):
 
         return list(root_to_leaf.values())
 
-    @memoize_method
+    @memoize_on_domains(extra_key=_get_domain_nesting_key)
     def _get_inames_domain_backend(self, inames):
         domain_indices = set()
         for leaf_dom_idx in self.get_leaf_domain_indices(inames):
@@ -629,7 +704,7 @@ class LoopKernel(ImmutableRecordWithoutPickling):
 
     # {{{ iname wrangling
 
-    @memoize_method
+    @memoize_on_domains()
     def all_inames(self):
         result = set()
         for dom in self.domains:
@@ -637,7 +712,7 @@ class LoopKernel(ImmutableRecordWithoutPickling):
                     intern(n) for n in dom.get_var_names(dim_type.set))
         return frozenset(result)
 
-    @memoize_method
+    @memoize_on_domains()
     def all_params(self):
         all_inames = self.all_inames()
 
@@ -871,7 +946,7 @@ class LoopKernel(ImmutableRecordWithoutPickling):
 
     # {{{ bounds finding
 
-    @memoize_method
+    @memoize_on_domains(extra_key=_get_domain_bounds_key)
     def get_iname_bounds(self, iname, constants_only=False):
         domain = self.get_inames_domain(frozenset([iname]))
 
@@ -909,7 +984,7 @@ class LoopKernel(ImmutableRecordWithoutPickling):
                 upper_bound_pw_aff=upper_bound_pw_aff,
                 size=size)
 
-    @memoize_method
+    @memoize_on_domains(extra_key=_get_domain_bounds_key)
     def get_constant_iname_length(self, iname):
         from loopy.isl_helpers import static_max_of_pw_aff
         from loopy.symbolic import aff_to_expr
@@ -1306,10 +1381,11 @@ class LoopKernel(ImmutableRecordWithoutPickling):
         from loopy.tools import LoopyKeyBuilder
         LoopyKeyBuilder()(self)
 
-        return (result, self._pytools_persistent_hash_digest)
+        return (result, self._pytools_persistent_hash_digest,
+                self._hash_field_digests)
 
     def __setstate__(self, state):
-        attribs, p_hash_digest = state
+        attribs, p_hash_digest, hash_field_digests = state
 
         new_fields = set()
 
@@ -1331,6 +1407,8 @@ class LoopKernel(ImmutableRecordWithoutPickling):
         else:
             self._pytools_persistent_hash_digest = p_hash_digest
 
+        self._hash_field_digests = hash_field_digests
+
         from loopy.kernel.tools import SetOperationCacheManager
         self.cache_manager = SetOperationCacheManager()
         self._kernel_executor_cache = {}
@@ -1381,8 +1459,32 @@ class LoopKernel(ImmutableRecordWithoutPickling):
 
         Only works in conjunction with :class:`loopy.tools.KeyBuilder`.
         """
+        # The digest of each field is remembered, and carried over by
+        # :meth:`copy` for fields that were not changed, so that hashing a
+        # modified copy of a kernel only needs to hash the modified fields.
+
+        from pytools.persistent_dict import new_hash
+
         for field_name in self.hash_fields:
-            key_builder.rec(key_hash, getattr(self, field_name))
+            try:
+                digest = self._hash_field_digests[field_name]
+            except KeyError:
+                field_key_hash = new_hash()
+                key_builder.rec(field_key_hash, getattr(self, field_name))
+                digest = field_key_hash.digest()
+                self._hash_field_digests[field_name] = digest
+
+            key_hash.update(digest)
+
+    def copy(self, **kwargs):
+        result = super(LoopKernel, self).copy(**kwargs)
+
+        result._hash_field_digests = dict(
+                (field_name, digest)
+                for field_name, digest in six.iteritems(self._hash_field_digests)
+                if field_name not in kwargs)
+
+        return result
 
     def __hash__(self):
         from loopy.tools import LoopyKeyBuilder
@@ -1967,8 +1967,8 @@ def make_kernel(domains, instructions, kernel_data=["..."], **kwargs):
                 DeprecationWarning, stacklevel=2)
 
     if target is None:
-        from loopy import _DEFAULT_TARGET
-        target = _DEFAULT_TARGET
+        from loopy import _get_default_target
+        target = _get_default_target()
 
     if flags is not None:
         if options is not None:
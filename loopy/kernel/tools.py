@@ -299,24 +299,67 @@ def find_all_insn_inames(kernel):
 
 # {{{ set operation cache
 
+class _IdentityKey(object):
+    """Makes *obj* usable as (part of) a dictionary key compared by identity,
+    and keeps it alive as long as the key is.
+    """
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __hash__(self):
+        return id(self.obj)
+
+    def __eq__(self, other):
+        return self.obj is other.obj
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
 class SetOperationCacheManager:
+    """Caches shared by a kernel and the kernels derived from it by
+    :meth:`loopy.LoopKernel.copy`. Results of ISL set operations are kept in
+    :data:`loopy.isl_helpers.isl_operation_cache`, which is shared by all
+    kernels in the process.
+    """
+
+    # number of distinct lists of domains for which query results are kept
+    max_domain_query_caches = 32
+
     def __init__(self):
-        # mapping: set hash -> [(set, op, args, result)]
-        self.cache = {}
+        # Shared by all kernels derived from the one that created this
+        # object, see loopy.type_inference.infer_unknown_types.
+        self.type_inference_cache = {}
+
+        # mapping: tuple of domains (compared by identity) -> query cache,
+        # in order of creation, see loopy.kernel.memoize_on_domains.
+        self.domain_query_caches = {}
+        self.domain_query_cache_keys = []
+
+    def get_domain_query_cache(self, domains):
+        """Return a :class:`dict` for memoizing the results of queries on the
+        sequence of ISL sets *domains*, shared with all callers passing the
+        same (as in identical) sets.
+        """
+        key = tuple(_IdentityKey(dom) for dom in domains)
 
-    def op(self, set, op_name, op, args):
-        hashval = hash(set)
-        bucket = self.cache.setdefault(hashval, [])
+        try:
+            return self.domain_query_caches[key]
+        except KeyError:
+            pass
 
-        for bkt_set, bkt_op, bkt_args, result in bucket:
-            if set.plain_is_equal(bkt_set) and op == bkt_op and args == bkt_args:
-                return result
+        if len(self.domain_query_cache_keys) >= self.max_domain_query_caches:
+            del self.domain_query_caches[self.domain_query_cache_keys.pop(0)]
 
-        #print op, set.get_dim_name(dim_type.set, args[0])
-        result = op(set, *args)
-        bucket.append((set, op_name, args, result))
+        result = self.domain_query_caches[key] = {}
+        self.domain_query_cache_keys.append(key)
         return result
 
+    def op(self, set, op_name, op, args):
+        from loopy.isl_helpers import isl_operation_cache
+        return isl_operation_cache(op_name, op, (set,) + tuple(args))
+
     def dim_min(self, set, *args):
         if set.plain_is_empty():
             raise LoopyError("domain '%s' is empty" % set)
@@ -338,6 +381,15 @@ class SetOperationCacheManager:
             argument so that only the first that many params
             (in the domain of *set*) occur.
         """
+        from loopy.diagnostic import StaticValueFindingError
+        from loopy.isl_helpers import isl_operation_cache
+        return isl_operation_cache(
+                "base_index_and_length", self._base_index_and_length,
+                (set, iname, context, n_allowed_params_in_length),
+                cached_exceptions=(StaticValueFindingError,))
+
+    def _base_index_and_length(self, set, iname, context,
+            n_allowed_params_in_length):
         if not isinstance(iname, int):
             iname_to_dim = set.space.get_var_dict()
             idx = iname_to_dim[iname][1]
@@ -121,6 +121,29 @@ class Options(ImmutableRecord):
 
         Defaults to *True*.
 
+    .. attribute:: c_exec_fast_call
+
+        Within the C executor, remember how the arguments of calls were
+        checked and converted, and when called again with arrays of the same
+        shape, strides and data type and with the same scalars, call the
+        compiled kernels directly, passing the data of the new arrays. Only
+        the argument signatures of the most recent calls are remembered, and
+        no references to the arrays are kept. Calls passing positional
+        arguments and calls in which loopy allocates outputs are not
+        remembered.
+
+        Defaults to *False*.
+
+    .. attribute:: c_exec_reuse_outputs
+
+        Within the C executor, keep the output arrays allocated by loopy
+        and return them again from later calls in which they would be
+        allocated with the same shape and data type, instead of allocating
+        new arrays. The results of a call are thus overwritten by the next
+        call.
+
+        Defaults to *False*.
+
     .. attribute:: return_dict
 
         Have kernels return a :class:`dict` instead of a tuple as
@@ -172,6 +195,46 @@ class Options(ImmutableRecord):
         to variables.
 
         If equal to ``"no_check"``, then no check is performed.
+
+    .. attribute:: rank_schedule_candidates
+
+        An integer. If positive, :func:`loopy.get_one_scheduled_kernel`
+        generates up to this many schedules and picks the one ranked best by
+        :func:`loopy.get_best_scheduled_kernels`, rather than the first one
+        found. Defaults to 0.
+
+    .. attribute:: check_level
+
+        Selects which of the checks run by
+        :func:`loopy.check.pre_schedule_checks`,
+        :func:`loopy.check.pre_codegen_checks` and
+        :func:`loopy.check.post_codegen_checks` are performed. One of
+        ``"none"``, ``"cheap"`` (skip checks that require substantial
+        :mod:`islpy` or dependency graph computations) and ``"full"``.
+        Defaults to *None*, which is equivalent to ``"full"``.
+        See :class:`loopy.check.CheckReport` for how to find out the time
+        the checks take.
+
+    .. attribute:: check_processes
+
+        An integer. If greater than 1, :func:`loopy.check.pre_schedule_checks`
+        runs its checks concurrently in this many worker processes, to which
+        the kernel is sent by :mod:`pickle`. Defaults to 0.
+
+    .. attribute:: codegen_verification
+
+        Selects how :func:`loopy.check.post_codegen_checks` verifies that the
+        generated code covers exactly the domain of each instruction. One of
+        ``"off"``, ``"sampled"`` (verify only a fixed subset of the
+        instructions, of size :attr:`codegen_verification_sample_size`) and
+        ``"full"``. Defaults to *None*, which is equivalent to ``"full"`` at
+        check level ``"full"`` and to ``"off"`` otherwise. The time taken is
+        reported as that of ``check_implemented_domains`` in the
+        :class:`loopy.check.CheckReport` of stage ``"post_codegen"``.
+
+    .. attribute:: codegen_verification_sample_size
+
+        An integer. Defaults to 16.
     """
 
     _legacy_options_map = {
@@ -216,6 +279,8 @@ class Options(ImmutableRecord):
                 skip_arg_checks=kwargs.get("skip_arg_checks", False),
                 no_numpy=kwargs.get("no_numpy", False),
                 cl_exec_manage_array_events=kwargs.get("no_numpy", True),
+                c_exec_fast_call=kwargs.get("c_exec_fast_call", False),
+                c_exec_reuse_outputs=kwargs.get("c_exec_reuse_outputs", False),
                 return_dict=kwargs.get("return_dict", False),
                 write_wrapper=kwargs.get("write_wrapper", False),
                 write_code=kwargs.get("write_code", False),
@@ -229,6 +294,13 @@ class Options(ImmutableRecord):
 
                 enforce_variable_access_ordered=kwargs.get(
                     "enforce_variable_access_ordered", False),
+                rank_schedule_candidates=kwargs.get(
+                    "rank_schedule_candidates", 0),
+                check_level=kwargs.get("check_level", None),
+                check_processes=kwargs.get("check_processes", 0),
+                codegen_verification=kwargs.get("codegen_verification", None),
+                codegen_verification_sample_size=kwargs.get(
+                    "codegen_verification_sample_size", 16),
                 )
 
     # {{{ legacy compatibility
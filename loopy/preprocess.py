@@ -30,7 +30,7 @@ from loopy.diagnostic import (
 
 import islpy as isl
 
-from pytools.persistent_dict import WriteOncePersistentDict
+from loopy.caching import TieredCache
 
 from loopy.tools import LoopyKeyBuilder
 from loopy.version import DATA_MODEL_VERSION
@@ -2116,7 +2116,8 @@ def check_atomic_loads(kernel):
 # }}}
 
 
-preprocess_cache = WriteOncePersistentDict(
+preprocess_cache = TieredCache(
+        "preprocess",
         "loopy-preprocess-cache-v2-"+DATA_MODEL_VERSION,
         key_builder=LoopyKeyBuilder())
 
@@ -31,8 +31,8 @@ from loopy.diagnostic import warn_with_kernel, LoopyError  # noqa
 
 from pytools import MinRecursionLimit, ProcessLogger
 
-from pytools.persistent_dict import WriteOncePersistentDict
-from loopy.tools import LoopyKeyBuilder
+from loopy.caching import TieredCache
+from loopy.tools import LoopyKeyBuilder, PersistentSet
 from loopy.version import DATA_MODEL_VERSION
 
 import logging
@@ -500,13 +500,131 @@ def dump_schedule(kernel, schedule):
             for i, line in enumerate(lines))
 
 
+class ScheduleStatistics(object):
+    """Instrumentation data gathered during one run of the scheduler, see
+    :func:`loopy.profile_scheduling`.
+
+    .. attribute:: nodes_visited
+
+        The number of scheduler states that were expanded during the search.
+
+    .. attribute:: schedules_found
+
+    .. attribute:: dead_ends
+
+        The number of scheduler states from which no schedule item could be
+        added, i.e. from which the search had to backtrack.
+
+    .. attribute:: rejections_by_reason
+
+        A mapping from one of :attr:`REASONS` to the number of times an
+        instruction that was considered for scheduling was turned down for
+        that reason.
+
+    .. attribute:: backtracks_by_reason
+
+        A mapping from one of :attr:`REASONS` to the number of dead ends at
+        which at least one instruction was blocked for that reason.
+
+    .. attribute:: insn_backtrack_counts
+
+        A mapping from instruction IDs to the number of dead ends at which
+        the instruction was blocked.
+
+    .. attribute:: phase_times
+
+        A mapping from phase names (``"search"``, ``"insert_barriers"``,
+        ``"device_mapping"``) to the wall time in seconds spent in them.
+
+    .. attribute:: REASONS
+
+        The reasons for which an instruction may be rejected:
+
+        * ``"dependency"``: Not all of its dependencies have been scheduled.
+        * ``"loop_nest"``: The active loops do not match its inames.
+        * ``"barrier"``: Global barriers or subkernel boundaries do not
+          currently allow it.
+        * ``"group_conflict"``: It conflicts with an active instruction group.
+        * ``"preschedule"``: Another prescheduled item must come first.
+
+    .. automethod:: most_backtracked_insns
+    """
+
+    REASONS = (
+            "dependency", "loop_nest", "barrier", "group_conflict",
+            "preschedule")
+
+    def __init__(self):
+        self.nodes_visited = 0
+        self.schedules_found = 0
+        self.dead_ends = 0
+        self.rejections_by_reason = dict((r, 0) for r in self.REASONS)
+        self.backtracks_by_reason = dict((r, 0) for r in self.REASONS)
+        self.insn_backtrack_counts = {}
+        self.phase_times = {
+                "search": 0,
+                "insert_barriers": 0,
+                "device_mapping": 0}
+
+    def log_rejection(self, step_rejections, reason, insn_id):
+        self.rejections_by_reason[reason] += 1
+        step_rejections.setdefault(reason, set()).add(insn_id)
+
+    def log_dead_end(self, step_rejections):
+        self.dead_ends += 1
+
+        blocked_insn_ids = set()
+        for reason, insn_ids in six.iteritems(step_rejections):
+            self.backtracks_by_reason[reason] += 1
+            blocked_insn_ids.update(insn_ids)
+
+        for insn_id in blocked_insn_ids:
+            self.insn_backtrack_counts[insn_id] = (
+                    self.insn_backtrack_counts.get(insn_id, 0) + 1)
+
+    def add_phase_time(self, phase, elapsed):
+        self.phase_times[phase] = self.phase_times.get(phase, 0) + elapsed
+
+    def most_backtracked_insns(self, n=10):
+        """Return a list of up to *n* tuples ``(insn_id, count)`` of the
+        instructions blocked at the most dead ends, in descending order of
+        *count*.
+        """
+        return sorted(
+                six.iteritems(self.insn_backtrack_counts),
+                key=lambda id_and_count: (-id_and_count[1], id_and_count[0]))[:n]
+
+    def __str__(self):
+        lines = [
+                "nodes visited: %d" % self.nodes_visited,
+                "schedules found: %d" % self.schedules_found,
+                "dead ends: %d" % self.dead_ends,
+                "rejections (backtracks) by reason:"]
+        for reason in self.REASONS:
+            lines.append("    %s: %d (%d)" % (
+                reason,
+                self.rejections_by_reason[reason],
+                self.backtracks_by_reason[reason]))
+
+        lines.append("time by phase:")
+        for phase, elapsed in sorted(six.iteritems(self.phase_times)):
+            lines.append("    %s: %.3f s" % (phase, elapsed))
+
+        lines.append("most backtracked instructions:")
+        for insn_id, count in self.most_backtracked_insns():
+            lines.append("    %s: %d" % (insn_id, count))
+
+        return "\n".join(lines)
+
+
 class ScheduleDebugger:
-    def __init__(self, debug_length=None, interactive=True):
+    def __init__(self, debug_length=None, interactive=True, statistics=None):
         self.longest_rejected_schedule = []
         self.success_counter = 0
         self.dead_end_counter = 0
         self.debug_length = debug_length
         self.interactive = interactive
+        self.statistics = statistics
 
         self.elapsed_store = 0
         self.start()
@@ -608,6 +726,20 @@ class SchedulerState(ImmutableRecord):
 
     .. attribute:: unscheduled_insn_ids
 
+    .. attribute:: dep_satisfied_insn_ids
+
+        The unscheduled instructions all of whose dependencies have been
+        scheduled.
+
+        This and the previous two attributes are instances of
+        :class:`loopy.tools.PersistentSet`, so that scheduling an
+        instruction does not require copying them.
+
+    .. attribute:: insn_ids_to_try
+
+        *None* or an instance of :class:`_InsnIdsToTry` giving the order
+        in which instructions are considered for scheduling.
+
     .. attribute:: preschedule
 
         A sequence of schedule items that must be inserted into the
@@ -630,6 +762,11 @@ class SchedulerState(ImmutableRecord):
 
         Whether the scheduler is inside a subkernel
 
+    .. attribute:: insn_id_to_dependents
+
+        A mapping from instruction IDs to the IDs of instructions that
+        depend on them.
+
     .. attribute:: group_insn_counts
 
         A mapping from instruction group names to the number of instructions
@@ -655,11 +792,141 @@ class SchedulerState(ImmutableRecord):
             return None
 
 
+class _InsnIdsToTry(object):
+    """The order in which the scheduler considers instructions: first the
+    unscheduled ones among :attr:`sorted_insn_ids`, then those in :attr:`tail`.
+
+    .. attribute:: sorted_insn_ids
+
+        A :class:`tuple` of the IDs of the instructions that were unscheduled
+        and not prescheduled when this order was determined, sorted by
+        decreasing priority.
+
+    .. attribute:: insn_id_to_rank
+
+        A mapping from each ID in :attr:`sorted_insn_ids` to its index.
+
+    .. attribute:: start
+
+        All instructions in ``sorted_insn_ids[:start]`` are known to have
+        been scheduled.
+
+    .. attribute:: tail
+
+        A :class:`list` of the IDs of prescheduled instructions.
+    """
+
+    def __init__(self, sorted_insn_ids, insn_id_to_rank, start, tail):
+        self.sorted_insn_ids = sorted_insn_ids
+        self.insn_id_to_rank = insn_id_to_rank
+        self.start = start
+        self.tail = tail
+
+    def gen_insn_ids(self, sched_state, include_unmet_deps):
+        """Generate the IDs of the unscheduled instructions in
+        :attr:`sorted_insn_ids` (skipping those with unscheduled dependencies,
+        unless *include_unmet_deps* is *True*), followed by :attr:`tail`.
+        """
+        unscheduled_insn_ids = sched_state.unscheduled_insn_ids
+        sorted_insn_ids = self.sorted_insn_ids
+
+        start = self.start
+        while (start < len(sorted_insn_ids)
+                and sorted_insn_ids[start] not in unscheduled_insn_ids):
+            start += 1
+        self.start = start
+
+        if include_unmet_deps:
+            for i in six.moves.range(start, len(sorted_insn_ids)):
+                if sorted_insn_ids[i] in unscheduled_insn_ids:
+                    yield sorted_insn_ids[i]
+
+        else:
+            dep_satisfied_insn_ids = sched_state.dep_satisfied_insn_ids
+
+            if 8*len(dep_satisfied_insn_ids) < len(sorted_insn_ids) - start:
+                # Few instructions are ready: sorting them is cheaper than
+                # scanning over the ones that are not.
+                insn_id_to_rank = self.insn_id_to_rank
+                for insn_id in sorted(
+                        (insn_id
+                            for insn_id in dep_satisfied_insn_ids
+                            if insn_id in insn_id_to_rank),
+                        key=insn_id_to_rank.__getitem__):
+                    yield insn_id
+
+            else:
+                for i in six.moves.range(start, len(sorted_insn_ids)):
+                    if sorted_insn_ids[i] in dep_satisfied_insn_ids:
+                        yield sorted_insn_ids[i]
+
+        for insn_id in self.tail:
+            yield insn_id
+
+
+class _SubSearch(object):
+    """Yielded by :func:`_generate_loop_schedules_step` to request that all
+    schedules that extend :attr:`sched_state` be generated before it is
+    resumed.
+
+    .. attribute:: sched_state
+
+    .. attribute:: allow_boost
+
+    .. attribute:: found_schedule
+
+        Set to *True* once a schedule has been found by the sub-search.
+    """
+
+    def __init__(self, sched_state, allow_boost):
+        self.sched_state = sched_state
+        self.allow_boost = allow_boost
+        self.found_schedule = False
+
+
 def generate_loop_schedules_internal(
         sched_state, allow_boost=False, debug=None):
+    """Generate all schedules that extend *sched_state*, as tuples of
+    schedule items.
+
+    The depth-first search over schedules is carried out by a stack of
+    :func:`_generate_loop_schedules_step` generators, one per schedule item
+    being tried, rather than by recursion. This keeps the Python stack
+    shallow regardless of the length of the schedule.
+    """
+
+    stack = [(_generate_loop_schedules_step(sched_state, allow_boost, debug),
+        None)]
+
+    while stack:
+        try:
+            result = next(stack[-1][0])
+        except StopIteration:
+            stack.pop()
+            continue
+
+        if isinstance(result, _SubSearch):
+            stack.append((
+                _generate_loop_schedules_step(
+                    result.sched_state, result.allow_boost, debug),
+                result))
+        else:
+            for _, sub_search in stack:
+                if sub_search is not None:
+                    sub_search.found_schedule = True
+
+            yield result
+
+
+def _generate_loop_schedules_step(sched_state, allow_boost, debug):
+    """Try all ways of extending the schedule in *sched_state* by one item.
+    Yields :class:`_SubSearch` instances for the resulting scheduler states
+    and, if *sched_state* is a complete schedule, the schedule itself.
+    """
     # allow_insn is set to False initially and after entering each loop
     # to give loops containing high-priority instructions a chance.
     kernel = sched_state.kernel
+    id_to_insn = kernel.id_to_insn
     Fore = kernel.options._fore  # noqa
     Style = kernel.options._style  # noqa
 
@@ -712,34 +979,39 @@ def generate_loop_schedules_internal(
 
     # }}}
 
+    stats = debug.statistics if debug is not None else None
+    if stats is not None:
+        stats.nodes_visited += 1
+        # Instructions with unscheduled dependencies are not even considered.
+        stats.rejections_by_reason["dependency"] += (
+                len(sched_state.unscheduled_insn_ids)
+                - len(sched_state.dep_satisfied_insn_ids))
+        step_rejections = {}
+
     # {{{ see if we have reached the start/end of kernel in the preschedule
 
     if isinstance(next_preschedule_item, CallKernel):
         assert sched_state.within_subkernel is False
-        for result in generate_loop_schedules_internal(
+        yield _SubSearch(
                 sched_state.copy(
                     schedule=sched_state.schedule + (next_preschedule_item,),
                     preschedule=sched_state.preschedule[1:],
                     within_subkernel=True,
                     may_schedule_global_barriers=False,
                     enclosing_subkernel_inames=sched_state.active_inames),
-                allow_boost=rec_allow_boost,
-                debug=debug):
-            yield result
+                rec_allow_boost)
 
     if isinstance(next_preschedule_item, ReturnFromKernel):
         assert sched_state.within_subkernel is True
         # Make sure all subkernel inames have finished.
         if sched_state.active_inames == sched_state.enclosing_subkernel_inames:
-            for result in generate_loop_schedules_internal(
+            yield _SubSearch(
                     sched_state.copy(
                         schedule=sched_state.schedule + (next_preschedule_item,),
                         preschedule=sched_state.preschedule[1:],
                         within_subkernel=False,
                         may_schedule_global_barriers=True),
-                    allow_boost=rec_allow_boost,
-                    debug=debug):
-                yield result
+                    rec_allow_boost)
 
     # }}}
 
@@ -752,13 +1024,11 @@ def generate_loop_schedules_internal(
     if (
             isinstance(next_preschedule_item, Barrier)
             and next_preschedule_item.originating_insn_id is None):
-        for result in generate_loop_schedules_internal(
-                    sched_state.copy(
-                        schedule=sched_state.schedule + (next_preschedule_item,),
-                        preschedule=sched_state.preschedule[1:]),
-                    allow_boost=rec_allow_boost,
-                    debug=debug):
-                yield result
+        yield _SubSearch(
+                sched_state.copy(
+                    schedule=sched_state.schedule + (next_preschedule_item,),
+                    preschedule=sched_state.preschedule[1:]),
+                rec_allow_boost)
 
     # }}}
 
@@ -771,7 +1041,7 @@ def generate_loop_schedules_internal(
     active_groups = frozenset(sched_state.active_group_counts)
 
     def insn_sort_key(insn_id):
-        insn = kernel.id_to_insn[insn_id]
+        insn = id_to_insn[insn_id]
 
         # Sort by insn.id as a last criterion to achieve deterministic
         # schedule generation order.
@@ -779,20 +1049,25 @@ def generate_loop_schedules_internal(
 
     # Use previous instruction sorting result if it is available
     if sched_state.insn_ids_to_try is None:
-        insn_ids_to_try = sorted(
+        sorted_insn_ids = tuple(sorted(
                 # Non-prescheduled instructions go first.
                 sched_state.unscheduled_insn_ids - sched_state.prescheduled_insn_ids,
-                key=insn_sort_key, reverse=True)
+                key=insn_sort_key, reverse=True))
+        insn_ids_to_try = _InsnIdsToTry(
+                sorted_insn_ids,
+                dict((insn_id, i) for i, insn_id in enumerate(sorted_insn_ids)),
+                0, [])
     else:
         insn_ids_to_try = sched_state.insn_ids_to_try
 
-    insn_ids_to_try.extend(
+    insn_ids_to_try.tail.extend(
         insn_id
         for item in sched_state.preschedule
         for insn_id in sched_item_to_insn_id(item))
 
-    for insn_id in insn_ids_to_try:
-        insn = kernel.id_to_insn[insn_id]
+    for insn_id in insn_ids_to_try.gen_insn_ids(
+            sched_state, include_unmet_deps=debug_mode):
+        insn = id_to_insn[insn_id]
 
         is_ready = insn.depends_on <= sched_state.scheduled_insn_ids
 
@@ -817,6 +1092,8 @@ def generate_loop_schedules_internal(
 
         if want != have:
             is_ready = False
+            if stats is not None:
+                stats.log_rejection(step_rejections, "loop_nest", insn.id)
 
             if debug_mode:
                 if want-have:
@@ -842,6 +1119,8 @@ def generate_loop_schedules_internal(
                     print("can't schedule '%s' because another preschedule "
                           "instruction precedes it" % format_insn(kernel, insn.id))
                 is_ready = False
+                if stats is not None:
+                    stats.log_rejection(step_rejections, "preschedule", insn.id)
 
         # }}}
 
@@ -855,12 +1134,16 @@ def generate_loop_schedules_internal(
                     print("can't schedule '%s' because global barriers are "
                           "not currently allowed" % format_insn(kernel, insn.id))
                 is_ready = False
+                if stats is not None:
+                    stats.log_rejection(step_rejections, "barrier", insn.id)
         else:
             if not sched_state.within_subkernel:
                 if debug_mode:
                     print("can't schedule '%s' because not within subkernel"
                           % format_insn(kernel, insn.id))
                 is_ready = False
+                if stats is not None:
+                    stats.log_rejection(step_rejections, "barrier", insn.id)
 
         # }}}
 
@@ -868,6 +1151,8 @@ def generate_loop_schedules_internal(
 
         if insn.conflicts_with_groups & active_groups:
             is_ready = False
+            if stats is not None:
+                stats.log_rejection(step_rejections, "group_conflict", insn.id)
 
             if debug_mode:
                 print("instruction '%s' conflicts with active group(s) '%s'"
@@ -887,8 +1172,6 @@ def generate_loop_schedules_internal(
             print("ready to schedule '%s'" % format_insn(kernel, insn.id))
 
         if is_ready and not debug_mode:
-            iid_set = frozenset([insn.id])
-
             # {{{ update active group counts for added instruction
 
             if insn.groups:
@@ -910,8 +1193,15 @@ def generate_loop_schedules_internal(
 
             # {{{ update instruction_ids_to_try
 
-            new_insn_ids_to_try = list(insn_ids_to_try)
-            new_insn_ids_to_try.remove(insn.id)
+            new_tail = list(insn_ids_to_try.tail)
+            if insn.id in sched_state.prescheduled_insn_ids:
+                new_tail.remove(insn.id)
+
+            new_insn_ids_to_try = _InsnIdsToTry(
+                    insn_ids_to_try.sorted_insn_ids,
+                    insn_ids_to_try.insn_id_to_rank,
+                    insn_ids_to_try.start,
+                    new_tail)
 
             # invalidate instruction_ids_to_try when active group changes
             if set(new_active_group_counts.keys()) != set(
@@ -920,6 +1210,25 @@ def generate_loop_schedules_internal(
 
             # }}}
 
+            # {{{ update scheduled instruction sets
+
+            new_scheduled_insn_ids = (
+                    sched_state.scheduled_insn_ids.with_item(insn.id))
+            new_unscheduled_insn_ids = (
+                    sched_state.unscheduled_insn_ids.without_item(insn.id))
+
+            new_dep_satisfied_insn_ids = (
+                    sched_state.dep_satisfied_insn_ids.without_item(insn.id))
+            for dependent_id in sched_state.insn_id_to_dependents.get(
+                    insn.id, ()):
+                if (dependent_id in new_unscheduled_insn_ids
+                        and id_to_insn[dependent_id].depends_on
+                        <= new_scheduled_insn_ids):
+                    new_dep_satisfied_insn_ids = (
+                            new_dep_satisfied_insn_ids.with_item(dependent_id))
+
+            # }}}
+
             new_uses_of_boostability = []
             if allow_boost:
                 if orig_have & insn.boostable_into:
@@ -927,8 +1236,9 @@ def generate_loop_schedules_internal(
                             (insn.id, orig_have & insn.boostable_into))
 
             new_sched_state = sched_state.copy(
-                    scheduled_insn_ids=sched_state.scheduled_insn_ids | iid_set,
-                    unscheduled_insn_ids=sched_state.unscheduled_insn_ids - iid_set,
+                    scheduled_insn_ids=new_scheduled_insn_ids,
+                    unscheduled_insn_ids=new_unscheduled_insn_ids,
+                    dep_satisfied_insn_ids=new_dep_satisfied_insn_ids,
                     insn_ids_to_try=new_insn_ids_to_try,
                     schedule=(
                         sched_state.schedule + (RunInstruction(insn_id=insn.id),)),
@@ -945,10 +1255,7 @@ def generate_loop_schedules_internal(
             # Don't be eager about entering/leaving loops--if progress has been
             # made, revert to top of scheduler and see if more progress can be
             # made.
-            for sub_sched in generate_loop_schedules_internal(
-                    new_sched_state,
-                    allow_boost=rec_allow_boost, debug=debug):
-                yield sub_sched
+            yield _SubSearch(new_sched_state, rec_allow_boost)
 
             if not sched_state.group_insn_counts:
                 # No groups: We won't need to backtrack on scheduling
@@ -979,7 +1286,7 @@ def generate_loop_schedules_internal(
             # scheduled all the instructions that require it.
 
             for insn_id in sched_state.unscheduled_insn_ids:
-                insn = kernel.id_to_insn[insn_id]
+                insn = id_to_insn[insn_id]
                 if last_entered_loop in kernel.insn_inames(insn):
                     if debug_mode:
                         print("cannot leave '%s' because '%s' still depends on it"
@@ -989,7 +1296,7 @@ def generate_loop_schedules_internal(
                         # outside of last_entered_loop.
                         for subdep_id in gen_dependencies_except(kernel, insn_id,
                                 sched_state.scheduled_insn_ids):
-                            subdep = kernel.id_to_insn[insn_id]
+                            subdep = id_to_insn[insn_id]
                             want = (kernel.insn_inames(subdep_id)
                                     - sched_state.parallel_inames)
                             if (
@@ -1042,7 +1349,7 @@ def generate_loop_schedules_internal(
 
             if can_leave and not debug_mode:
 
-                for sub_sched in generate_loop_schedules_internal(
+                yield _SubSearch(
                         sched_state.copy(
                             schedule=(
                                 sched_state.schedule
@@ -1054,8 +1361,7 @@ def generate_loop_schedules_internal(
                                 not in sched_state.prescheduled_inames
                                 else sched_state.preschedule[1:]),
                         ),
-                        allow_boost=rec_allow_boost, debug=debug):
-                    yield sub_sched
+                        rec_allow_boost)
 
                 return
 
@@ -1167,7 +1473,7 @@ def generate_loop_schedules_internal(
 
             hypothetically_active_loops = active_inames_set | set([iname])
             for insn_id in reachable_insn_ids:
-                insn = kernel.id_to_insn[insn_id]
+                insn = id_to_insn[insn_id]
 
                 want = kernel.insn_inames(insn) | insn.boostable_into
 
@@ -1254,7 +1560,7 @@ def generate_loop_schedules_internal(
                             iname),
                         reverse=True):
 
-                    for sub_sched in generate_loop_schedules_internal(
+                    sub_search = _SubSearch(
                             sched_state.copy(
                                 schedule=(
                                     sched_state.schedule
@@ -1269,10 +1575,11 @@ def generate_loop_schedules_internal(
                                     if iname not in sched_state.prescheduled_inames
                                     else sched_state.preschedule[1:]),
                                 ),
-                            allow_boost=rec_allow_boost,
-                            debug=debug):
+                            rec_allow_boost)
+                    yield sub_search
+
+                    if sub_search.found_schedule:
                         found_viable_schedule = True
-                        yield sub_sched
 
                 if found_viable_schedule:
                     return
@@ -1293,6 +1600,8 @@ def generate_loop_schedules_internal(
             and not sched_state.preschedule):
         # if done, yield result
         debug.log_success(sched_state.schedule)
+        if stats is not None:
+            stats.schedules_found += 1
 
         for boost_insn_id, boost_inames in sched_state.uses_of_boostability:
             warn_with_kernel(
@@ -1308,15 +1617,24 @@ def generate_loop_schedules_internal(
     else:
         if not allow_boost and allow_boost is not None:
             # try again with boosting allowed
-            for sub_sched in generate_loop_schedules_internal(
-                    sched_state,
-                    allow_boost=True, debug=debug):
-                yield sub_sched
+            yield _SubSearch(sched_state, True)
         else:
             # dead end
             if debug is not None:
                 debug.log_dead_end(sched_state.schedule)
 
+            if stats is not None:
+                dep_satisfied_insn_ids = sched_state.dep_satisfied_insn_ids
+                dep_blocked_insn_ids = set(
+                        insn_id
+                        for insn_id in sched_state.unscheduled_insn_ids
+                        if insn_id not in dep_satisfied_insn_ids)
+                if dep_blocked_insn_ids:
+                    step_rejections.setdefault("dependency", set()).update(
+                            dep_blocked_insn_ids)
+
+                stats.log_dead_end(step_rejections)
+
 # }}}
 
 
@@ -1829,6 +2147,10 @@ def insert_barriers(kernel, schedule, synchronization_kind, verify_only, level=0
 
 
 class MinRecursionLimitForScheduling(MinRecursionLimit):
+    """Retained for compatibility. Since the scheduler no longer recurses
+    once per schedule item, it does not need to be used.
+    """
+
     def __init__(self, kernel):
         MinRecursionLimit.__init__(self,
                 len(kernel.instructions) * 2 + len(kernel.all_inames()) * 4)
@@ -1837,34 +2159,16 @@ class MinRecursionLimitForScheduling(MinRecursionLimit):
 # {{{ main scheduling entrypoint
 
 def generate_loop_schedules(kernel, debug_args={}):
-    """
-    .. warning::
-
-        This function needs to be called inside (another layer) of a
-        :class:`MinRecursionLimitForScheduling` context manager, and the
-        context manager needs to end *after* the last reference to the
-        generators has gone out of scope. Otherwise, the high-recursion-limit
-        generator chain may not be successfully garbage-collected and cause an
-        internal error in the Python runtime.
-    """
-
-    with MinRecursionLimitForScheduling(kernel):
-        for sched in generate_loop_schedules_inner(kernel, debug_args=debug_args):
-            yield sched
+    for sched in generate_loop_schedules_inner(kernel, debug_args=debug_args):
+        yield sched
 
 
-def generate_loop_schedules_inner(kernel, debug_args={}):
+def _get_initial_scheduler_state(kernel):
+    """
+    :returns: a tuple ``(sched_state, schedule_gen_kwargs)`` of arguments
+        with which to start :func:`generate_loop_schedules_internal`.
+    """
     from loopy.kernel import kernel_state
-    if kernel.state not in (kernel_state.PREPROCESSED, kernel_state.SCHEDULED):
-        raise LoopyError("cannot schedule a kernel that has not been "
-                "preprocessed")
-
-    from loopy.check import pre_schedule_checks
-    pre_schedule_checks(kernel)
-
-    schedule_count = 0
-
-    debug = ScheduleDebugger(**debug_args)
 
     preschedule = kernel.schedule if kernel.state == kernel_state.SCHEDULED else ()
 
@@ -1891,6 +2195,11 @@ def generate_loop_schedules_inner(kernel, debug_args={}):
             iname for iname in kernel.all_inames()
             if isinstance(kernel.iname_to_tag.get(iname), ConcurrentTag))
 
+    insn_id_to_dependents = {}
+    for insn in kernel.instructions:
+        for dep_id in insn.depends_on:
+            insn_id_to_dependents.setdefault(dep_id, []).append(insn.id)
+
     loop_nest_with_map = find_loop_nest_with_map(kernel)
     loop_nest_around_map = find_loop_nest_around_map(kernel)
     sched_state = SchedulerState(
@@ -1914,8 +2223,12 @@ def generate_loop_schedules_inner(kernel, debug_args={}):
 
             schedule=(),
 
-            unscheduled_insn_ids=set(insn.id for insn in kernel.instructions),
-            scheduled_insn_ids=frozenset(),
+            unscheduled_insn_ids=PersistentSet(
+                insn.id for insn in kernel.instructions),
+            scheduled_insn_ids=PersistentSet(),
+            dep_satisfied_insn_ids=PersistentSet(
+                insn.id for insn in kernel.instructions
+                if not insn.depends_on),
             within_subkernel=kernel.state != kernel_state.SCHEDULED,
             may_schedule_global_barriers=True,
 
@@ -1925,6 +2238,7 @@ def generate_loop_schedules_inner(kernel, debug_args={}):
             # ilp and vec are not parallel for the purposes of the scheduler
             parallel_inames=parallel_inames - ilp_inames - vec_inames,
 
+            insn_id_to_dependents=insn_id_to_dependents,
             group_insn_counts=group_insn_counts(kernel),
             active_group_counts={},
 
@@ -1934,6 +2248,74 @@ def generate_loop_schedules_inner(kernel, debug_args={}):
     if kernel.options.ignore_boostable_into:
         schedule_gen_kwargs["allow_boost"] = None
 
+    return sched_state, schedule_gen_kwargs
+
+
+def _finalize_schedule(kernel, gen_sched, statistics=None):
+    """Turn a schedule as generated by :func:`generate_loop_schedules_internal`
+    into a scheduled kernel, by inserting barriers and mapping the schedule onto
+    host and device.
+
+    :arg statistics: *None* or a :class:`ScheduleStatistics` instance to which
+        the time spent in each phase is added.
+    """
+    from loopy.kernel import kernel_state
+    from time import time
+
+    gen_sched = filter_nops_from_schedule(kernel, gen_sched)
+    gen_sched = convert_barrier_instructions_to_barriers(
+            kernel, gen_sched)
+
+    gsize, lsize = kernel.get_grid_size_upper_bounds()
+
+    start_time = time()
+    if (gsize or lsize):
+        if not kernel.options.disable_global_barriers:
+            logger.debug("%s: barrier insertion: global" % kernel.name)
+            gen_sched = insert_barriers(kernel, gen_sched,
+                    synchronization_kind="global", verify_only=True)
+
+        logger.debug("%s: barrier insertion: local" % kernel.name)
+        gen_sched = insert_barriers(kernel, gen_sched,
+            synchronization_kind="local", verify_only=False)
+        logger.debug("%s: barrier insertion: done" % kernel.name)
+
+    if statistics is not None:
+        statistics.add_phase_time("insert_barriers", time() - start_time)
+
+    new_kernel = kernel.copy(
+            schedule=gen_sched,
+            state=kernel_state.SCHEDULED)
+
+    from loopy.schedule.device_mapping import \
+            map_schedule_onto_host_or_device
+    if kernel.state != kernel_state.SCHEDULED:
+        # Device mapper only gets run once.
+        start_time = time()
+        new_kernel = map_schedule_onto_host_or_device(new_kernel)
+
+        if statistics is not None:
+            statistics.add_phase_time("device_mapping", time() - start_time)
+
+    from loopy.schedule.tools import add_extra_args_to_schedule
+    return add_extra_args_to_schedule(new_kernel)
+
+
+def generate_loop_schedules_inner(kernel, debug_args={}):
+    from loopy.kernel import kernel_state
+    if kernel.state not in (kernel_state.PREPROCESSED, kernel_state.SCHEDULED):
+        raise LoopyError("cannot schedule a kernel that has not been "
+                "preprocessed")
+
+    from loopy.check import pre_schedule_checks
+    pre_schedule_checks(kernel)
+
+    schedule_count = 0
+
+    debug = ScheduleDebugger(**debug_args)
+
+    sched_state, schedule_gen_kwargs = _get_initial_scheduler_state(kernel)
+
     def print_longest_dead_end():
         if debug.interactive:
             print("Loo.py will now show you the scheduler state at the point")
@@ -1967,36 +2349,10 @@ def generate_loop_schedules_inner(kernel, debug_args={}):
                 sched_state, debug=debug, **schedule_gen_kwargs):
             debug.stop()
 
-            gen_sched = filter_nops_from_schedule(kernel, gen_sched)
-            gen_sched = convert_barrier_instructions_to_barriers(
-                    kernel, gen_sched)
-
-            gsize, lsize = kernel.get_grid_size_upper_bounds()
-
-            if (gsize or lsize):
-                if not kernel.options.disable_global_barriers:
-                    logger.debug("%s: barrier insertion: global" % kernel.name)
-                    gen_sched = insert_barriers(kernel, gen_sched,
-                            synchronization_kind="global", verify_only=True)
-
-                logger.debug("%s: barrier insertion: local" % kernel.name)
-                gen_sched = insert_barriers(kernel, gen_sched,
-                    synchronization_kind="local", verify_only=False)
-                logger.debug("%s: barrier insertion: done" % kernel.name)
+            if debug.statistics is not None:
+                debug.statistics.phase_times["search"] = debug.elapsed_store
 
-            new_kernel = kernel.copy(
-                    schedule=gen_sched,
-                    state=kernel_state.SCHEDULED)
-
-            from loopy.schedule.device_mapping import \
-                    map_schedule_onto_host_or_device
-            if kernel.state != kernel_state.SCHEDULED:
-                # Device mapper only gets run once.
-                new_kernel = map_schedule_onto_host_or_device(new_kernel)
-
-            from loopy.schedule.tools import add_extra_args_to_schedule
-            new_kernel = add_extra_args_to_schedule(new_kernel)
-            yield new_kernel
+            yield _finalize_schedule(kernel, gen_sched, debug.statistics)
 
             debug.start()
 
@@ -2016,29 +2372,74 @@ def generate_loop_schedules_inner(kernel, debug_args={}):
         print("ERROR: Sorry--loo.py did not find a schedule for your kernel.")
         print(75*"-")
         print_longest_dead_end()
-        raise RuntimeError("no valid schedules found")
+
+        error = RuntimeError("no valid schedules found")
+        if debug.statistics is not None:
+            debug.statistics.phase_times["search"] = debug.elapsed_time()
+            error.statistics = debug.statistics
+        raise error
 
     logger.info("%s: schedule done" % kernel.name)
 
 # }}}
 
 
-schedule_cache = WriteOncePersistentDict(
-        "loopy-schedule-cache-v4-"+DATA_MODEL_VERSION,
+schedule_cache = TieredCache(
+        "schedule",
+        "loopy-schedule-cache-v5-"+DATA_MODEL_VERSION,
         key_builder=LoopyKeyBuilder())
 
 
-def _get_one_scheduled_kernel_inner(kernel):
-    # This helper function exists to ensure that the generator chain is fully
-    # out of scope after the function returns. This allows it to be
-    # garbage-collected in the exit handler of the
-    # MinRecursionLimitForScheduling context manager in the surrounding
-    # function, because it possilby cannot be safely collected with a lower
-    # recursion limit without crashing the Python runtime.
-    #
-    # See https://gitlab.tiker.net/inducer/sumpy/issues/31 for context.
+class _ScheduleCacheEntry(ImmutableRecord):
+    """What is stored in :data:`schedule_cache` for a scheduled kernel that
+    differs from the kernel it was scheduled from (the cache key, which is
+    available on lookup) only in the attributes stored here.
+
+    .. attribute:: schedule
+    .. attribute:: state
+    """
+
+
+def _make_schedule_cache_entry(kernel, scheduled_kernel):
+    for field_name in kernel.__class__.fields:
+        if field_name in ["schedule", "state", "cache_manager"]:
+            continue
+
+        if (getattr(kernel, field_name, None)
+                is not getattr(scheduled_kernel, field_name, None)):
+            # Scheduling changed more than the schedule, store the whole
+            # kernel.
+            return scheduled_kernel
+
+    return _ScheduleCacheEntry(
+            schedule=scheduled_kernel.schedule,
+            state=scheduled_kernel.state)
+
+
+def _get_kernel_from_schedule_cache_entry(kernel, entry):
+    if isinstance(entry, _ScheduleCacheEntry):
+        return kernel.copy(schedule=entry.schedule, state=entry.state)
+    else:
+        return entry
+
+
+def profile_scheduling(kernel):
+    """Schedule *kernel* like :func:`get_one_scheduled_kernel`, but bypassing
+    the schedule cache and gathering statistics about the scheduler's search.
+
+    :returns: a tuple ``(scheduled_kernel, statistics)``, where *statistics*
+        is an instance of :class:`loopy.schedule.ScheduleStatistics`.
+    :raises RuntimeError: if no schedule is found. The statistics gathered
+        during the failed search are available as its *statistics*
+        attribute.
+    """
+    statistics = ScheduleStatistics()
 
-    return next(iter(generate_loop_schedules(kernel)))
+    with ProcessLogger(logger, "%s: schedule (profiled)" % kernel.name):
+        result = next(iter(generate_loop_schedules(kernel,
+            debug_args=dict(interactive=False, statistics=statistics))))
+
+    return result, statistics
 
 
 def get_one_scheduled_kernel(kernel):
@@ -2049,7 +2450,8 @@ def get_one_scheduled_kernel(kernel):
 
     if CACHING_ENABLED:
         try:
-            result = schedule_cache[sched_cache_key]
+            result = _get_kernel_from_schedule_cache_entry(
+                    kernel, schedule_cache[sched_cache_key])
 
             logger.debug("%s: schedule cache hit" % kernel.name)
             from_cache = True
@@ -2057,12 +2459,19 @@ def get_one_scheduled_kernel(kernel):
             pass
 
     if not from_cache:
+        from loopy.kernel import kernel_state
         with ProcessLogger(logger, "%s: schedule" % kernel.name):
-            with MinRecursionLimitForScheduling(kernel):
-                result = _get_one_scheduled_kernel_inner(kernel)
+            if (kernel.options.rank_schedule_candidates
+                    and kernel.state == kernel_state.PREPROCESSED):
+                from loopy.schedule.ranking import get_best_scheduled_kernels
+                (result, _), = get_best_scheduled_kernels(kernel,
+                        max_candidates=kernel.options.rank_schedule_candidates)
+            else:
+                result = next(iter(generate_loop_schedules(kernel)))
 
     if CACHING_ENABLED and not from_cache:
-        schedule_cache.store_if_not_present(sched_cache_key, result)
+        schedule_cache.store_if_not_present(sched_cache_key,
+                _make_schedule_cache_entry(kernel, result))
 
     return result
 
@@ -0,0 +1,258 @@
+from __future__ import division, absolute_import, print_function
+
+__copyright__ = "Copyright (C) 2018 Andreas Kloeckner"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from six.moves import range
+
+from pytools import ImmutableRecord
+from islpy import dim_type
+import islpy as isl
+
+from loopy.diagnostic import LoopyError
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+__doc__ = """
+.. currentmodule:: loopy.schedule.ranking
+
+.. autodata:: NOMINAL_PARAMETER_VALUE
+
+.. autofunction:: estimate_schedule_cost
+
+.. autoclass:: ScheduleCost
+"""
+
+
+#: The value assumed for kernel parameters not given to
+#: :func:`estimate_schedule_cost`.
+NOMINAL_PARAMETER_VALUE = 256
+
+
+# {{{ cost model
+
+class ScheduleCost(ImmutableRecord):
+    """A static estimate of the cost of running a scheduled kernel, used to
+    rank different schedules of the same kernel.
+
+    .. attribute:: kernel_launches
+
+    .. attribute:: global_barriers
+
+    .. attribute:: local_barriers
+
+        The number of kernel launches and barriers encountered by each
+        work item, as counted by :func:`loopy.get_synchronization_map`.
+
+    .. attribute:: max_loop_depth
+
+        The maximal number of nested sequential loops in the schedule.
+
+    .. attribute:: loop_count
+
+        The number of sequential loops entered in the schedule, including
+        repeated entries into loops over the same iname.
+
+    .. automethod:: sort_key
+    """
+
+    def sort_key(self):
+        """Return a key by which lower-cost schedules sort first."""
+        return (
+                self.kernel_launches,
+                self.global_barriers,
+                self.local_barriers,
+                self.max_loop_depth,
+                self.loop_count)
+
+
+def _eval_count(count, parameters):
+    # Counts may be plain PwQPolynomials or GuardedPwQPolynomials. The
+    # latter's guard is ignored here, since nominal parameter values need not
+    # satisfy the kernel's assumptions.
+    pwqpolynomial = getattr(count, "pwqpolynomial", count)
+
+    space = pwqpolynomial.space
+    pt = isl.Point.zero(space.params())
+
+    for i in range(space.dim(dim_type.param)):
+        par_name = space.get_dim_name(dim_type.param, i)
+        pt = pt.set_coordinate_val(
+                dim_type.param, i,
+                parameters.get(par_name, NOMINAL_PARAMETER_VALUE))
+
+    return pwqpolynomial.eval(pt).to_python()
+
+
+def estimate_schedule_cost(kernel, parameters=None):
+    """
+    :arg kernel: a scheduled :class:`loopy.LoopKernel`.
+    :arg parameters: a :class:`dict` mapping kernel parameters to values at
+        which to evaluate synchronization counts. Parameters not given are
+        assumed equal to :data:`NOMINAL_PARAMETER_VALUE`.
+    :returns: a :class:`ScheduleCost`.
+    """
+    from loopy.kernel import kernel_state
+    if kernel.state != kernel_state.SCHEDULED:
+        raise LoopyError("cannot estimate the schedule cost of a kernel that "
+                "has not been scheduled")
+
+    if parameters is None:
+        parameters = {}
+
+    # Counting synchronization only depends on where loops and barriers
+    # are in the (already generated) schedule, which boostability does not
+    # affect.
+    from loopy.statistics import get_synchronization_map
+    sync_map = get_synchronization_map(
+            kernel.copy(options=kernel.options.copy(ignore_boostable_into=True)))
+
+    sync_counts = dict(
+            (kind, _eval_count(count, parameters))
+            for kind, count in sync_map.items())
+
+    from loopy.schedule import EnterLoop, LeaveLoop
+    max_loop_depth = 0
+    loop_count = 0
+    depth = 0
+    for sched_item in kernel.schedule:
+        if isinstance(sched_item, EnterLoop):
+            depth += 1
+            loop_count += 1
+            max_loop_depth = max(depth, max_loop_depth)
+        elif isinstance(sched_item, LeaveLoop):
+            depth -= 1
+
+    return ScheduleCost(
+            kernel_launches=sync_counts.get("kernel_launch", 0),
+            global_barriers=sync_counts.get("barrier_global", 0),
+            local_barriers=sync_counts.get("barrier_local", 0),
+            max_loop_depth=max_loop_depth,
+            loop_count=loop_count)
+
+# }}}
+
+
+# {{{ candidate generation
+
+def _gather_candidate_schedules(kernel, max_candidates):
+    from itertools import islice
+    from loopy.schedule import (
+            ScheduleDebugger, _get_initial_scheduler_state,
+            generate_loop_schedules_internal)
+
+    sched_state, schedule_gen_kwargs = _get_initial_scheduler_state(kernel)
+
+    return list(islice(
+        generate_loop_schedules_internal(
+            sched_state, debug=ScheduleDebugger(interactive=False),
+            **schedule_gen_kwargs),
+        max_candidates))
+
+
+def _finalize_and_estimate(kernel, schedule, parameters):
+    from loopy.schedule import _finalize_schedule
+    sched_kernel = _finalize_schedule(kernel, schedule)
+    return sched_kernel, estimate_schedule_cost(sched_kernel, parameters)
+
+
+_WORKER_ARGS = None
+
+
+def _init_worker(kernel, parameters):
+    global _WORKER_ARGS
+    _WORKER_ARGS = (kernel, parameters)
+
+
+def _finalize_and_estimate_in_worker(schedule):
+    kernel, parameters = _WORKER_ARGS
+    return _finalize_and_estimate(kernel, schedule, parameters)
+
+# }}}
+
+
+# {{{ ranked schedule search
+
+def get_best_scheduled_kernels(kernel, n=1, max_candidates=16,
+        parameters=None, nprocesses=None):
+    """Generate up to *max_candidates* schedules for *kernel* and return the
+    *n* best of them as ranked by
+    :func:`loopy.schedule.ranking.estimate_schedule_cost`.
+
+    Barrier insertion, mapping onto host and device and cost estimation for
+    the candidates are carried out in a pool of *nprocesses* worker
+    processes. By default, one process per CPU is used. Pass *nprocesses=1*
+    to do all work in the calling process.
+
+    :arg parameters: passed to
+        :func:`loopy.schedule.ranking.estimate_schedule_cost`.
+    :returns: a list of tuples ``(scheduled_kernel, cost)``, lowest cost first.
+        Among schedules of equal cost, ones found earlier by the scheduler
+        come first.
+    """
+
+    from loopy.kernel import kernel_state
+    if kernel.state != kernel_state.PREPROCESSED:
+        raise LoopyError("cannot schedule a kernel that has not been "
+                "preprocessed (or that has already been scheduled)")
+
+    from loopy.check import pre_schedule_checks
+    pre_schedule_checks(kernel)
+
+    schedules = _gather_candidate_schedules(kernel, max_candidates)
+
+    if not schedules:
+        raise RuntimeError("no valid schedules found")
+
+    logger.info("%s: ranking %d candidate schedules"
+            % (kernel.name, len(schedules)))
+
+    import multiprocessing
+    if nprocesses is None:
+        nprocesses = multiprocessing.cpu_count()
+    nprocesses = min(nprocesses, len(schedules))
+
+    # Pool workers are daemonic and may not start pools of their own.
+    if nprocesses > 1 and not multiprocessing.current_process().daemon:
+        pool = multiprocessing.Pool(nprocesses,
+                initializer=_init_worker, initargs=(kernel, parameters))
+        try:
+            results = pool.map(_finalize_and_estimate_in_worker, schedules)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [
+                _finalize_and_estimate(kernel, schedule, parameters)
+                for schedule in schedules]
+
+    order = sorted(
+            range(len(results)),
+            key=lambda i: (results[i][1].sort_key(), i))
+
+    return [results[i] for i in order[:n]]
+
+# }}}
+
+# vim: foldmethod=marker
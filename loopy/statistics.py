@@ -24,15 +24,18 @@ THE SOFTWARE.
 
 import six
 
+import numpy as np
+
 import loopy as lp
 from islpy import dim_type
 import islpy as isl
 from pymbolic.mapper import CombineMapper
+from pymbolic.mapper.evaluator import EvaluationMapper
 from functools import reduce
 from loopy.kernel.data import (
         MultiAssignmentBase, TemporaryVariable, temp_var_scope)
 from loopy.diagnostic import warn_with_kernel, LoopyError
-from pytools import Record
+from pytools import Record, memoize_method
 
 
 __doc__ = """
@@ -54,11 +57,164 @@ __doc__ = """
 .. currentmodule:: loopy.statistics
 
 .. autoclass:: GuardedPwQPolynomial
+.. autoclass:: CompiledPwQPolynomial
+.. autoclass:: CompiledToCountMap
 
 .. currentmodule:: loopy
 """
 
 
+# {{{ vectorized evaluation
+
+class _VectorizedEvaluationMapper(EvaluationMapper):
+    def map_logical_not(self, expr):
+        return np.logical_not(self.rec(expr.child))
+
+    def map_logical_and(self, expr):
+        return reduce(np.logical_and, [self.rec(ch) for ch in expr.children])
+
+    def map_logical_or(self, expr):
+        return reduce(np.logical_or, [self.rec(ch) for ch in expr.children])
+
+    def map_if(self, expr):
+        return np.where(
+                self.rec(expr.condition),
+                self.rec(expr.then),
+                self.rec(expr.else_))
+
+
+def _get_broadcast_shape(value_dict):
+    """Return the shape to which the parameter values in *value_dict* are
+    broadcast, also for counts not depending on all parameters.
+    """
+    values = [np.asarray(value) for value in six.itervalues(value_dict)]
+    if not values:
+        return ()
+
+    return np.broadcast_arrays(*values)[0].shape
+
+
+def _param_set_to_cond_expr(isl_set):
+    if isinstance(isl_set, isl.BasicSet):
+        isl_set = isl.Set.from_basic_set(isl_set)
+
+    isl_set = isl_set.params()
+
+    if isl_set.is_equal(isl.Set.universe(isl_set.space)):
+        return True
+    elif isl_set.is_empty():
+        return False
+    else:
+        from loopy.symbolic import set_to_cond_expr
+        return set_to_cond_expr(isl_set)
+
+
+class CompiledPwQPolynomial(object):
+    """A piecewise quasi-polynomial in the parameters, converted to
+    expressions that are evaluated using :mod:`numpy` on arrays of parameter
+    values, without involving :mod:`islpy`.
+
+    .. automethod:: __call__
+    """
+
+    def __init__(self, pwqpolynomial, valid_domain=None):
+        from loopy.symbolic import qpolynomial_to_expr
+
+        space = pwqpolynomial.space
+        self.param_names = [
+                space.get_dim_name(dim_type.param, i)
+                for i in range(space.dim(dim_type.param))]
+
+        self.pieces = [
+                (_param_set_to_cond_expr(domain), qpolynomial_to_expr(qpoly))
+                for domain, qpoly in pwqpolynomial.get_pieces()]
+
+        if valid_domain is None:
+            self.valid_domain_cond = True
+        else:
+            self.valid_domain_cond = _param_set_to_cond_expr(valid_domain)
+
+    def __call__(self, value_dict):
+        """
+        :arg value_dict: a mapping from parameter names to scalars or
+            arrays of parameter values, which are broadcast against each
+            other.
+        :return: a :class:`numpy.ndarray` of the broadcast shape of the
+            parameter values.
+        """
+        shape = _get_broadcast_shape(value_dict)
+        values = [
+                np.broadcast_to(np.asarray(value_dict[name]), shape)
+                for name in self.param_names]
+
+        if values:
+            result = np.zeros(shape, np.result_type(*values))
+        else:
+            result = np.zeros(shape, np.int64)
+
+        evaluate = _VectorizedEvaluationMapper(
+                dict(zip(self.param_names, values)))
+
+        if not np.all(evaluate(self.valid_domain_cond)):
+            raise ValueError("evaluation point outside of domain of "
+                    "definition of piecewise quasipolynomial")
+
+        # pieces have disjoint domains, outside of which the value is zero
+        for cond, expr in self.pieces:
+            result = np.where(evaluate(cond), evaluate(expr), result)
+
+        return result
+
+
+def _compile_count(count):
+    if isinstance(count, GuardedPwQPolynomial):
+        return count.compile()
+    elif isinstance(count, isl.PwQPolynomial):
+        return CompiledPwQPolynomial(count)
+    else:
+        return lambda value_dict: np.broadcast_to(
+                np.asarray(count), _get_broadcast_shape(value_dict))
+
+
+class CompiledToCountMap(object):
+    """The counts of a :class:`ToCountMap` compiled for evaluation on arrays
+    of parameter values, e.g. for sweeps over many problem sizes. Obtained
+    from :meth:`ToCountMap.compile`.
+
+    .. automethod:: eval
+    .. automethod:: eval_and_sum
+    """
+
+    def __init__(self, count_map):
+        self.compiled_counts = dict(
+                (key, _compile_count(val))
+                for key, val in six.iteritems(count_map.count_map))
+
+    def eval(self, params):
+        """
+        :arg params: a mapping from parameter names to scalars or arrays of
+            parameter values, which are broadcast against each other.
+        :return: a :class:`ToCountMap` mapping each key to a
+            :class:`numpy.ndarray` of counts.
+        """
+        return ToCountMap(dict(
+            (key, compiled_count(params))
+            for key, compiled_count in six.iteritems(self.compiled_counts)),
+            np.ndarray)
+
+    def eval_and_sum(self, params):
+        """
+        :arg params: a mapping from parameter names to scalars or arrays of
+            parameter values, which are broadcast against each other.
+        :return: a :class:`numpy.ndarray` of the sum of all counts.
+        """
+        return sum(
+                compiled_count(params)
+                for compiled_count in six.itervalues(self.compiled_counts))
+
+# }}}
+
+
 # {{{ GuardedPwQPolynomial
 
 class GuardedPwQPolynomial(object):
@@ -105,6 +261,14 @@ class GuardedPwQPolynomial(object):
 
         return self.pwqpolynomial.eval(pt).to_python()
 
+    @memoize_method
+    def compile(self):
+        """
+        :return: a :class:`CompiledPwQPolynomial` that evaluates this
+            polynomial on arrays of parameter values.
+        """
+        return CompiledPwQPolynomial(self.pwqpolynomial, self.valid_domain)
+
     @staticmethod
     def zero():
         p = isl.PwQPolynomial('{ 0 }')
@@ -130,6 +294,7 @@ class ToCountMap(object):
     .. automethod:: to_bytes
     .. automethod:: sum
     .. automethod:: eval_and_sum
+    .. automethod:: compile
 
     """
 
@@ -448,6 +613,26 @@ class ToCountMap(object):
         """
         return self.sum().eval_with_dict(params)
 
+    def compile(self):
+        """Prepare the counts for evaluation on many parameter values at
+        once.
+
+        :return: A :class:`CompiledToCountMap`.
+
+        Example usage::
+
+            # (first create loopy kernel and specify array data types)
+
+            n = np.arange(16, 4096, 16)
+            params = {'n': n, 'm': 2*n, 'l': 128}
+            op_map = lp.get_op_map(knl).compile()
+            f32ops = op_map.eval_and_sum(params)  # an array of len(n) counts
+
+            # (now use these counts to, e.g., predict performance)
+
+        """
+        return CompiledToCountMap(self)
+
 # }}}
 
 
@@ -1647,9 +1832,11 @@ def get_synchronization_map(knl, subgroup_size=None):
     from loopy.schedule import (EnterLoop, LeaveLoop, Barrier,
             CallKernel, ReturnFromKernel, RunInstruction)
     from operator import mul
-    knl = infer_unknown_types(knl, expect_completion=True)
-    knl = preprocess_kernel(knl)
-    knl = lp.get_one_scheduled_kernel(knl)
+    from loopy.kernel import kernel_state
+    if knl.state < kernel_state.SCHEDULED:
+        knl = infer_unknown_types(knl, expect_completion=True)
+        knl = preprocess_kernel(knl)
+        knl = lp.get_one_scheduled_kernel(knl)
     iname_list = []
 
     result = ToCountMap()
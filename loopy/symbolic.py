@@ -1257,6 +1257,63 @@ def pw_aff_to_expr(pw_aff, int_ok=False):
     return expr
 
 
+def qpolynomial_to_expr(qpoly):
+    """Convert an :class:`islpy.QPolynomial` with integer values at integer
+    points into a :mod:`pymbolic` expression with integer arithmetic.
+    """
+    from pymbolic import var
+    from pymbolic.primitives import Product, Power
+
+    space = qpoly.get_domain_space()
+
+    terms = []
+
+    def add_term(term):
+        terms.append(term)
+
+    qpoly.foreach_term(add_term)
+
+    coeffs_and_factors = []
+    denom = isl.Val.one(qpoly.get_ctx())
+    for term in terms:
+        coeff = term.get_coefficient_val()
+        coeff_denom = coeff.get_den_val()
+        denom = denom.mul(coeff_denom).div(denom.gcd(coeff_denom))
+
+        factors = []
+        for dt, space_dt in [
+                (dim_type.param, dim_type.param),
+                (dim_type.in_, dim_type.set)]:
+            for i in range(term.dim(dt)):
+                exp = term.get_exp(dt, i)
+                if exp:
+                    name = space.get_dim_name(space_dt, i)
+                    if name is None:
+                        raise ValueError("quasi-polynomial depends on "
+                                "unnamed dimension")
+
+                    factors.append(Power(var(name), exp) if exp > 1 else var(name))
+
+        for i in range(term.dim(dim_type.div)):
+            exp = term.get_exp(dim_type.div, i)
+            if exp:
+                div_expr = aff_to_expr(term.get_div(i))
+                factors.append(Power(div_expr, exp) if exp > 1 else div_expr)
+
+        coeffs_and_factors.append((coeff, factors))
+
+    result = 0
+    for coeff, factors in coeffs_and_factors:
+        # scale to the common denominator to keep arithmetic integral
+        coeff = coeff.mul(denom).to_python()
+        if factors:
+            result += Product((coeff,) + tuple(factors))
+        else:
+            result += coeff
+
+    return result // denom.to_python()
+
+
 def pw_aff_to_pw_aff_implemented_by_expr(pw_aff):
     pieces = pw_aff.get_pieces()
 
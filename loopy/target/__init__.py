@@ -37,6 +37,9 @@ __doc__ = """
 .. autoclass:: OpenCLTarget
 .. autoclass:: PyOpenCLTarget
 .. autoclass:: ISPCTarget
+.. autoclass:: ExecutableISPCTarget
+.. autoclass:: OpenMPCTarget
+.. autoclass:: ExecutableOpenMPCTarget
 .. autoclass:: NumbaTarget
 .. autoclass:: NumbaCudaTarget
 
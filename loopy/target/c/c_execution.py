@@ -24,10 +24,12 @@ THE SOFTWARE.
 
 import tempfile
 import os
+import threading
+from collections import OrderedDict
 
 from loopy.target.execution import (KernelExecutorBase, _KernelInfo,
                              ExecutionWrapperGeneratorBase, get_highlighted_code)
-from pytools import memoize_method
+from pytools import memoize_method, Record
 from pytools.py_codegen import (Indentation)
 from pytools.prefork import ExecError
 from codepy.toolchain import guess_toolchain, ToolchainGuessError, GCCToolchain
@@ -48,7 +50,7 @@ class CExecutionWrapperGenerator(ExecutionWrapperGeneratorBase):
     """
 
     def __init__(self):
-        system_args = ["_lpy_c_kernels"]
+        system_args = ["_lpy_c_kernels", "_lpy_alloc"]
         super(CExecutionWrapperGenerator, self).__init__(system_args)
 
     def python_dtype_str(self, dtype):
@@ -97,8 +99,8 @@ class CExecutionWrapperGenerator(ExecutionWrapperGeneratorBase):
         # find order of array
         order = "'C'" if arg.unvec_strides[-1] == 1 else "'F'"
 
-        gen("%(name)s = _lpy_np.empty(%(shape)s, "
-                "%(dtype)s, order=%(order)s)"
+        gen("%(name)s = _lpy_alloc(\"%(name)s\", %(shape)s, "
+                "%(dtype)s, %(order)s)"
                 % dict(
                     name=arg.name,
                     shape=strify(sym_shape),
@@ -190,6 +192,21 @@ class CExecutionWrapperGenerator(ExecutionWrapperGeneratorBase):
         return arg.name
 
 
+# {{{ loaded libraries
+
+# Kept apart from the compilers, which are pickled along with their targets.
+
+#: The number of shared libraries kept loaded by :meth:`CCompiler.build`.
+MAX_LOADED_LIBRARIES = 64
+
+# maps (build directory, name, code, debug) to loaded libraries, least
+# recently used first
+_loaded_libraries = OrderedDict()
+_loaded_libraries_lock = threading.Lock()
+
+# }}}
+
+
 class CCompiler(object):
     """
     The compiler module handles invocation of compilers to generate a shared lib
@@ -208,13 +225,16 @@ class CCompiler(object):
     3.  The resulting shared library is turned into a :class:`ctypes.CDLL`
         to enable calling by the invoker generated by, e.g.,
         :class:`CExecutionWrapperGenerator`
+
+    If *openmp* is *True*, ``-fopenmp`` is added to the compiler and linker
+    flags, as required by :class:`loopy.target.openmp.ExecutableOpenMPCTarget`.
     """
 
     def __init__(self, toolchain=None,
                  cc='gcc', cflags='-std=c99 -O3 -fPIC'.split(),
                  ldflags='-shared'.split(), libraries=[],
                  include_dirs=[], library_dirs=[], defines=[],
-                 source_suffix='c'):
+                 source_suffix='c', openmp=False):
         # try to get a default toolchain
         # or subclass supplied version if available
         self.toolchain = toolchain
@@ -252,6 +272,13 @@ class CCompiler(object):
                     if v and (not hasattr(self.toolchain, k) or
                               getattr(self.toolchain, k) != v))
             self.toolchain = self.toolchain.copy(**diff)
+
+        if openmp:
+            self.toolchain = self.toolchain.copy(
+                    cflags=list(self.toolchain.cflags) + ['-fopenmp'],
+                    ldflags=list(self.toolchain.ldflags) + ['-fopenmp'])
+
+        self.openmp = openmp
         self.tempdir = tempfile.mkdtemp(prefix="tmp_loopy")
         self.source_suffix = source_suffix
 
@@ -261,14 +288,42 @@ class CCompiler(object):
 
     def build(self, name, code, debug=False, wait_on_error=None,
                      debug_recompile=True):
-        """Compile code, build and load shared library."""
+        """Compile code, build and load shared library.
+
+        May be called concurrently from multiple threads for different
+        *name*/*code* pairs.
+        """
+        # The build directory identifies the compiler, also across pickling.
+        cache_key = (self.tempdir, name, code, debug)
+        with _loaded_libraries_lock:
+            dll = _loaded_libraries.pop(cache_key, None)
+            if dll is not None:
+                _loaded_libraries[cache_key] = dll
+
+        if dll is not None:
+            logger.debug('Kernel {0} retrieved from cache'.format(name))
+            return dll
+
         logger.debug(code)
-        c_fname = self._tempname('code.' + self.source_suffix)
+
+        # Give each distinct piece of code its own directory, so that
+        # concurrent builds neither overwrite each other's sources nor wait
+        # on each other's cache locks.
+        from hashlib import sha1
+        build_dir = self._tempname(
+                sha1((name + code).encode("utf-8")).hexdigest())
+        try:
+            os.mkdir(build_dir)
+        except OSError:
+            if not os.path.isdir(build_dir):
+                raise
+
+        c_fname = os.path.join(build_dir, 'code.' + self.source_suffix)
 
         # build object
         _, mod_name, ext_file, recompiled = \
             compile_from_string(self.toolchain, name, code, c_fname,
-                                self.tempdir, debug, wait_on_error,
+                                build_dir, debug, wait_on_error,
                                 debug_recompile, False)
 
         if recompiled:
@@ -277,7 +332,13 @@ class CCompiler(object):
             logger.debug('Kernel {0} retrieved from cache'.format(name))
 
         # and return compiled
-        return ctypes.CDLL(ext_file)
+        dll = ctypes.CDLL(ext_file)
+        with _loaded_libraries_lock:
+            _loaded_libraries[cache_key] = dll
+            while len(_loaded_libraries) > MAX_LOADED_LIBRARIES:
+                _loaded_libraries.popitem(last=False)
+
+        return dll
 
 
 class CPlusPlusCompiler(CCompiler):
@@ -286,12 +347,12 @@ class CPlusPlusCompiler(CCompiler):
     def __init__(self, cc='g++', cflags='-std=c++98 -O3 -fPIC'.split(),
                  ldflags=[], libraries=[],
                  include_dirs=[], library_dirs=[], defines=[],
-                 source_suffix='cpp'):
+                 source_suffix='cpp', openmp=False):
 
         super(CPlusPlusCompiler, self).__init__(
             cc=cc, cflags=cflags, ldflags=ldflags, libraries=libraries,
             include_dirs=include_dirs, library_dirs=library_dirs,
-            defines=defines, source_suffix=source_suffix)
+            defines=defines, source_suffix=source_suffix, openmp=openmp)
 
 
 class IDIToCDLL(object):
@@ -301,7 +362,9 @@ class IDIToCDLL(object):
     """
     def __init__(self, target):
         self.target = target
-        self.registry = target.get_dtype_registry().wrapped_registry
+        registry = target.get_dtype_registry()
+        # (not all targets wrap their registry, see e.g. ISPCTarget)
+        self.registry = getattr(registry, "wrapped_registry", registry)
 
     def __call__(self, knl, idi):
         # next loop through the implemented data info to get the arg data
@@ -344,13 +407,15 @@ class CompiledCKernel(object):
         # get the function declaration for interface with ctypes
         func_decl = IDIToCDLL(self.target)
         arg_info = func_decl(knl, idi)
-        self._fn = getattr(self.dll, self.name)
+        # Libraries may be shared among kernels, so obtain a function object
+        # that is not cached on the library.
+        self._fn = self.dll[self.name]
         # kernels are void by defn.
         self._fn.restype = None
         self._fn.argtypes = [ctype for ctype in arg_info]
 
-    def __call__(self, *args):
-        """Execute kernel with given args mapped to ctypes equivalents."""
+    def marshal_args(self, args):
+        """Map *args* to their ctypes equivalents."""
         args_ = []
         for arg, arg_t in zip(args, self._fn.argtypes):
             if hasattr(arg, 'ctypes'):
@@ -362,7 +427,295 @@ class CompiledCKernel(object):
             else:
                 arg_ = arg_t(arg)
             args_.append(arg_)
-        self._fn(*args_)
+        return args_
+
+    def __call__(self, *args):
+        """Execute kernel with given args mapped to ctypes equivalents."""
+        self._fn(*self.marshal_args(args))
+
+
+class _RecordingCKernel(object):
+    """Wraps a :class:`CompiledCKernel`, recording in *calls* how the
+    arguments of each call were marshalled.
+
+    Each entry of *calls* is a tuple ``(fn, arg_recipe)``, where
+    *arg_recipe* is a list with an entry ``(name, arg_type)`` for each
+    argument that is the array passed as keyword argument *name* (looked up
+    in *array_id_to_name* by :func:`id`), and ``(None, marshalled_arg)`` for
+    other arguments. If an array that was not passed as keyword argument
+    is passed, *arg_recipe* is *None*.
+    """
+
+    def __init__(self, c_kernel, calls, array_id_to_name):
+        self.c_kernel = c_kernel
+        self.calls = calls
+        self.array_id_to_name = array_id_to_name
+
+    def __call__(self, *args):
+        args_ = self.c_kernel.marshal_args(args)
+
+        arg_recipe = []
+        for arg, arg_, arg_t in zip(args, args_, self.c_kernel._fn.argtypes):
+            if hasattr(arg, 'ctypes') and arg.size:
+                name = self.array_id_to_name.get(id(arg))
+                if name is None:
+                    arg_recipe = None
+                    break
+
+                arg_recipe.append((name, arg_t))
+            else:
+                arg_recipe.append((None, arg_))
+
+        self.calls.append((self.c_kernel._fn, arg_recipe))
+        self.c_kernel._fn(*args_)
+
+
+def _get_arg_signature(arg):
+    if isinstance(arg, np.ndarray):
+        return (arg.shape, arg.strides, arg.dtype)
+    else:
+        return (type(arg), arg)
+
+
+def _get_call_signature(kwargs):
+    """Return a hashable signature of the keyword arguments *kwargs* of a call
+    to a :class:`CKernelExecutor`, or *None* if there is none.
+    """
+    signature = tuple(sorted(
+            (name, _get_arg_signature(value))
+            for name, value in six.iteritems(kwargs)))
+
+    try:
+        hash(signature)
+    except TypeError:
+        return None
+
+    return signature
+
+
+# the number of argument signatures per CKernelExecutor for which call plans
+# are kept with loopy.Options.c_exec_fast_call
+MAX_CALL_PLANS = 8
+
+
+class _CallPlan(object):
+    """How to make the calls of ctypes functions for a call to a
+    :class:`CKernelExecutor` with keyword arguments of a given signature (see
+    :func:`_get_call_signature`), in which all arrays passed to the compiled
+    kernels, including the outputs, are supplied by the caller.
+
+    Only the names of the arrays are kept, so that the plan applies to
+    any arrays of the same signature and holds no references to them.
+
+    .. attribute:: calls
+
+        A :class:`list` of tuples ``(fn, arg_recipe)``, as recorded by
+        :class:`_RecordingCKernel`.
+
+    .. attribute:: output_names
+
+        The names of the keyword arguments returned as outputs, either as a
+        :class:`tuple`, or as a :class:`dict` mapping the keys of the
+        returned :class:`dict` to names.
+    """
+
+    def __init__(self, calls, output_names):
+        self.calls = calls
+        self.output_names = output_names
+
+    def __call__(self, kwargs):
+        for fn, arg_recipe in self.calls:
+            fn(*[
+                kwargs[name].ctypes.data_as(value) if name is not None else value
+                for name, value in arg_recipe])
+
+        if isinstance(self.output_names, dict):
+            return None, dict(
+                    (key, kwargs[name])
+                    for key, name in six.iteritems(self.output_names))
+        else:
+            return None, tuple(kwargs[name] for name in self.output_names)
+
+
+def _make_call_plan(array_id_to_name, calls, outputs):
+    """Return a :class:`_CallPlan` for the call that was recorded in *calls*
+    and returned *outputs*, or *None* if the call used arrays not supplied by
+    the caller. *array_id_to_name* maps the :func:`id` of each array passed
+    as keyword argument to its name.
+    """
+    if any(arg_recipe is None for _, arg_recipe in calls):
+        return None
+
+    def get_output_name(output):
+        return array_id_to_name.get(id(output))
+
+    if isinstance(outputs, dict):
+        output_names = dict(
+                (key, get_output_name(output))
+                for key, output in six.iteritems(outputs))
+        all_output_names = list(output_names.values())
+    else:
+        output_names = tuple(get_output_name(output) for output in outputs)
+        all_output_names = output_names
+
+    if any(name is None for name in all_output_names):
+        return None
+
+    return _CallPlan(calls, output_names)
+
+
+# {{{ output allocation
+
+class _PoolBuffer(object):
+    """Exposes the first *nbytes* of *block* through the array interface.
+
+    Arrays created from an instance keep it (rather than *block*) as their
+    :attr:`numpy.ndarray.base`, as do all views of these, so that its
+    lifetime tells when memory handed out by :class:`HostMemoryPool` is no
+    longer in use.
+    """
+
+    def __init__(self, block, nbytes):
+        self.block = block
+        self.__array_interface__ = dict(
+                block.__array_interface__, shape=(nbytes,))
+
+
+class HostMemoryPool(object):
+    """An allocator for the output arrays of a :class:`CKernelExecutor`, to
+    be passed as its *allocator* argument. Memory of arrays allocated by
+    the pool is kept once they are no longer referenced and handed out again
+    for later allocations of similar size.
+
+    Sizes are rounded up to powers of two.
+
+    .. attribute:: held_bytes
+
+        The number of bytes of memory kept for reuse.
+
+    .. automethod:: __call__
+    .. automethod:: free_held
+    """
+
+    def __init__(self):
+        # maps bin sizes to lists of unused blocks of memory
+        self._bin_to_blocks = {}
+        # weak references to the buffers handed out, by id
+        self._live_refs = {}
+        self.held_bytes = 0
+
+    def __call__(self, nbytes):
+        """
+        :returns: a one-dimensional :class:`numpy.ndarray` of type
+            :class:`numpy.uint8` and length *nbytes*.
+        """
+        bin_size = 1
+        while bin_size < nbytes:
+            bin_size *= 2
+
+        blocks = self._bin_to_blocks.get(bin_size)
+        if blocks:
+            block = blocks.pop()
+            self.held_bytes -= bin_size
+        else:
+            block = np.empty(bin_size, np.uint8)
+
+        pool_buffer = _PoolBuffer(block, nbytes)
+
+        import weakref
+
+        def release(ref):
+            del self._live_refs[id(ref)]
+            self._bin_to_blocks.setdefault(bin_size, []).append(block)
+            self.held_bytes += bin_size
+
+        # NumPy collapses chains of views down to the object owning the
+        # memory, so the reference is on the buffer object, which is that
+        # owner for all arrays using the memory.
+        ref = weakref.ref(pool_buffer, release)
+        self._live_refs[id(ref)] = ref
+
+        return np.asarray(pool_buffer)
+
+    def free_held(self):
+        """Release the memory kept for reuse."""
+        self._bin_to_blocks.clear()
+        self.held_bytes = 0
+
+
+class CExecutorStatistics(Record):
+    """Counters for the calls of a :class:`CKernelExecutor`.
+
+    .. attribute:: calls
+
+    .. attribute:: allocations
+
+        The number of output arrays allocated.
+
+    .. attribute:: allocated_bytes
+
+        The total size of the output arrays allocated.
+
+    .. attribute:: reused_outputs
+
+        The number of times an output array was reused rather than allocated,
+        see :attr:`loopy.Options.c_exec_reuse_outputs`.
+    """
+
+    def __init__(self):
+        Record.__init__(self,
+                calls=0,
+                allocations=0,
+                allocated_bytes=0,
+                reused_outputs=0)
+
+
+class _OutputAllocator(object):
+    """Allocates the output arrays for the invoker generated by
+    :class:`CExecutionWrapperGenerator`.
+
+    :arg allocator: *None*, or a callable taking a number of bytes and
+        returning an object supporting the buffer protocol of at least
+        that size.
+    :arg kept_outputs: *None*, or a :class:`dict` in which allocated arrays
+        are kept for reuse.
+    :arg statistics: *None*, or a :class:`CExecutorStatistics` to update.
+    """
+
+    def __init__(self, allocator=None, kept_outputs=None, statistics=None):
+        self.allocator = allocator
+        self.kept_outputs = kept_outputs
+        self.statistics = statistics
+
+    def __call__(self, name, shape, dtype, order):
+        key = (shape, dtype, order)
+
+        if self.kept_outputs is not None:
+            kept_key, ary = self.kept_outputs.get(name, (None, None))
+            if kept_key == key:
+                if self.statistics is not None:
+                    self.statistics.reused_outputs += 1
+                return ary
+
+        if self.allocator is None:
+            ary = np.empty(shape, dtype, order=order)
+        else:
+            nbytes = np.dtype(dtype).itemsize
+            for length in shape:
+                nbytes *= length
+            ary = np.ndarray(shape, dtype, buffer=self.allocator(nbytes),
+                    order=order)
+
+        if self.statistics is not None:
+            self.statistics.allocations += 1
+            self.statistics.allocated_bytes += ary.nbytes
+
+        if self.kept_outputs is not None:
+            self.kept_outputs[name] = (key, ary)
+
+        return ary
+
+# }}}
 
 
 class CKernelExecutor(KernelExecutorBase):
@@ -384,12 +737,31 @@ class CKernelExecutor(KernelExecutorBase):
         self.compiler = compiler if compiler else CCompiler()
         super(CKernelExecutor, self).__init__(kernel)
 
+        # maps call signatures to call plans, or to None if a call with the
+        # signature cannot be planned, most recently used last
+        from collections import OrderedDict
+        self._call_plans = OrderedDict()
+
+        self.statistics = CExecutorStatistics()
+
+        if self.kernel.options.c_exec_reuse_outputs:
+            self._kept_outputs = {}
+        else:
+            self._kept_outputs = None
+
+        self._default_output_allocator = _OutputAllocator(
+                kept_outputs=self._kept_outputs, statistics=self.statistics)
+
     def get_invoker_uncached(self, kernel, codegen_result):
         generator = CExecutionWrapperGenerator()
         return generator(kernel, codegen_result)
 
     @memoize_method
-    def kernel_info(self, arg_to_dtype_set=frozenset(), all_kwargs=None):
+    def _kernel_and_code(self, arg_to_dtype_set):
+        """
+        :returns: a tuple ``(kernel, codegen_result, all_code)``, where
+            *all_code* is the source to be compiled for each device program.
+        """
         kernel = self.get_typed_and_scheduled_kernel(arg_to_dtype_set)
 
         from loopy.codegen import generate_code_v2
@@ -416,8 +788,22 @@ class CKernelExecutor(KernelExecutorBase):
             # update code from editor
             all_code = '\n'.join([dev_code, '', host_code])
 
+        return kernel, codegen_result, all_code
+
+    def _get_called_programs(self, codegen_result):
+        """
+        :returns: the programs of *codegen_result* that are called, in
+            order, by the invoker.
+        """
+        return codegen_result.device_programs
+
+    @memoize_method
+    def kernel_info(self, arg_to_dtype_set=frozenset(), all_kwargs=None):
+        kernel, codegen_result, all_code = \
+                self._kernel_and_code(arg_to_dtype_set)
+
         c_kernels = []
-        for dp in codegen_result.device_programs:
+        for dp in self._get_called_programs(codegen_result):
             c_kernels.append(CompiledCKernel(dp,
                 codegen_result.implemented_data_info, all_code, self.kernel.target,
                 self.compiler))
@@ -430,8 +816,20 @@ class CKernelExecutor(KernelExecutorBase):
 
     # }}}
 
+    def _get_output_allocator(self, allocator):
+        if allocator is None:
+            return self._default_output_allocator
+
+        return _OutputAllocator(allocator,
+                kept_outputs=self._kept_outputs, statistics=self.statistics)
+
     def __call__(self, *args, **kwargs):
         """
+        :arg allocator: (keyword only) a callable taking a number of bytes
+            and returning an object supporting the buffer protocol of at
+            least that size, such as a :class:`HostMemoryPool`, used to
+            allocate output arrays not passed by the caller. By default, these
+            are allocated using :func:`numpy.empty`.
         :returns: ``(None, output)`` the output is a tuple of output arguments
             (arguments that are written as part of the kernel). The order is given
             by the order of kernel arguments. If this order is unspecified
@@ -441,9 +839,137 @@ class CKernelExecutor(KernelExecutorBase):
             of the returned arrays.
         """
 
+        alloc = self._get_output_allocator(kwargs.pop("allocator", None))
+        self.statistics.calls += 1
+
         kwargs = self.packing_controller.unpack(kwargs)
 
+        if self.kernel.options.c_exec_fast_call and not args:
+            return self._fast_call(alloc, kwargs)
+
         kernel_info = self.kernel_info(self.arg_to_dtype_set(kwargs))
 
         return kernel_info.invoker(
-                kernel_info.c_kernels, *args, **kwargs)
+                kernel_info.c_kernels, alloc, *args, **kwargs)
+
+    def _fast_call(self, alloc, kwargs):
+        """Implements :attr:`loopy.Options.c_exec_fast_call`."""
+        signature = _get_call_signature(kwargs)
+
+        if signature is not None:
+            try:
+                plan = self._call_plans.pop(signature)
+            except KeyError:
+                pass
+            else:
+                self._call_plans[signature] = plan
+                if plan is not None:
+                    return plan(kwargs)
+
+        kernel_info = self.kernel_info(self.arg_to_dtype_set(kwargs))
+
+        # Arrays passed under more than one name cannot be told apart.
+        array_id_to_name = {}
+        for name, value in six.iteritems(kwargs):
+            if hasattr(value, 'ctypes'):
+                if id(value) in array_id_to_name:
+                    signature = None
+                array_id_to_name[id(value)] = name
+
+        calls = []
+        result = kernel_info.invoker(
+                [_RecordingCKernel(c_kernel, calls, array_id_to_name)
+                    for c_kernel in kernel_info.c_kernels],
+                alloc, **kwargs)
+
+        if signature is not None:
+            _, outputs = result
+            self._call_plans[signature] = _make_call_plan(
+                    array_id_to_name, calls, outputs)
+
+            if len(self._call_plans) > MAX_CALL_PLANS:
+                self._call_plans.popitem(last=False)
+
+        return result
+
+
+def build_c_kernel_executors(executors, nthreads=None):
+    """Generate code for and compile the kernels of many
+    :class:`CKernelExecutor` instances at once, running up to *nthreads*
+    compiler processes concurrently.
+
+    Afterwards, calling the executors with arguments of the given types incurs
+    no further code generation or compilation, as the same caches are
+    populated as by the first call of each executor.
+
+    :arg executors: a sequence, each entry of which is either a
+        :class:`CKernelExecutor` or a tuple ``(executor, arg_to_dtype)``,
+        where *arg_to_dtype* maps the names of arguments without a type in
+        the kernel to the :class:`numpy.dtype` they will be called with.
+    :arg nthreads: the number of concurrent builds. Defaults to the
+        number of CPUs.
+    :returns: a list of the :class:`_KernelInfo` instances of the executors.
+    """
+
+    executor_and_dtype_sets = []
+    for entry in executors:
+        if isinstance(entry, tuple):
+            executor, arg_to_dtype = entry
+        else:
+            executor, arg_to_dtype = entry, {}
+
+        # Match the key under which CKernelExecutor.__call__ looks up the
+        # kernel info.
+        if executor.has_runtime_typed_args:
+            arg_to_dtype_set = frozenset(
+                    (arg_name, np.dtype(dtype))
+                    for arg_name, dtype in six.iteritems(arg_to_dtype))
+        else:
+            arg_to_dtype_set = None
+
+        executor_and_dtype_sets.append((executor, arg_to_dtype_set))
+
+    # {{{ generate code serially and gather the distinct builds
+
+    builds = []
+    seen_builds = set()
+    for executor, arg_to_dtype_set in executor_and_dtype_sets:
+        _, codegen_result, all_code = executor._kernel_and_code(arg_to_dtype_set)
+
+        for dp in executor._get_called_programs(codegen_result):
+            build_key = (executor.compiler, dp.name, all_code)
+            if build_key not in seen_builds:
+                seen_builds.add(build_key)
+                builds.append(build_key)
+
+    # }}}
+
+    def build(build_key):
+        compiler, name, code = build_key
+        compiler.build(name, code)
+
+    if nthreads is None:
+        import multiprocessing
+        nthreads = multiprocessing.cpu_count()
+    nthreads = min(nthreads, len(builds))
+
+    logger.info("building %d C kernels using %d threads"
+            % (len(builds), nthreads))
+
+    if nthreads > 1:
+        # The compiler runs in subprocesses, so threads suffice to keep the
+        # builds concurrent.
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(nthreads)
+        try:
+            pool.map(build, builds)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for build_key in builds:
+            build(build_key)
+
+    return [
+            executor.kernel_info(arg_to_dtype_set)
+            for executor, arg_to_dtype_set in executor_and_dtype_sets]
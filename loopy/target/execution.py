@@ -33,7 +33,7 @@ from pytools.py_codegen import (
 import logging
 logger = logging.getLogger(__name__)
 
-from pytools.persistent_dict import WriteOncePersistentDict
+from loopy.caching import TieredCache
 from loopy.tools import LoopyKeyBuilder
 from loopy.version import DATA_MODEL_VERSION
 
@@ -693,13 +693,15 @@ class _Kernels(object):
     pass
 
 
-typed_and_scheduled_cache = WriteOncePersistentDict(
+typed_and_scheduled_cache = TieredCache(
+        "typed_and_scheduled",
         "loopy-typed-and-scheduled-cache-v1-"+DATA_MODEL_VERSION,
         key_builder=LoopyKeyBuilder())
 
 
-invoker_cache = WriteOncePersistentDict(
-        "loopy-invoker-cache-v1-"+DATA_MODEL_VERSION,
+invoker_cache = TieredCache(
+        "invoker",
+        "loopy-invoker-cache-v2-"+DATA_MODEL_VERSION,
         key_builder=LoopyKeyBuilder())
 
 
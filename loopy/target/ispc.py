@@ -26,7 +26,7 @@ THE SOFTWARE.
 
 
 import numpy as np  # noqa
-from loopy.target.c import CTarget, CASTBuilder
+from loopy.target.c import CTarget, ExecutableCTarget, CASTBuilder
 from loopy.target.c.codegen.expression import ExpressionToCExpressionMapper
 from loopy.diagnostic import LoopyError
 from loopy.symbolic import Literal
@@ -200,6 +200,39 @@ class ISPCTarget(CTarget):
     # }}}
 
 
+class ExecutableISPCTarget(ISPCTarget, ExecutableCTarget):
+    """An :class:`ISPCTarget` that compiles kernels using
+    :class:`loopy.target.ispc_execution.ISPCCompiler` and runs them when
+    called with :mod:`numpy` arrays, like :class:`ExecutableCTarget`.
+
+    The length of local axis 0 must match the number of program instances
+    per gang of the ISPC compilation target. Group axes are run as ISPC tasks,
+    in parallel using OpenMP.
+
+    .. versionadded:: 2018.2
+    """
+
+    def __init__(self, compiler=None):
+        """
+        :arg compiler: an instance of
+            :class:`loopy.target.ispc_execution.ISPCCompiler`
+        """
+        # The call signature generated in OCCA mode is not understood by the
+        # invoker.
+        self.occa_mode = False
+        CTarget.__init__(self)
+
+        if compiler is None:
+            from loopy.target.ispc_execution import ISPCCompiler
+            compiler = ISPCCompiler()
+
+        self.compiler = compiler
+
+    def get_kernel_executor(self, knl, *args, **kwargs):
+        from loopy.target.ispc_execution import ISPCKernelExecutor
+        return ISPCKernelExecutor(knl, compiler=self.compiler)
+
+
 class ISPCASTBuilder(CASTBuilder):
     def _arg_names_and_decls(self, codegen_state):
         implemented_data_info = codegen_state.implemented_data_info
@@ -0,0 +1,259 @@
+from __future__ import division, with_statement, absolute_import
+
+__copyright__ = "Copyright (C) 2018 Andreas Kloeckner"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import ctypes
+
+from loopy.target.c.c_execution import CKernelExecutor
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# {{{ task system
+
+# A minimal implementation of the task launch interface that ISPC-generated
+# code calls into. Tasks of a launch are run to completion by an OpenMP
+# parallel loop within ISPCLaunch (or sequentially, if built without OpenMP),
+# so that ISPCSync only needs to release the memory of the launch.
+
+TASKSYS_SOURCE = r"""
+#include <stdint.h>
+#include <stdlib.h>
+#include <vector>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+typedef void (*TaskFuncType)(void *data, int threadIndex, int threadCount,
+                             int taskIndex, int taskCount,
+                             int taskIndex0, int taskIndex1, int taskIndex2,
+                             int taskCount0, int taskCount1, int taskCount2);
+
+struct TaskGroup
+{
+    std::vector<void *> allocations;
+};
+
+static TaskGroup *get_task_group(void **handlePtr)
+{
+    if (*handlePtr == NULL)
+        *handlePtr = new TaskGroup;
+    return (TaskGroup *) *handlePtr;
+}
+
+extern "C" {
+    void ISPCLaunch(void **handlePtr, void *f, void *data,
+                    int count0, int count1, int count2);
+    void *ISPCAlloc(void **handlePtr, int64_t size, int32_t alignment);
+    void ISPCSync(void *handle);
+}
+
+void ISPCLaunch(void **handlePtr, void *f, void *data,
+                int count0, int count1, int count2)
+{
+    get_task_group(handlePtr);
+    TaskFuncType func = (TaskFuncType) f;
+    int count = count0*count1*count2;
+
+    #pragma omp parallel for schedule(static)
+    for (int i = 0; i < count; ++i)
+    {
+#ifdef _OPENMP
+        int threadIndex = omp_get_thread_num();
+        int threadCount = omp_get_num_threads();
+#else
+        int threadIndex = 0;
+        int threadCount = 1;
+#endif
+        func(data, threadIndex, threadCount, i, count,
+             i % count0, (i / count0) % count1, i / (count0*count1),
+             count0, count1, count2);
+    }
+}
+
+void *ISPCAlloc(void **handlePtr, int64_t size, int32_t alignment)
+{
+    TaskGroup *group = get_task_group(handlePtr);
+
+    if (alignment < (int32_t) sizeof(void *))
+        alignment = sizeof(void *);
+
+    void *result;
+    if (posix_memalign(&result, alignment, size))
+        return NULL;
+
+    group->allocations.push_back(result);
+    return result;
+}
+
+void ISPCSync(void *handle)
+{
+    TaskGroup *group = (TaskGroup *) handle;
+    if (group == NULL)
+        return;
+
+    for (size_t i = 0; i < group->allocations.size(); ++i)
+        free(group->allocations[i]);
+    delete group;
+}
+"""
+
+# }}}
+
+
+# {{{ compiler
+
+class ISPCCompiler(object):
+    """Builds ISPC code into a shared library, together with a task system
+    in C++ that runs the tasks of each launch in parallel using OpenMP, and
+    loads the result as a :class:`ctypes.CDLL`.
+
+    Built libraries are kept in a directory keyed by a hash of the code
+    and the build options, so that building the same code again (also from a
+    different process) only loads the library.
+
+    :arg ispc_options: passed to *ispc_bin*. The number of program instances
+        per gang implied by the ``--target`` given here must match the length
+        of local axis 0 of the kernels being built.
+    :arg cxx_options: passed to *cxx_bin* when compiling the task system and
+        linking.
+    :arg cache_dir: defaults to a subdirectory of
+        :func:`loopy.caching.get_cache_dir`.
+    """
+
+    def __init__(self, ispc_bin="ispc", ispc_options=["-O2"],
+            cxx_bin="g++", cxx_options=["-O2", "-fopenmp"],
+            cache_dir=None):
+        self.ispc_bin = ispc_bin
+        self.ispc_options = list(ispc_options)
+        self.cxx_bin = cxx_bin
+        self.cxx_options = list(cxx_options)
+
+        if cache_dir is None:
+            from loopy.caching import get_cache_dir
+            cache_dir = os.path.join(get_cache_dir(), "ispc-build")
+        self.cache_dir = cache_dir
+
+        # maps (name, code) to loaded libraries
+        self._dll_cache = {}
+
+    def _get_build_key(self, code):
+        from hashlib import sha1
+        checksum = sha1()
+        for item in ([self.ispc_bin, self.cxx_bin, code, TASKSYS_SOURCE]
+                + self.ispc_options + self.cxx_options):
+            checksum.update(item.encode("utf-8"))
+            checksum.update(b"\0")
+
+        return checksum.hexdigest()
+
+    def build(self, name, code):
+        """Compile *code*, build and load shared library.
+
+        May be called concurrently from multiple threads for different
+        *name*/*code* pairs.
+        """
+        cache_key = (name, code)
+        try:
+            return self._dll_cache[cache_key]
+        except KeyError:
+            pass
+
+        logger.debug(code)
+
+        build_dir = os.path.join(self.cache_dir, self._get_build_key(code))
+        lib_fname = os.path.join(build_dir, "shared.so")
+
+        if os.path.exists(lib_fname):
+            logger.debug("Kernel {0} retrieved from cache".format(name))
+        else:
+            try:
+                os.makedirs(self.cache_dir)
+            except OSError:
+                if not os.path.isdir(self.cache_dir):
+                    raise
+
+            # Build in a private directory and move it into place once
+            # complete, so that concurrent builds of the same code neither
+            # interfere nor expose an incomplete library.
+            import tempfile
+            import shutil
+            tmp_dir = tempfile.mkdtemp(prefix="tmp-", dir=self.cache_dir)
+
+            try:
+                from loopy.tools import build_ispc_shared_lib
+                build_ispc_shared_lib(
+                        tmp_dir,
+                        [("code.ispc", code)],
+                        [("tasksys.cpp", TASKSYS_SOURCE)],
+                        ispc_options=self.ispc_options,
+                        cxx_options=self.cxx_options,
+                        ispc_bin=self.ispc_bin,
+                        cxx_bin=self.cxx_bin)
+
+                try:
+                    os.rename(tmp_dir, build_dir)
+                except OSError:
+                    # built concurrently by someone else
+                    if not os.path.exists(lib_fname):
+                        raise
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+            except Exception:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+
+            logger.debug("Kernel {0} compiled from source".format(name))
+
+        dll = ctypes.CDLL(lib_fname)
+        self._dll_cache[cache_key] = dll
+        return dll
+
+# }}}
+
+
+# {{{ kernel executor
+
+class ISPCKernelExecutor(CKernelExecutor):
+    """An object connecting a kernel with an
+    :class:`loopy.target.ispc.ExecutableISPCTarget` to its compiled form for
+    execution. Uses the same invoker as :class:`CKernelExecutor`, which calls
+    the host program exported by the ISPC code.
+
+    .. automethod:: __init__
+    .. automethod:: __call__
+    """
+
+    def __init__(self, kernel, compiler=None):
+        super(ISPCKernelExecutor, self).__init__(
+                kernel, compiler=compiler if compiler else ISPCCompiler())
+
+    def _get_called_programs(self, codegen_result):
+        # The device programs are ISPC tasks launched by the host program.
+        return [codegen_result.host_program]
+
+# }}}
+
+# vim: foldmethod=marker
@@ -30,7 +30,7 @@ from pytools import memoize_method
 from loopy.target.python import ExpressionToPythonMapper, PythonASTBuilderBase
 from loopy.target import TargetBase, DummyHostASTBuilder
 
-from loopy.diagnostic import LoopyWarning
+from loopy.diagnostic import LoopyError, LoopyWarning
 
 
 # {{{ base numba
@@ -80,23 +80,113 @@ class NumbaBaseASTBuilder(PythonASTBuilderBase):
                 ))
 
 
+GROUP_INDEX_PREFIX = "_lpy_gid_"
+
+
+class NumbaJITExpressionToPythonMapper(ExpressionToPythonMapper):
+    def map_group_hw_index(self, expr, enclosing_prec):
+        return GROUP_INDEX_PREFIX + str(expr.axis)
+
+
 class NumbaJITASTBuilder(NumbaBaseASTBuilder):
     def get_python_function_decorators(self):
         return ("@_lpy_numba.jit",)
 
+    def _get_group_sizes(self, codegen_state, schedule_index):
+        if not codegen_state.is_generating_device_code:
+            return ()
+
+        kernel = codegen_state.kernel
+
+        from loopy.schedule import get_insn_ids_for_block_at
+        gsize, _ = kernel.get_grid_sizes_for_insn_ids_as_exprs(
+                get_insn_ids_for_block_at(kernel.schedule, schedule_index))
+
+        return gsize
+
+    def get_function_definition(self, codegen_state, codegen_result,
+            schedule_index,
+            function_decl, function_body):
+        gsize = self._get_group_sizes(codegen_state, schedule_index)
+
+        if gsize:
+            # Each group index becomes a loop, the outermost of which is
+            # run in parallel if the kernel is compiled with parallel=True.
+            from genpy import For, Suite
+            from pymbolic.mapper.stringifier import PREC_NONE
+
+            ecm = self.get_expression_to_code_mapper(codegen_state)
+
+            function_body = Suite(
+                    super(NumbaJITASTBuilder, self).get_temporary_decls(
+                        codegen_state, schedule_index)
+                    + [function_body])
+
+            for axis, size in enumerate(gsize):
+                range_func = (
+                        "_lpy_numba.prange" if axis == len(gsize) - 1
+                        else "range")
+                function_body = For(
+                        (GROUP_INDEX_PREFIX + str(axis),),
+                        "%s(%s)" % (range_func, ecm(size, PREC_NONE)),
+                        function_body)
+
+        return super(NumbaJITASTBuilder, self).get_function_definition(
+                codegen_state, codegen_result, schedule_index,
+                function_decl, function_body)
+
+    def get_temporary_decls(self, codegen_state, schedule_index):
+        if self._get_group_sizes(codegen_state, schedule_index):
+            # declared per group in get_function_definition
+            return []
+
+        return super(NumbaJITASTBuilder, self).get_temporary_decls(
+                codegen_state, schedule_index)
+
+    def get_expression_to_code_mapper(self, codegen_state):
+        return NumbaJITExpressionToPythonMapper(codegen_state)
+
 
 class NumbaTarget(TargetBase):
-    """A target for plain Python as understood by Numba, without any parallel extensions.
+    """A target for plain Python as understood by Numba, without CUDA extensions.
+
+    Group axes are implemented as loops, the outermost of which uses
+    :func:`numba.prange`. Local axes are not supported.
+
+    Kernels for this target may be called with :mod:`numpy` arrays, see
+    :class:`loopy.target.numba_execution.NumbaKernelExecutor`.
     """
 
-    def __init__(self):
+    hash_fields = TargetBase.hash_fields + ("parallel",)
+    comparison_fields = TargetBase.comparison_fields + ("parallel",)
+
+    def __init__(self, parallel=False):
+        """
+        :arg parallel: whether kernels are compiled with ``parallel=True``
+            when called, running the outermost group axis in parallel.
+        """
         from warnings import warn
         warn("The Numba targets are not yet feature-complete",
                 LoopyWarning, stacklevel=2)
 
+        self.parallel = parallel
+
     def split_kernel_at_global_barriers(self):
         return False
 
+    def pre_codegen_check(self, kernel):
+        gsize, lsize = kernel.get_grid_size_upper_bounds_as_exprs()
+        if lsize:
+            raise LoopyError("local axes are unsupported by %s"
+                    % type(self).__name__)
+
+    def get_kernel_executor_cache_key(self, *args, **kwargs):
+        return None
+
+    def get_kernel_executor(self, knl, *args, **kwargs):
+        from loopy.target.numba_execution import NumbaKernelExecutor
+        return NumbaKernelExecutor(knl, parallel=self.parallel)
+
     def get_host_ast_builder(self):
         return DummyHostASTBuilder(self)
 
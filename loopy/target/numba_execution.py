@@ -0,0 +1,185 @@
+from __future__ import division, with_statement, absolute_import
+
+__copyright__ = "Copyright (C) 2018 Andreas Kloeckner"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+
+from pytools import memoize_method
+
+from loopy.target.execution import (KernelExecutorBase, _KernelInfo,
+        get_highlighted_python_code)
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# {{{ module loading
+
+# maps (source, jit options) to the namespace of the loaded module
+_module_cache = {}
+
+
+def _get_source_file(code):
+    """Write *code* to a file in the cache directory named after its hash,
+    unless it exists, and return the file name. Numba requires the source of
+    functions to be available in a file to be able to cache their compiled
+    form on disk.
+    """
+    from loopy.caching import get_cache_dir
+    source_dir = os.path.join(get_cache_dir(), "numba-source")
+
+    from hashlib import sha1
+    fname = os.path.join(
+            source_dir,
+            "lpy_%s.py" % sha1(code.encode("utf-8")).hexdigest())
+
+    if not os.path.exists(fname):
+        try:
+            os.makedirs(source_dir)
+        except OSError:
+            if not os.path.isdir(source_dir):
+                raise
+
+        # Rewriting an existing file would change its modification time and
+        # so invalidate numba's cache, so move the file into place instead.
+        import tempfile
+        fd, tmp_fname = tempfile.mkstemp(suffix=".py", dir=source_dir)
+        with os.fdopen(fd, "w") as outf:
+            outf.write(code)
+        os.rename(tmp_fname, fname)
+
+    return fname
+
+
+def load_numba_kernels(code, names, parallel=False):
+    """Execute the Python module *code* generated for a
+    :class:`loopy.target.numba.NumbaTarget` and return the functions named
+    *names* from it, compiled using :func:`numba.jit` in ``nopython`` mode with
+    ``cache=True``.
+
+    The compiled functions are shared among all callers passing the same
+    *code*.
+
+    :arg parallel: passed to :func:`numba.jit`.
+    """
+    cache_key = (code, parallel)
+    try:
+        namespace = _module_cache[cache_key]
+    except KeyError:
+        fname = _get_source_file(code)
+
+        namespace = {"__name__": "loopy_numba_kernels", "__file__": fname}
+        exec(compile(code, fname, "exec"), namespace)
+
+        import numba
+        jit = numba.jit(nopython=True, cache=True, parallel=parallel)
+
+        for name, value in list(namespace.items()):
+            # The generated code applies numba.jit without options.
+            py_func = getattr(value, "py_func", None)
+            if py_func is not None:
+                namespace[name] = jit(py_func)
+
+        _module_cache[cache_key] = namespace
+
+    return [namespace[name] for name in names]
+
+# }}}
+
+
+# {{{ kernel executor
+
+class NumbaKernelExecutor(KernelExecutorBase):
+    """An object connecting a kernel with a
+    :class:`loopy.target.numba.NumbaTarget` to its compiled form for
+    execution on :mod:`numpy` arrays. The invoker is that of
+    :class:`loopy.target.c.c_execution.CKernelExecutor`.
+
+    .. automethod:: __init__
+    .. automethod:: __call__
+    """
+
+    def __init__(self, kernel, parallel=False):
+        """
+        :arg parallel: passed to :func:`load_numba_kernels`.
+        """
+        super(NumbaKernelExecutor, self).__init__(kernel)
+        self.parallel = parallel
+
+    def get_invoker_uncached(self, kernel, codegen_result):
+        from loopy.target.c.c_execution import CExecutionWrapperGenerator
+        generator = CExecutionWrapperGenerator()
+        return generator(kernel, codegen_result)
+
+    @memoize_method
+    def kernel_info(self, arg_to_dtype_set=frozenset(), all_kwargs=None):
+        kernel = self.get_typed_and_scheduled_kernel(arg_to_dtype_set)
+
+        from loopy.codegen import generate_code_v2
+        codegen_result = generate_code_v2(kernel)
+
+        dev_code = codegen_result.device_code()
+
+        if self.kernel.options.write_cl:
+            output = dev_code
+            if self.kernel.options.highlight_cl:
+                output = get_highlighted_python_code(output)
+
+            if self.kernel.options.write_cl is True:
+                print(output)
+            else:
+                with open(self.kernel.options.write_cl, "w") as outf:
+                    outf.write(output)
+
+        if self.kernel.options.edit_cl:
+            from pytools import invoke_editor
+            dev_code = invoke_editor(dev_code, "code.py")
+
+        numba_kernels = load_numba_kernels(
+                dev_code,
+                [dp.name for dp in codegen_result.device_programs],
+                parallel=self.parallel)
+
+        return _KernelInfo(
+                kernel=kernel,
+                numba_kernels=numba_kernels,
+                implemented_data_info=codegen_result.implemented_data_info,
+                invoker=self.get_invoker(kernel, codegen_result))
+
+    def __call__(self, *args, **kwargs):
+        """
+        :returns: ``(None, output)``, as for
+            :meth:`loopy.target.c.c_execution.CKernelExecutor.__call__`.
+        """
+
+        kwargs = self.packing_controller.unpack(kwargs)
+
+        kernel_info = self.kernel_info(self.arg_to_dtype_set(kwargs))
+
+        from loopy.target.c.c_execution import _OutputAllocator
+        return kernel_info.invoker(
+                kernel_info.numba_kernels, _OutputAllocator(), *args, **kwargs)
+
+# }}}
+
+# vim: foldmethod=marker
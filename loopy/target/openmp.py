@@ -0,0 +1,560 @@
+"""Target for C parallelized across CPU cores using OpenMP."""
+
+from __future__ import division, absolute_import
+
+__copyright__ = "Copyright (C) 2018 Andreas Kloeckner"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import six
+
+from cgen import (
+        Assign, Block, Comment, For, If, Initializer, InlineInitializer,
+        Declarator, Line, Pragma)
+
+from loopy.target.c import CTarget, ExecutableCTarget, CASTBuilder, POD
+from loopy.target.c.codegen.expression import ExpressionToCExpressionMapper
+from loopy.diagnostic import LoopyError
+from loopy.kernel.data import temp_var_scope
+from loopy.symbolic import DependencyMapper
+from pymbolic import var
+import pymbolic.primitives as p
+from pymbolic.mapper.stringifier import PREC_NONE
+
+
+GROUP_INDEX_PREFIX = "_lpy_gid_"
+LOCAL_INDEX_PREFIX = "_lpy_lid_"
+
+
+# {{{ expression mapper
+
+def _get_grid_sizes(codegen_state):
+    """Return the global and local sizes of the subkernel for which code is
+    being generated, which are those looped over in its device program.
+    """
+    kernel = codegen_state.kernel
+
+    if not codegen_state.is_generating_device_code:
+        return kernel.get_grid_size_upper_bounds_as_exprs()
+
+    from loopy.kernel.tools import get_subkernel_to_insn_id_map
+    return kernel.get_grid_sizes_for_insn_ids_as_exprs(
+            get_subkernel_to_insn_id_map(kernel)[
+                codegen_state.gen_program_name])
+
+
+def _get_flat_local_index(mapper):
+    """Return the C expression for the linear index of the current work-item
+    within its work-group, with axis 0 varying fastest.
+    """
+    _, lsize = _get_grid_sizes(mapper.codegen_state)
+
+    result = None
+    for axis in reversed(range(len(lsize))):
+        local_index = var(LOCAL_INDEX_PREFIX + str(axis))
+        if result is None:
+            result = local_index
+        else:
+            result = result*mapper.rec(lsize[axis], "i") + local_index
+
+    return result
+
+
+class ExprToOpenMPCExprMapper(ExpressionToCExpressionMapper):
+    def map_group_hw_index(self, expr, type_context):
+        return var(GROUP_INDEX_PREFIX + str(expr.axis))
+
+    def map_local_hw_index(self, expr, type_context):
+        return var(LOCAL_INDEX_PREFIX + str(expr.axis))
+
+    def map_variable(self, expr, type_context):
+        tv = self.kernel.temporary_variables.get(expr.name)
+
+        if tv is not None and tv.scope == temp_var_scope.PRIVATE:
+            # Work-items of a work-group share a thread, so each private
+            # temporary is duplicated per work-item. (See also below in decl
+            # generation)
+            gsize, lsize = _get_grid_sizes(self.codegen_state)
+            if lsize:
+                return var(expr.name)[_get_flat_local_index(self)]
+
+        return super(ExprToOpenMPCExprMapper, self).map_variable(
+                expr, type_context)
+
+    def map_subscript(self, expr, type_context):
+        from loopy.kernel.data import TemporaryVariable
+
+        ary = self.find_array(expr)
+
+        if (isinstance(ary, TemporaryVariable)
+                and ary.scope == temp_var_scope.PRIVATE):
+            gsize, lsize = _get_grid_sizes(self.codegen_state)
+            if lsize:
+                from loopy.kernel.array import get_access_info
+                from pymbolic import evaluate
+
+                access_info = get_access_info(self.kernel.target, ary, expr.index,
+                    lambda expr: evaluate(expr, self.codegen_state.var_subst_map),
+                    self.codegen_state.vectorization_info)
+
+                subscript, = access_info.subscripts
+                return var(access_info.array_name)[
+                        _get_flat_local_index(self)
+                        + self.rec(p.flattened_product(lsize)*subscript, "i")]
+
+        return super(ExprToOpenMPCExprMapper, self).map_subscript(
+                expr, type_context)
+
+# }}}
+
+
+# {{{ work-group and work-item loop construction
+
+class OpenMPBarrier(Comment):
+    """A marker for a barrier in the body of a device program, removed when
+    the work-group and work-item loops are built around the body.
+    """
+
+    def __init__(self, synchronization_kind, comment):
+        self.synchronization_kind = synchronization_kind
+        self.comment = comment
+        super(OpenMPBarrier, self).__init__(
+                "%s barrier: %s" % (synchronization_kind, comment))
+
+
+def _contents(node):
+    if isinstance(node, Block):
+        return list(node.contents)
+    else:
+        return [node]
+
+
+def _contains_barrier(node, synchronization_kind):
+    if isinstance(node, OpenMPBarrier):
+        return node.synchronization_kind == synchronization_kind
+    elif isinstance(node, Block):
+        return any(_contains_barrier(child, synchronization_kind)
+                for child in node.contents)
+    elif isinstance(node, For):
+        return _contains_barrier(node.body, synchronization_kind)
+    elif isinstance(node, If):
+        return (_contains_barrier(node.then_, synchronization_kind)
+                or (node.else_ is not None
+                    and _contains_barrier(node.else_, synchronization_kind)))
+    else:
+        return False
+
+
+class _CDependencyMapper(DependencyMapper):
+    def map_literal(self, expr):
+        return set()
+
+    def map_array_literal(self, expr):
+        return self.combine(self.rec(child) for child in expr.children)
+
+
+def _get_expression_names(code):
+    """Return the names of the variables read by the C expression *code*, or
+    *None* if *code* is not an expression (such as a string of C code).
+    """
+    from loopy.target.c import CExpression
+    if isinstance(code, CExpression):
+        code = code.expr
+
+    if p.is_constant(code):
+        return set()
+    if not isinstance(code, p.Expression):
+        return None
+
+    dep_mapper = _CDependencyMapper(
+            include_subscripts=False, include_lookups=False,
+            include_calls=False)
+    return set(dep.name for dep in dep_mapper(code))
+
+
+def _get_used_names(node):
+    """Return the names of the variables used by the statement *node*, or
+    *None* if they cannot be determined.
+    """
+    if isinstance(node, (Line, Comment, Pragma, Declarator)):
+        return set()
+    elif isinstance(node, Initializer):
+        return _get_expression_names(node.data)
+    elif isinstance(node, Assign):
+        codes = [node.lvalue, node.rvalue]
+        children = []
+    elif isinstance(node, Block):
+        codes = []
+        children = node.contents
+    elif isinstance(node, For) and isinstance(node.start, Initializer):
+        # The update of the loop variable declared in the start is left out.
+        codes = [node.start.data, node.condition]
+        children = [node.body]
+    elif isinstance(node, If):
+        codes = [node.condition]
+        children = [node.then_] + (
+                [node.else_] if node.else_ is not None else [])
+    else:
+        return None
+
+    result = set()
+    for names in ([_get_expression_names(code) for code in codes]
+            + [_get_used_names(child) for child in children]):
+        if names is None:
+            return None
+        result.update(names)
+
+    return result
+
+
+def _depends_on(names, index_prefixes, dependent_names):
+    """Return whether the variables *names* include one of the indices named
+    by *index_prefixes* or one of *dependent_names*, treating *names* of
+    *None* as unknown and thus dependent.
+    """
+    if names is None:
+        return True
+
+    return (any(name.startswith(prefix)
+                for name in names for prefix in index_prefixes)
+            or bool(names & dependent_names))
+
+
+def _get_declared_name(node):
+    if isinstance(node, Initializer):
+        node = node.vdecl
+
+    while not hasattr(node, "name") and hasattr(node, "subdecl"):
+        node = node.subdecl
+
+    return getattr(node, "name", None)
+
+
+def _split_at_barriers(nodes, synchronization_kind, index_prefixes,
+        wrap_barrier_free, dependent_names=frozenset()):
+    """Split the statements *nodes* at barriers of *synchronization_kind* and
+    return a list of statements in which each barrier-free run of statements
+    is passed through *wrap_barrier_free*, which surrounds it with loops over
+    the indices named by *index_prefixes*.
+
+    Which variables a statement uses is determined from the expressions of
+    its assignments, initializers, loop bounds and conditions. Declarations
+    that do not depend on these indices, directly or through other declared
+    variables, are kept outside of the loops, so that they remain visible
+    across barriers. Variables declared within a run are not visible after
+    it ends, so a :exc:`loopy.LoopyError` is raised if they are used after
+    the barrier, or if it cannot be determined that they are not.
+
+    :arg dependent_names: names of the variables declared in enclosing
+        statements that depend on the indices.
+    """
+    result = []
+    run = []
+
+    dependent_names = set(dependent_names)
+    # variables declared in the current run, and in runs that have ended
+    run_names = set()
+    out_of_scope_names = set()
+
+    def flush_run():
+        if any(not isinstance(node, (Line, Comment)) for node in run):
+            result.append(wrap_barrier_free(run))
+        else:
+            result.extend(run)
+
+        del run[:]
+
+        out_of_scope_names.update(run_names)
+        run_names.clear()
+
+    for node in nodes:
+        if isinstance(node, OpenMPBarrier):
+            if node.synchronization_kind == synchronization_kind:
+                flush_run()
+                result.append(Comment(node.text))
+            else:
+                run.append(node)
+
+            continue
+
+        if out_of_scope_names:
+            used_names = _get_used_names(node)
+            if used_names is None:
+                raise LoopyError("cannot determine whether %s is using "
+                        "variables declared in code depending on the "
+                        "hardware axes before a %s barrier: %s"
+                        % (type(node).__name__, synchronization_kind,
+                            ", ".join(sorted(out_of_scope_names))))
+
+            used_names = out_of_scope_names & used_names
+            if used_names:
+                raise LoopyError("variables declared in code depending on "
+                        "the hardware axes used after a %s barrier: %s"
+                        % (synchronization_kind,
+                            ", ".join(sorted(used_names))))
+
+        if _contains_barrier(node, synchronization_kind):
+            flush_run()
+
+            def split_contents(node):
+                return Block(_split_at_barriers(
+                    _contents(node), synchronization_kind, index_prefixes,
+                    wrap_barrier_free, dependent_names))
+
+            if isinstance(node, Block):
+                result.append(type(node)(_split_at_barriers(
+                    node.contents, synchronization_kind, index_prefixes,
+                    wrap_barrier_free, dependent_names)))
+
+            elif isinstance(node, For):
+                start_names = (
+                        _get_expression_names(node.start.data)
+                        if isinstance(node.start, Initializer) else None)
+                if any(_depends_on(names, index_prefixes, dependent_names)
+                        for names in [
+                            start_names,
+                            _get_expression_names(node.condition)]):
+                    raise LoopyError("%s barrier in loop with bounds that "
+                            "depend on the hardware axes" % synchronization_kind)
+
+                result.append(For(node.start, node.condition, node.update,
+                    split_contents(node.body)))
+
+            elif isinstance(node, If):
+                if _depends_on(_get_expression_names(node.condition),
+                        index_prefixes, dependent_names):
+                    raise LoopyError("%s barrier in conditional that depends "
+                            "on the hardware axes" % synchronization_kind)
+
+                result.append(If(node.condition,
+                    split_contents(node.then_),
+                    split_contents(node.else_)
+                    if node.else_ is not None else None))
+
+            else:
+                raise LoopyError("unexpected statement containing a barrier: %s"
+                        % type(node).__name__)
+
+        elif isinstance(node, (Initializer, Declarator)):
+            name = _get_declared_name(node)
+
+            # Hoisting a declaration from the middle of a run would end the
+            # run early, putting the variables declared so far out of scope.
+            if run_names or (
+                    isinstance(node, Initializer)
+                    and _depends_on(_get_expression_names(node.data),
+                        index_prefixes, dependent_names)):
+                run.append(node)
+                if name is not None:
+                    dependent_names.add(name)
+                    run_names.add(name)
+            else:
+                flush_run()
+                result.append(node)
+
+        else:
+            run.append(node)
+
+    flush_run()
+
+    return result
+
+# }}}
+
+
+# {{{ ast builder
+
+class OpenMPCASTBuilder(CASTBuilder):
+    """Generates device programs in which each work-group is run by one
+    OpenMP thread. The work-items of a work-group run one after the other,
+    in a separate loop over the local indices for each stretch of code
+    between local barriers, so that barriers within a work-group become
+    the boundaries between these loops. Global barriers separate OpenMP
+    worksharing loops over the work-groups.
+    """
+
+    # {{{ top-level codegen
+
+    def get_function_definition(self, codegen_state, codegen_result,
+            schedule_index, function_decl, function_body):
+        if codegen_state.is_generating_device_code:
+            function_body = self._build_hw_loops(
+                    codegen_state, schedule_index, function_body)
+
+        return super(OpenMPCASTBuilder, self).get_function_definition(
+                codegen_state, codegen_result, schedule_index,
+                function_decl, function_body)
+
+    def get_temporary_decls(self, codegen_state, schedule_index):
+        if codegen_state.is_generating_device_code:
+            # declared per work-group in _build_hw_loops
+            return []
+
+        return super(OpenMPCASTBuilder, self).get_temporary_decls(
+                codegen_state, schedule_index)
+
+    def _make_index_loops(self, codegen_state, index_prefix, sizes, body):
+        kernel = codegen_state.kernel
+        ecm = self.get_expression_to_code_mapper(codegen_state)
+
+        result = Block(body)
+        for axis, size in enumerate(sizes):
+            index_name = index_prefix + str(axis)
+            result = For(
+                    InlineInitializer(
+                        POD(self, kernel.index_dtype, index_name), 0),
+                    "%s < %s" % (
+                        index_name, ecm(size, prec=PREC_NONE, type_context="i")),
+                    "++%s" % index_name,
+                    result)
+
+        return result
+
+    def _build_hw_loops(self, codegen_state, schedule_index, function_body):
+        gsize, lsize = _get_grid_sizes(codegen_state)
+
+        temp_decls = super(OpenMPCASTBuilder, self).get_temporary_decls(
+                codegen_state, schedule_index)
+
+        def make_work_item_loops(nodes):
+            if not lsize:
+                return Block(nodes)
+
+            return self._make_index_loops(
+                    codegen_state, LOCAL_INDEX_PREFIX, lsize, nodes)
+
+        def make_work_group_loops(nodes):
+            body = temp_decls + _split_at_barriers(
+                    nodes, "local", [LOCAL_INDEX_PREFIX], make_work_item_loops)
+
+            if not gsize:
+                return Block(body)
+
+            collapse = " collapse(%d)" % len(gsize) if len(gsize) > 1 else ""
+            return Block([
+                Pragma("omp for schedule(static)%s" % collapse),
+                self._make_index_loops(
+                    codegen_state, GROUP_INDEX_PREFIX, gsize, body)])
+
+        body = _split_at_barriers(
+                _contents(function_body), "global",
+                [GROUP_INDEX_PREFIX, LOCAL_INDEX_PREFIX], make_work_group_loops)
+
+        if gsize:
+            body = [Pragma("omp parallel"), Block(body)]
+
+        return Block(body)
+
+    # }}}
+
+    # {{{ code generation guts
+
+    def get_expression_to_c_expression_mapper(self, codegen_state):
+        return ExprToOpenMPCExprMapper(
+                codegen_state, fortran_abi=self.target.fortran_abi)
+
+    def emit_barrier(self, synchronization_kind, mem_kind, comment):
+        if synchronization_kind not in ["local", "global"]:
+            raise LoopyError("unknown barrier kind")
+
+        return OpenMPBarrier(synchronization_kind, comment)
+
+    def get_temporary_decl(self, codegen_state, sched_index, temp_var, decl_info):
+        temp_var_decl = POD(self, decl_info.dtype, decl_info.name)
+
+        if temp_var.read_only:
+            from cgen import Const
+            temp_var_decl = Const(temp_var_decl)
+
+        shape = decl_info.shape
+
+        if temp_var.scope == temp_var_scope.PRIVATE:
+            # (See also above in expr to code mapper)
+            _, lsize = _get_grid_sizes(codegen_state)
+            shape = lsize + shape
+
+        if shape:
+            from cgen import ArrayOf
+            ecm = self.get_expression_to_code_mapper(codegen_state)
+            temp_var_decl = ArrayOf(
+                    temp_var_decl,
+                    ecm(p.flattened_product(shape),
+                        prec=PREC_NONE, type_context="i"))
+
+        if temp_var.alignment:
+            from cgen import AlignedAttribute
+            temp_var_decl = AlignedAttribute(temp_var.alignment, temp_var_decl)
+
+        return temp_var_decl
+
+    # }}}
+
+# }}}
+
+
+# {{{ targets
+
+class OpenMPCTarget(CTarget):
+    """A target for C in which the group axes of a kernel are run in parallel
+    across CPU cores using OpenMP, one work-group per thread at a time.
+
+    Local axes are run sequentially by loops within each work-group, which
+    are split at local barriers. Private temporaries are therefore duplicated
+    for each work-item of a work-group. Global barriers separate parallel
+    loops over the work-groups.
+
+    .. versionadded:: 2018.2
+    """
+
+    def pre_codegen_check(self, kernel):
+        gsize, lsize = kernel.get_grid_size_upper_bounds_as_exprs()
+        if lsize:
+            for tv in six.itervalues(kernel.temporary_variables):
+                if tv.scope == temp_var_scope.PRIVATE and tv.base_storage:
+                    raise LoopyError("private temporary '%s' with base storage "
+                            "is unsupported in kernels with local axes "
+                            "by %s" % (tv.name, type(self).__name__))
+
+    def get_device_ast_builder(self):
+        return OpenMPCASTBuilder(self)
+
+
+class ExecutableOpenMPCTarget(OpenMPCTarget, ExecutableCTarget):
+    """An :class:`OpenMPCTarget` that compiles and runs kernels like
+    :class:`ExecutableCTarget`, passing OpenMP flags to the compiler.
+
+    The number of threads is controlled by the usual OpenMP environment
+    variables, such as :envvar:`OMP_NUM_THREADS`.
+
+    .. versionadded:: 2018.2
+    """
+
+    def __init__(self, compiler=None, fortran_abi=False):
+        if compiler is None:
+            from loopy.target.c.c_execution import CCompiler
+            compiler = CCompiler(openmp=True)
+
+        ExecutableCTarget.__init__(self,
+                compiler=compiler, fortran_abi=fortran_abi)
+
+# }}}
+
+# vim: foldmethod=marker
@@ -122,6 +122,26 @@ class PymbolicExpressionHashWrapper(object):
 
 # {{{ eq key builder
 
+def _get_pymbolic_eq_key(expr):
+    # Stringifying expressions is the bulk of the cost of building instruction
+    # keys. Expressions are immutable and frequently shared between an
+    # instruction and its copies, so remember the result on the expression
+    # (in the same way that pytools remembers persistent hash digests).
+    try:
+        return expr._loopy_eq_key
+    except AttributeError:
+        pass
+
+    result = str(expr).encode("utf-8")
+
+    try:
+        expr._loopy_eq_key = result
+    except (AttributeError, TypeError):
+        pass
+
+    return result
+
+
 class LoopyEqKeyBuilder(object):
     """Unlike :class:`loopy.tools.LoopyKeyBuilder`, this builds keys for use in
     equality comparison, such that `key(a) == key(b)` if and only if `a == b`.
@@ -153,7 +173,7 @@ class LoopyEqKeyBuilder(object):
         self.field_dict[field_name] = value
 
     def update_for_pymbolic_field(self, field_name, value):
-        self.field_dict[field_name] = str(value).encode("utf-8")
+        self.field_dict[field_name] = _get_pymbolic_eq_key(value)
 
     def key(self):
         """A key suitable for equality comparison."""
@@ -404,6 +424,120 @@ def compute_sccs(graph):
 # }}}
 
 
+# {{{ persistent set
+
+class PersistentSet(object):
+    """An immutable set, new versions of which are created by
+    :meth:`with_item` and :meth:`without_item` in constant time.
+
+    All versions derived from one another share a single mutable :class:`set`,
+    which holds the contents of the version accessed last. Every other
+    version only records how it differs from its neighbor, which is
+    undone/redone when it is accessed ("rerooting", see H. G. Baker, Shallow
+    binding makes functional arrays fast, 1991). Switching between versions
+    thus costs time proportional to the number of changes between them,
+    which makes this well-suited to depth-first backtracking searches.
+
+    Supports ``in``, iteration, :func:`len`, subset comparison and set
+    difference with regular sets. Iterating over a version while another
+    version derived from the same set is accessed is not allowed.
+
+    .. automethod:: with_item
+    .. automethod:: without_item
+    """
+
+    __slots__ = ["_set", "_next", "_item", "_has_item"]
+
+    def __init__(self, iterable=()):
+        self._set = set(iterable)
+        self._next = None
+
+    def _reroot(self):
+        if self._set is not None:
+            return self._set
+
+        path = []
+        root = self
+        while root._set is None:
+            path.append(root)
+            root = root._next
+
+        s = root._set
+        for version in reversed(path):
+            item = version._item
+            had_item = item in s
+            if version._has_item:
+                s.add(item)
+            else:
+                s.discard(item)
+
+            root._set = None
+            root._next = version
+            root._item = item
+            root._has_item = had_item
+
+            version._set = s
+            version._next = None
+
+            root = version
+
+        return s
+
+    def _derive(self, item, has_item):
+        s = self._reroot()
+        if (item in s) == has_item:
+            return self
+
+        result = PersistentSet.__new__(PersistentSet)
+        if has_item:
+            s.add(item)
+        else:
+            s.discard(item)
+        result._set = s
+        result._next = None
+
+        self._set = None
+        self._next = result
+        self._item = item
+        self._has_item = not has_item
+
+        return result
+
+    def with_item(self, item):
+        """Return a version of *self* containing *item*."""
+        return self._derive(item, True)
+
+    def without_item(self, item):
+        """Return a version of *self* not containing *item*."""
+        return self._derive(item, False)
+
+    def __contains__(self, item):
+        return item in self._reroot()
+
+    def __iter__(self):
+        return iter(self._reroot())
+
+    def __len__(self):
+        return len(self._reroot())
+
+    def __le__(self, other):
+        return self._reroot() <= other
+
+    def __ge__(self, other):
+        return self._reroot() >= other
+
+    def __sub__(self, other):
+        return self._reroot() - other
+
+    def __rsub__(self, other):
+        return other - self._reroot()
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, sorted(self._reroot()))
+
+# }}}
+
+
 # {{{ pickled container value
 
 class _PickledObject(object):
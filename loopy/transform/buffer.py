@@ -29,7 +29,7 @@ from loopy.symbolic import (get_dependencies,
         RuleAwareIdentityMapper, SubstitutionRuleMappingContext,
         SubstitutionMapper)
 from pymbolic.mapper.substitutor import make_subst_func
-from pytools.persistent_dict import WriteOncePersistentDict
+from loopy.caching import TieredCache
 from loopy.tools import LoopyKeyBuilder, PymbolicExpressionHashWrapper
 from loopy.version import DATA_MODEL_VERSION
 from loopy.diagnostic import LoopyError
@@ -124,7 +124,8 @@ class ArrayAccessReplacer(RuleAwareIdentityMapper):
 # }}}
 
 
-buffer_array_cache = WriteOncePersistentDict(
+buffer_array_cache = TieredCache(
+        "buffer_array",
         "loopy-buffer-array-cache-"+DATA_MODEL_VERSION,
         key_builder=LoopyKeyBuilder())
 
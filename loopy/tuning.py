@@ -0,0 +1,313 @@
+from __future__ import division, absolute_import
+
+__copyright__ = "Copyright (C) 2018 Andreas Kloeckner"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import six
+from six.moves import zip
+
+import numpy as np
+
+from pytools import ImmutableRecord
+
+from loopy.caching import TieredCache
+from loopy.diagnostic import LoopyError
+from loopy.tools import LoopyKeyBuilder
+from loopy.version import DATA_MODEL_VERSION
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class AutoTuneResult(ImmutableRecord):
+    """
+    .. attribute:: kernel
+
+        The scheduled variant of the kernel for the best configuration.
+
+    .. attribute:: config
+
+        A :class:`dict` mapping the names of the tuning parameters to the
+        values of the best configuration.
+
+    .. attribute:: elapsed_wall
+
+        The wall time per run of :attr:`kernel`, in seconds.
+
+    .. attribute:: timings
+
+        A :class:`list` of tuples ``(config, elapsed_wall)`` for all
+        configurations in the space, where *elapsed_wall* is *None* if
+        no working variant could be built for *config*.
+
+    .. attribute:: from_cache
+
+        Whether the best configuration was retrieved from the cache instead
+        of being measured.
+    """
+
+
+auto_tune_cache = TieredCache(
+        "auto_tune",
+        "loopy-auto-tune-cache-v2-"+DATA_MODEL_VERSION,
+        key_builder=LoopyKeyBuilder())
+
+
+def _gen_configs(space):
+    from itertools import product
+
+    names = sorted(space)
+    for values in product(*[space[name] for name in names]):
+        yield dict(zip(names, values))
+
+
+def _get_device_key(kernel, queue):
+    from loopy.target.c import ExecutableCTarget
+    from loopy.target.ispc import ExecutableISPCTarget
+    from loopy.target.pyopencl import PyOpenCLTarget
+
+    if isinstance(kernel.target, ExecutableISPCTarget):
+        import platform
+        compiler = kernel.target.compiler
+        return ("ispc", platform.machine(), platform.processor(),
+                compiler.ispc_bin, tuple(compiler.ispc_options),
+                compiler.cxx_bin, tuple(compiler.cxx_options))
+
+    elif isinstance(kernel.target, ExecutableCTarget):
+        import platform
+        toolchain = kernel.target.compiler.toolchain
+        return ("c", platform.machine(), platform.processor(),
+                toolchain.cc, tuple(toolchain.cflags))
+
+    elif isinstance(kernel.target, PyOpenCLTarget):
+        if queue is None:
+            raise LoopyError("tuning kernels for PyOpenCLTarget requires "
+                    "passing a queue")
+
+        dev = queue.device
+        return ("opencl", dev.platform.name, dev.name, dev.driver_version)
+
+    else:
+        raise LoopyError("cannot tune kernels for target '%s'"
+                % type(kernel.target).__name__)
+
+
+def _update_code_hash(checksum, code):
+    checksum.update(code.co_code)
+    checksum.update(" ".join(code.co_names).encode("utf-8"))
+    for const in code.co_consts:
+        if isinstance(const, type(code)):
+            _update_code_hash(checksum, const)
+        else:
+            checksum.update(repr(const).encode("utf-8"))
+
+
+def _get_transform_key(transform):
+    """Return a string identifying *transform* by its qualified name and a
+    hash of its code, or *None* if it is not a plain function or depends on
+    variables of an enclosing function, whose values the code does not
+    capture.
+    """
+    code = getattr(transform, "__code__", None)
+    if code is None or code.co_freevars:
+        return None
+
+    from hashlib import sha1
+    checksum = sha1()
+    _update_code_hash(checksum, code)
+    checksum.update(repr(transform.__defaults__).encode("utf-8"))
+
+    return "%s.%s:%s" % (
+            transform.__module__,
+            getattr(transform, "__qualname__", transform.__name__),
+            checksum.hexdigest())
+
+
+def auto_tune(kernel, transform, space, parameters, queue=None,
+        warmup_rounds=2, nthreads=None, transform_key=None):
+    """Find the fastest variant of *kernel* among those obtained by applying
+    *transform* with each configuration in *space*.
+
+    The best configuration is remembered for each combination of
+    *kernel*, *transform*, *space*, device and *parameters*, in which case
+    it is not measured again.
+
+    Variants are timed using the same warmup and timing-round policy as
+    :func:`auto_test_vs_ref`, on arguments filled with random data. Their
+    results are not checked.
+
+    :arg kernel: a kernel with fully known argument types whose target is
+        an :class:`ExecutableCTarget` or a :class:`PyOpenCLTarget`.
+    :arg transform: a callable ``transform(kernel, **config)`` returning a
+        transformed variant of *kernel*, e.g. by calling :func:`split_iname`,
+        :func:`tag_inames` or :func:`add_prefetch` with parameters from
+        *config*. Configurations for which this (or scheduling the variant)
+        fails with a :exc:`LoopyError` or :exc:`ValueError` are skipped.
+    :arg space: a :class:`dict` mapping parameter names to sequences of
+        values. All combinations of these values are tried.
+    :arg parameters: a :class:`dict` of values for the kernel's
+        parameters, determining the problem size.
+    :arg queue: a :class:`pyopencl.CommandQueue`, required for
+        :class:`PyOpenCLTarget`.
+    :arg nthreads: the number of variants compiled concurrently for
+        :class:`ExecutableCTarget`, see
+        :func:`loopy.target.c.c_execution.build_c_kernel_executors`.
+        Variants for :class:`PyOpenCLTarget` are compiled one at a time.
+    :arg transform_key: a string identifying *transform* for the purpose of
+        remembering the best configuration. If not given, it is derived from
+        the name and code of *transform*. This is not possible for
+        callables other than functions and for functions referring to
+        variables of an enclosing function, for which the best configuration
+        is then not remembered.
+    :returns: an :class:`AutoTuneResult`.
+    """
+
+    from loopy import CACHING_ENABLED
+    from loopy.auto_test import make_args, time_rounds
+    from loopy.preprocess import preprocess_kernel
+    from loopy.schedule import get_one_scheduled_kernel
+    from loopy.target.c import ExecutableCTarget
+    from loopy.type_inference import infer_unknown_types
+
+    kernel = infer_unknown_types(kernel, expect_completion=True)
+
+    space_key = tuple(
+            (name, tuple(values))
+            for name, values in sorted(six.iteritems(space)))
+    if transform_key is None:
+        transform_key = _get_transform_key(transform)
+
+    use_cache = CACHING_ENABLED and transform_key is not None
+    if CACHING_ENABLED and transform_key is None:
+        logger.debug("%s: cannot identify transform %r, auto-tuning results "
+                "are not cached" % (kernel.name, transform))
+
+    cache_key = (
+            kernel, transform_key, space_key, _get_device_key(kernel, queue),
+            tuple(sorted(six.iteritems(parameters))))
+
+    def make_variant(config):
+        variant = transform(kernel, **config)
+        variant = infer_unknown_types(variant, expect_completion=True)
+        return get_one_scheduled_kernel(preprocess_kernel(variant))
+
+    if use_cache:
+        try:
+            config, elapsed_wall, timings = auto_tune_cache[cache_key]
+        except KeyError:
+            pass
+        else:
+            logger.debug("%s: auto-tuning cache hit" % kernel.name)
+            return AutoTuneResult(
+                    kernel=make_variant(config),
+                    config=config,
+                    elapsed_wall=elapsed_wall,
+                    timings=timings,
+                    from_cache=True)
+
+    # {{{ build variants
+
+    configs = list(_gen_configs(space))
+
+    variants = []
+    for config in configs:
+        try:
+            variant = make_variant(config)
+        except (LoopyError, ValueError) as e:
+            logger.info("%s: skipping configuration %s (%s: %s)"
+                    % (kernel.name, config, type(e).__name__, e))
+            variant = None
+
+        variants.append(variant)
+
+    if isinstance(kernel.target, ExecutableCTarget):
+        from loopy.target.c.c_execution import build_c_kernel_executors
+        executors = [
+                variant.target.get_kernel_executor(variant)
+                for variant in variants
+                if variant is not None]
+        kernel_infos = iter(build_c_kernel_executors(executors, nthreads))
+        executors = iter(executors)
+
+    # }}}
+
+    # {{{ time variants
+
+    rng = np.random.RandomState(seed=17)
+
+    timings = []
+    best = None
+    for config, variant in zip(configs, variants):
+        if variant is None:
+            timings.append((config, None))
+            continue
+
+        if isinstance(kernel.target, ExecutableCTarget):
+            executor = next(executors)
+            kernel_info = next(kernel_infos)
+            args = make_args(variant, kernel_info.implemented_data_info,
+                    None, None, parameters, rng)
+
+            def run_rounds(nrounds):
+                for i in range(nrounds):
+                    executor(**args)
+
+        else:
+            executor = variant.target.get_kernel_executor(variant, queue)
+            kernel_info = executor.kernel_info(None)
+            args = make_args(variant, kernel_info.implemented_data_info,
+                    queue, None, parameters, rng)
+
+            def run_rounds(nrounds):
+                for i in range(nrounds):
+                    executor(queue, **args)
+                queue.finish()
+
+        elapsed_wall, timing_rounds = time_rounds(run_rounds, warmup_rounds)
+
+        logger.info("%s: configuration %s: %g s per run (%d rounds)"
+                % (kernel.name, config, elapsed_wall, timing_rounds))
+
+        timings.append((config, elapsed_wall))
+        if best is None or elapsed_wall < best[2]:
+            best = (config, variant, elapsed_wall)
+
+    # }}}
+
+    if best is None:
+        raise LoopyError("%s: no configuration in the tuning space yielded "
+                "a working kernel" % kernel.name)
+
+    config, variant, elapsed_wall = best
+
+    if use_cache:
+        auto_tune_cache.store_if_not_present(
+                cache_key, (config, elapsed_wall, timings))
+
+    return AutoTuneResult(
+            kernel=variant,
+            config=config,
+            elapsed_wall=elapsed_wall,
+            timings=timings,
+            from_cache=False)
+
+# vim: foldmethod=marker
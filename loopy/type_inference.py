@@ -404,7 +404,7 @@ class TypeInferenceMapper(CombineMapper):
 
 # {{{ infer single variable
 
-def _infer_var_type(kernel, var_name, type_inf_mapper, subst_expander):
+def _infer_var_type(kernel, var_name, type_inf_mapper, get_expanded_insn):
     if var_name in kernel.all_params():
         return [kernel.index_dtype], []
 
@@ -418,11 +418,11 @@ def _infer_var_type(kernel, var_name, type_inf_mapper, subst_expander):
     type_inf_mapper = type_inf_mapper.copy()
 
     for writer_insn_id in kernel.writer_map().get(var_name, []):
-        writer_insn = kernel.id_to_insn[writer_insn_id]
+        writer_insn = get_expanded_insn(writer_insn_id)
         if not isinstance(writer_insn, lp.MultiAssignmentBase):
             continue
 
-        expr = subst_expander(writer_insn.expression)
+        expr = writer_insn.expression
 
         debug("             via expr %s", expr)
         if isinstance(writer_insn, lp.Assignment):
@@ -480,10 +480,89 @@ class _DictUnionView:
         raise KeyError(key)
 
 
+# {{{ reuse of earlier results
+
+class _InferenceContext(object):
+    """The parts of a kernel other than its instructions and variable types
+    that type inference depends upon.
+
+    Objects that may compare equal despite being different to type inference
+    (such as expressions containing :mod:`numpy` scalars of different types)
+    are compared by identity.
+    """
+
+    def __init__(self, kernel):
+        self.target = kernel.target
+        self.index_dtype = kernel.index_dtype
+        self.function_manglers = kernel.function_manglers
+        self.symbol_manglers = kernel.symbol_manglers
+        self.substitutions = kernel.substitutions
+        self.all_inames = kernel.all_inames()
+        self.all_params = kernel.all_params()
+
+    def matches(self, other):
+        return (self is other
+                or (self.substitutions is other.substitutions
+                    and self.target == other.target
+                    and self.index_dtype == other.index_dtype
+                    and self.function_manglers == other.function_manglers
+                    and self.symbol_manglers == other.symbol_manglers
+                    and self.all_inames == other.all_inames
+                    and self.all_params == other.all_params))
+
+
+class _VarTypeRecord(object):
+    """The type inferred for a variable, together with everything needed to
+    decide whether inferring it again would yield the same type.
+
+    .. attribute:: writer_insns
+
+        The (unexpanded) instructions writing the variable, which are
+        compared by identity.
+
+    .. attribute:: input_dtypes
+
+        A :class:`dict` mapping the variables read by *writer_insns* to
+        their types at the time of inference.
+    """
+
+    def __init__(self, context, writer_insns, input_dtypes, dtype):
+        self.context = context
+        self.writer_insns = writer_insns
+        self.input_dtypes = input_dtypes
+        self.dtype = dtype
+
+    def is_valid_for(self, context, writer_insns, item_lookup):
+        if not self.context.matches(context):
+            return False
+
+        if len(writer_insns) != len(self.writer_insns):
+            return False
+
+        if not all(insn is rec_insn
+                for insn, rec_insn in zip(writer_insns, self.writer_insns)):
+            return False
+
+        for name, dtype in six.iteritems(self.input_dtypes):
+            item = item_lookup.get(name)
+            if item is None or item.dtype != dtype:
+                return False
+
+        return True
+
+# }}}
+
+
 # {{{ infer_unknown_types
 
 def infer_unknown_types(kernel, expect_completion=False):
-    """Infer types on temporaries and arguments."""
+    """Infer types on temporaries and arguments.
+
+    Results are remembered for the kernels derived from the same kernel
+    (i.e. those sharing its :attr:`loopy.LoopKernel.cache_manager`), so that
+    the types of variables whose writing instructions and input types are
+    unchanged since an earlier inference are not inferred again.
+    """
 
     logger.debug("%s: infer types" % kernel.name)
 
@@ -493,11 +572,6 @@ def infer_unknown_types(kernel, expect_completion=False):
     import time
     start_time = time.time()
 
-    unexpanded_kernel = kernel
-    if kernel.substitutions:
-        from loopy.transform.subst import expand_subst
-        kernel = expand_subst(kernel)
-
     new_temp_vars = kernel.temporary_variables.copy()
     new_arg_dict = kernel.arg_dict.copy()
 
@@ -519,17 +593,44 @@ def infer_unknown_types(kernel, expect_completion=False):
 
     # }}}
 
+    if not names_for_type_inference:
+        return kernel
+
     logger.debug("finding types for {count:d} names".format(
             count=len(names_for_type_inference)))
 
+    # {{{ expand substitution rules in writing instructions
+
+    # Only the instructions writing variables of unknown type are looked at,
+    # so only those get their substitution rules expanded.
+
+    from loopy.symbolic import SubstitutionRuleExpander
+    subst_expander = SubstitutionRuleExpander(kernel.substitutions)
+
+    expanded_insns = {}
+
+    def get_expanded_insn(insn_id):
+        try:
+            return expanded_insns[insn_id]
+        except KeyError:
+            insn = kernel.id_to_insn[insn_id]
+            if kernel.substitutions:
+                insn = insn.with_transformed_expressions(subst_expander)
+
+            expanded_insns[insn_id] = insn
+            return insn
+
+    # }}}
+
     writer_map = kernel.writer_map()
 
+    names_for_type_inference_set = frozenset(names_for_type_inference)
     dep_graph = dict(
             (written_var, set(
                 read_var
                 for insn_id in writer_map.get(written_var, [])
-                for read_var in kernel.id_to_insn[insn_id].read_dependency_names()
-                if read_var in names_for_type_inference))
+                for read_var in get_expanded_insn(insn_id).read_dependency_names()
+                if read_var in names_for_type_inference_set))
             for written_var in names_for_type_inference)
 
     from loopy.tools import compute_sccs
@@ -546,13 +647,44 @@ def infer_unknown_types(kernel, expect_completion=False):
             ])
     type_inf_mapper = TypeInferenceMapper(kernel, item_lookup)
 
-    from loopy.symbolic import SubstitutionRuleExpander
-    subst_expander = SubstitutionRuleExpander(kernel.substitutions)
+    # {{{ reuse of earlier results
+
+    var_type_records = kernel.cache_manager.type_inference_cache
+    context = _InferenceContext(kernel)
+
+    def get_writer_insns(name):
+        return [kernel.id_to_insn[insn_id]
+                for insn_id in sorted(writer_map.get(name, []))]
+
+    def get_recorded_dtype(name):
+        record = var_type_records.get(name)
+        if record is not None and record.is_valid_for(
+                context, get_writer_insns(name), item_lookup):
+            return record.dtype
+
+        return None
+
+    def record_dtype(name, dtype):
+        writer_insns = get_writer_insns(name)
+
+        input_dtypes = {}
+        for insn in writer_insns:
+            for read_var in get_expanded_insn(insn.id).read_dependency_names():
+                item = item_lookup.get(read_var)
+                if item is not None:
+                    input_dtypes[read_var] = item.dtype
+
+        var_type_records[name] = _VarTypeRecord(
+                context, writer_insns, input_dtypes, dtype)
+
+    # }}}
 
     # {{{ work on type inference queue
 
     from loopy.kernel.data import TemporaryVariable, KernelArgument
 
+    nreused = 0
+
     for var_chain in sccs:
         changed_during_last_queue_run = False
         queue = var_chain[:]
@@ -576,9 +708,17 @@ def infer_unknown_types(kernel, expect_completion=False):
 
             debug("inferring type for %s %s", type(item).__name__, item.name)
 
-            result, symbols_with_unavailable_types = (
-                    _infer_var_type(
-                            kernel, item.name, type_inf_mapper, subst_expander))
+            recorded_dtype = get_recorded_dtype(name)
+            if recorded_dtype is not None:
+                debug("     reusing earlier result")
+                nreused += 1
+                result = [recorded_dtype]
+                symbols_with_unavailable_types = set()
+            else:
+                result, symbols_with_unavailable_types = (
+                        _infer_var_type(
+                                kernel, item.name, type_inf_mapper,
+                                get_expanded_insn))
 
             failed = not result
             if not failed:
@@ -586,6 +726,9 @@ def infer_unknown_types(kernel, expect_completion=False):
                 if new_dtype.target is None:
                     new_dtype = new_dtype.with_target(kernel.target)
 
+                if recorded_dtype is None:
+                    record_dtype(name, new_dtype)
+
                 debug("     success: %s", new_dtype)
                 if new_dtype != item.dtype:
                     debug("     changed from: %s", item.dtype)
@@ -636,10 +779,11 @@ def infer_unknown_types(kernel, expect_completion=False):
     # }}}
 
     end_time = time.time()
-    logger.debug("type inference took {dur:.2f} seconds".format(
-            dur=end_time - start_time))
+    logger.debug("type inference took {dur:.2f} seconds "
+            "({nreused:d} earlier results reused)".format(
+                dur=end_time - start_time, nreused=nreused))
 
-    return unexpanded_kernel.copy(
+    return kernel.copy(
             temporary_variables=new_temp_vars,
             args=[new_arg_dict[arg.name] for arg in kernel.args],
             )
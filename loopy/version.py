@@ -52,7 +52,7 @@ except ImportError:
     _islpy_version = "_UNKNOWN_"
 else:
     _islpy_version = islpy.version.VERSION_TEXT
-DATA_MODEL_VERSION = "%s-islpy%s-%s-v0" % (VERSION_TEXT, _islpy_version, _git_rev)
+DATA_MODEL_VERSION = "%s-islpy%s-%s-v1" % (VERSION_TEXT, _islpy_version, _git_rev)
 
 
 FALLBACK_LANGUAGE_VERSION = (2017, 2, 1)
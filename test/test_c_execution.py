@@ -343,6 +343,405 @@ def test_missing_compilers():
         __test(eval_tester, ExecutableCTarget, compiler=ccomp)
 
 
+def test_build_c_kernel_executors():
+    from loopy.target.c import ExecutableCTarget
+    from loopy.target.c.c_execution import build_c_kernel_executors
+
+    target = ExecutableCTarget()
+
+    knls = [
+            lp.make_kernel(
+                "{ [i]: 0<=i<n }",
+                "out[i] = %d*a[i]" % factor,
+                [
+                    lp.GlobalArg("out", np.float32, shape=lp.auto),
+                    lp.GlobalArg("a", shape=lp.auto),
+                    "..."
+                    ],
+                target=target,
+                name="batch_knl_%d" % factor)
+            for factor in range(1, 5)]
+
+    executors = [knl.target.get_kernel_executor(knl) for knl in knls]
+    kernel_infos = build_c_kernel_executors(
+            [(executor, {"a": np.float32}) for executor in executors],
+            nthreads=2)
+    assert len(kernel_infos) == len(knls)
+
+    a = np.arange(16, dtype=np.float32)
+    for factor, executor, kernel_info in zip(
+            range(1, 5), executors, kernel_infos):
+        assert executor.kernel_info(executor.arg_to_dtype_set({"a": a})) \
+                is kernel_info
+        assert np.allclose(executor(a=a)[1], factor * a)
+
+
+def test_c_exec_several_dtypes():
+    from loopy.target.c import ExecutableCTarget
+    from uuid import uuid4
+
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = 2*a[i]",
+            [
+                lp.GlobalArg("out", shape=lp.auto),
+                lp.GlobalArg("a", shape=lp.auto),
+                "..."
+                ],
+            target=ExecutableCTarget(),
+            # unique, so that the typed kernels are stored in the cache
+            name="several_dtypes_%s" % uuid4().hex)
+
+    # Storing the typed kernels pickles the target along with the compiler
+    # that built the first one.
+    with lp.CacheMode(True):
+        for dtype in [np.float32, np.float64]:
+            a = np.arange(16, dtype=dtype)
+            _, (out,) = knl(a=a)
+            assert out.dtype == dtype
+            assert np.allclose(out, 2*a)
+
+
+def test_c_exec_fast_call():
+    from loopy.target.c import ExecutableCTarget
+
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = out[i] + a[i]",
+            [
+                lp.GlobalArg("out", np.float32, shape=lp.auto),
+                lp.GlobalArg("a", np.float32, shape=lp.auto),
+                "..."
+                ],
+            target=ExecutableCTarget())
+    knl = lp.set_options(knl, c_exec_fast_call=True)
+
+    a = np.arange(16, dtype=np.float32)
+    out = np.zeros(16, dtype=np.float32)
+
+    for i in range(1, 4):
+        _, (result,) = knl(a=a, out=out)
+        assert result is out
+        assert np.allclose(out, i * a)
+
+    # new arrays with the same signature
+    a_new = 2*a
+    out_new = np.zeros(16, dtype=np.float32)
+    _, (result,) = knl(a=a_new, out=out_new)
+    assert result is out_new
+    assert np.allclose(out_new, a_new)
+    assert np.allclose(out, 3 * a)
+
+    # changed argument signature
+    a2 = np.arange(8, dtype=np.float32)
+    out2 = np.zeros(8, dtype=np.float32)
+    _, (result,) = knl(a=a2, out=out2)
+    assert result is out2
+    assert np.allclose(out2, a2)
+
+    # alternating between signatures
+    for i in range(2, 4):
+        _, (result,) = knl(a=a, out=out)
+        assert result is out
+        assert np.allclose(out, (i + 2) * a)
+
+        _, (result,) = knl(a=a2, out=out2)
+        assert result is out2
+        assert np.allclose(out2, i * a2)
+
+    # no references to the arrays are kept
+    import weakref
+    out_ref = weakref.ref(out)
+    del result, out
+    import gc
+    gc.collect()
+    assert out_ref() is None
+
+    # outputs allocated by loopy must not be reused across calls
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = 2*a[i]",
+            [
+                lp.GlobalArg("out", np.float32, shape=lp.auto),
+                lp.GlobalArg("a", np.float32, shape=lp.auto),
+                "..."
+                ],
+            target=ExecutableCTarget())
+    knl = lp.set_options(knl, c_exec_fast_call=True)
+
+    _, (result1,) = knl(a=a)
+    _, (result2,) = knl(a=a)
+    assert result1 is not result2
+    assert np.allclose(result2, 2*a)
+
+
+def test_c_exec_output_allocation():
+    from loopy.target.c import ExecutableCTarget
+    from loopy.target.c.c_execution import HostMemoryPool
+
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = 2*a[i]",
+            [
+                lp.GlobalArg("out", np.float32, shape=lp.auto),
+                lp.GlobalArg("a", np.float32, shape=lp.auto),
+                "..."
+                ],
+            target=ExecutableCTarget())
+
+    a = np.arange(16, dtype=np.float32)
+
+    # {{{ memory pool
+
+    pool = HostMemoryPool()
+    executor = knl.target.get_kernel_executor(knl)
+
+    _, (out,) = executor(a=a, allocator=pool)
+    assert np.allclose(out, 2*a)
+    assert pool.held_bytes == 0
+
+    del out
+    assert pool.held_bytes == 64
+
+    _, (out,) = executor(a=a, allocator=pool)
+    assert np.allclose(out, 2*a)
+    assert pool.held_bytes == 0
+
+    # live outputs, and views of them, are never handed out again
+    view = out[2:]
+    del out
+    assert pool.held_bytes == 0
+
+    _, (out2,) = executor(a=a+1, allocator=pool)
+    assert not np.may_share_memory(view, out2)
+    assert np.allclose(view, 2*a[2:])
+    assert np.allclose(out2, 2*(a+1))
+
+    del view
+    assert pool.held_bytes == 64
+
+    assert executor.statistics.calls == 3
+    assert executor.statistics.allocations == 3
+    assert executor.statistics.allocated_bytes == 192
+
+    # }}}
+
+    # {{{ output reuse
+
+    knl = lp.set_options(knl, c_exec_reuse_outputs=True)
+    executor = knl.target.get_kernel_executor(knl)
+
+    _, (out1,) = executor(a=a)
+    _, (out2,) = executor(a=a)
+    assert out1 is out2
+    assert np.allclose(out2, 2*a)
+
+    # changed shape
+    _, (out3,) = executor(a=a[:8])
+    assert out3 is not out2
+    assert np.allclose(out3, 2*a[:8])
+
+    assert executor.statistics.allocations == 2
+    assert executor.statistics.reused_outputs == 1
+
+    # }}}
+
+
+def test_auto_tune(tmpdir):
+    from loopy.target.c import ExecutableCTarget
+
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = 2*a[i]",
+            [
+                lp.GlobalArg("out", np.float64, shape=("n",)),
+                lp.GlobalArg("a", np.float64, shape=("n",)),
+                "..."
+                ],
+            target=ExecutableCTarget())
+
+    def transform(knl, inner_length):
+        if inner_length == 0:
+            raise ValueError("invalid inner length")
+        return lp.split_iname(knl, "i", inner_length)
+
+    space = {"inner_length": [0, 4, 16]}
+
+    with lp.CacheMode(False):
+        result = lp.auto_tune(knl, transform, space, {"n": 1000},
+                warmup_rounds=1)
+
+    assert not result.from_cache
+    assert result.config["inner_length"] in [4, 16]
+    assert result.elapsed_wall > 0
+    assert [elapsed is None for _, elapsed in result.timings] == [
+            True, False, False]
+
+    with lp.CacheMode(True):
+        lp.auto_tune(knl, transform, space, {"n": 1000}, warmup_rounds=1)
+        cached_result = lp.auto_tune(knl, transform, space, {"n": 1000})
+
+    assert cached_result.from_cache
+    assert "i_inner" in cached_result.kernel.all_inames()
+
+    # a different transform with the same space is tuned afresh
+    def other_transform(knl, inner_length):
+        return lp.split_iname(knl, "i", max(inner_length, 1),
+                inner_tag="unr")
+
+    from loopy.caching import DirectoryStore
+    orig_store = lp.get_persistent_store()
+    lp.set_persistent_store(DirectoryStore(str(tmpdir)))
+    try:
+        with lp.CacheMode(True):
+            result = lp.auto_tune(knl, other_transform, space, {"n": 1000},
+                    warmup_rounds=1)
+    finally:
+        lp.set_persistent_store(orig_store)
+    assert not result.from_cache
+
+    from loopy.kernel.data import UnrollTag
+    assert isinstance(result.kernel.iname_to_tag["i_inner"], UnrollTag)
+
+    # transforms referring to variables of an enclosing function are not cached
+    def closure_transform(knl, inner_length):
+        return transform(knl, inner_length)
+
+    with lp.CacheMode(True):
+        for i in range(2):
+            result = lp.auto_tune(knl, closure_transform, space, {"n": 1000},
+                    warmup_rounds=1)
+            assert not result.from_cache
+
+    # other errors are not taken to rule out a configuration
+    def broken_transform(knl, inner_length):
+        raise TypeError("broken transform")
+
+    with lp.CacheMode(False):
+        with pytest.raises(TypeError):
+            lp.auto_tune(knl, broken_transform, space, {"n": 1000})
+
+
+def test_openmp_target():
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = 2*a[i]",
+            [
+                lp.GlobalArg("out", np.float32, shape=lp.auto),
+                lp.GlobalArg("a", np.float32, shape=lp.auto),
+                "..."
+                ],
+            target=lp.ExecutableOpenMPCTarget())
+    knl = lp.split_iname(knl, "i", 16, outer_tag="g.0", inner_tag="l.0")
+
+    code = lp.generate_code_v2(knl).device_code()
+    assert "#pragma omp parallel" in code
+    assert "#pragma omp for" in code
+
+    a = np.arange(1000, dtype=np.float32)
+    assert np.allclose(knl(a=a)[1], 2*a)
+
+    # local-parallel reduction, with local barriers and private temporaries
+    knl = lp.make_kernel(
+            "{ [i, j]: 0<=i<n and 0<=j<32 }",
+            "out[i] = sum(j, a[i, j])",
+            [
+                lp.GlobalArg("out", np.float64, shape=("n",)),
+                lp.GlobalArg("a", np.float64, shape=("n", 32)),
+                "..."
+                ],
+            target=lp.ExecutableOpenMPCTarget())
+    knl = lp.tag_inames(knl, {"i": "g.0", "j": "l.0"})
+
+    a = np.random.rand(100, 32)
+    _, (out,) = knl(a=a)
+    assert np.allclose(out, a.sum(axis=1))
+
+
+def test_openmp_barrier_splitting():
+    from cgen import Assign, Block, For, Initializer, Statement, Value
+    from pymbolic import var
+    from loopy.target.openmp import OpenMPBarrier, _split_at_barriers
+
+    def wrap(nodes):
+        return For("int _lpy_lid_0 = 0", "_lpy_lid_0 < 4", "++_lpy_lid_0",
+                Block(nodes))
+
+    def split(nodes):
+        return _split_at_barriers(nodes, "local", ["_lpy_lid_"], wrap)
+
+    # k depends on the local index only through i_inner
+    nodes = [
+            Initializer(Value("int const", "n"), 4),
+            Initializer(Value("int const", "i_inner"), var("_lpy_lid_0")),
+            Initializer(Value("int const", "k"), var("i_inner") + 1),
+            Assign(var("a")[var("k")], var("n")),
+            OpenMPBarrier("local", ""),
+            Assign(var("b")[var("_lpy_lid_0")], var("a")[var("n")]),
+            ]
+    result = split(nodes)
+    assert result[0] is nodes[0]
+    assert isinstance(result[1], For)
+    assert "k = i_inner + 1" in str(result[1])
+
+    with pytest.raises(lp.LoopyError):
+        split(nodes + [Assign(var("c")[var("_lpy_lid_0")], var("k"))])
+
+    # code whose variables are unknown may use k
+    with pytest.raises(lp.LoopyError):
+        split(nodes + [Statement("c[_lpy_lid_0] = 0")])
+
+    # two subkernels with different local axes, with local barriers and
+    # private temporaries in both
+    knl = lp.make_kernel(
+            "{ [i, j, k]: 0<=i,k<n and 0<=j<16 }",
+            """
+            <> t = a[i, j] {id=t}
+            ... lbarrier {id=lb, dep=t}
+            b[i, j] = 2*t {id=b, dep=lb}
+            ... gbarrier {id=gb, dep=b}
+            <> s = b[k, 3] + 1 {id=s, dep=gb}
+            out[k] = s {dep=s}
+            """,
+            [
+                lp.GlobalArg("a,b", np.float64, shape=("n", 16)),
+                lp.GlobalArg("out", np.float64, shape=("n",)),
+                "..."
+                ],
+            target=lp.ExecutableOpenMPCTarget())
+    knl = lp.tag_inames(knl, {"i": "g.0", "j": "l.0", "k": "g.0"})
+
+    a = np.random.rand(20, 16)
+    _, (b, out) = knl(a=a)
+    assert np.allclose(b, 2*a)
+    assert np.allclose(out, 2*a[:, 3] + 1)
+
+
+def test_ispc_execution():
+    from distutils.spawn import find_executable
+    if find_executable("ispc") is None:
+        pytest.skip("ispc not found")
+
+    from loopy.target.ispc_execution import ISPCCompiler
+
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = 2*a[i] + b",
+            [
+                lp.GlobalArg("out", np.float32, shape=lp.auto),
+                lp.GlobalArg("a", np.float32, shape=lp.auto),
+                "..."
+                ],
+            target=lp.ExecutableISPCTarget(
+                ISPCCompiler(ispc_options=["-O2", "--target=sse4-i32x8"])))
+    knl = lp.split_iname(knl, "i", 8, inner_tag="l.0")
+    knl = lp.split_iname(knl, "i_outer", 4, outer_tag="g.0")
+
+    a = np.arange(1000, dtype=np.float32)
+    _, (out,) = knl(a=a, b=np.float32(3))
+    assert np.allclose(out, 2*a + 3)
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])
@@ -152,6 +152,33 @@ def test_type_inference_with_type_dependencies():
     assert knl.temporary_variables["d"].dtype == to_loopy_type(np.complex128)
 
 
+def test_type_inference_reuse_across_copies():
+    knl = lp.make_kernel(
+            "{[i]: 0<=i<n}",
+            """
+            <>a = x[i] + 1
+            <>b = 2*a
+            out[i] = b
+            """,
+            [lp.GlobalArg("x", np.float32, shape="n"), "..."])
+
+    typed_knl = lp.infer_unknown_types(knl)
+
+    from loopy.types import to_loopy_type
+    assert typed_knl.temporary_variables["b"].dtype == to_loopy_type(np.float32)
+
+    # changing the type of an input must invalidate the earlier results
+    knl = knl.copy(args=[
+        arg.copy(dtype=np.float64) if arg.name == "x" else arg
+        for arg in knl.args])
+    assert knl.cache_manager is typed_knl.cache_manager
+
+    knl = lp.infer_unknown_types(knl)
+    assert knl.temporary_variables["a"].dtype == to_loopy_type(np.float64)
+    assert knl.temporary_variables["b"].dtype == to_loopy_type(np.float64)
+    assert knl.arg_dict["out"].dtype == to_loopy_type(np.float64)
+
+
 def test_sized_and_complex_literals(ctx_factory):
     ctx = ctx_factory()
 
@@ -1821,6 +1848,126 @@ def test_regression_persistent_hash():
     assert lkb(knl1) != lkb(knl2)
 
 
+def test_persistent_hash_of_kernel_copies():
+    knl = lp.make_kernel(
+            "{[i] : 0<=i<n}",
+            """
+            a[i] = 2*b[i] {id=first}
+            c[i] = 3*b[i] {id=second}
+            """)
+
+    from loopy.tools import LoopyKeyBuilder
+    lkb = LoopyKeyBuilder()
+    knl_hash = lkb(knl)
+
+    def rebuild(knl):
+        # passing every field to copy() forces all digests to be recomputed
+        return knl.copy(**dict(
+            (field_name, getattr(knl, field_name))
+            for field_name in knl.hash_fields))
+
+    for new_knl in [
+            lp.tag_inames(knl, "i:g.0"),
+            lp.set_instruction_priority(knl, "id:first", 5),
+            knl.copy(instructions=[
+                knl.instructions[0],
+                knl.instructions[1].copy(
+                    expression=knl.instructions[0].expression)]),
+            ]:
+        new_knl_hash = lkb(new_knl)
+        assert new_knl_hash != knl_hash
+        assert new_knl_hash == lkb(rebuild(new_knl))
+
+    assert lkb(knl.copy()) == knl_hash
+
+
+def test_get_best_scheduled_kernels():
+    knl = lp.make_kernel(
+            "{[i,j]: 0<=i,j<n}",
+            """
+            a[i] = 1
+            b[i,j] = 2
+            c[j] = 3
+            """,
+            [lp.GlobalArg("a,b,c", np.float32, shape=lp.auto), "..."])
+    knl = lp.duplicate_inames(knl, "j", "writes:c")
+    knl = lp.preprocess_kernel(knl)
+
+    results = lp.get_best_scheduled_kernels(knl, n=16, nprocesses=1)
+    assert len(results) > 1
+
+    from loopy.kernel import kernel_state
+    assert all(sched_knl.state == kernel_state.SCHEDULED
+            for sched_knl, _ in results)
+
+    cost_keys = [cost.sort_key() for _, cost in results]
+    assert cost_keys == sorted(cost_keys)
+
+    results_parallel = lp.get_best_scheduled_kernels(knl, n=16, nprocesses=2)
+    assert [sched_knl.schedule for sched_knl, _ in results] == [
+            sched_knl.schedule for sched_knl, _ in results_parallel]
+
+    ranked_knl = lp.get_one_scheduled_kernel(
+            knl.copy(options=knl.options.copy(rank_schedule_candidates=4)))
+    assert ranked_knl.schedule == results[0][0].schedule
+    lp.generate_code_v2(ranked_knl)
+
+
+def test_profile_scheduling():
+    knl = lp.make_kernel(
+            "{[i,j,k]: 0<=i,j,k<n}",
+            """
+            a[i] = 1 {id=insn_a}
+            b[i,j] = a[i] {id=insn_b,dep=insn_a}
+            c[k] = 3 {id=insn_c}
+            d[k] = c[k] {id=insn_d,dep=insn_c}
+            """,
+            [lp.GlobalArg("a,b,c,d", np.float32, shape=lp.auto), "..."])
+    knl = lp.preprocess_kernel(knl)
+
+    sched_knl, stats = lp.profile_scheduling(knl)
+
+    from loopy.kernel import kernel_state
+    assert sched_knl.state == kernel_state.SCHEDULED
+    assert sched_knl.schedule == lp.get_one_scheduled_kernel(knl).schedule
+
+    from loopy.schedule import CallKernel, ReturnFromKernel
+    assert stats.nodes_visited >= len([
+        item for item in sched_knl.schedule
+        # added after the search
+        if not isinstance(item, (CallKernel, ReturnFromKernel))])
+    assert stats.schedules_found == 1
+    assert stats.rejections_by_reason["dependency"] > 0
+    assert stats.rejections_by_reason["loop_nest"] > 0
+    assert set(stats.phase_times) == set(
+            ["search", "insert_barriers", "device_mapping"])
+
+    for insn_id, count in stats.most_backtracked_insns():
+        assert insn_id in knl.id_to_insn
+        assert 0 < count <= stats.dead_ends
+
+    print(stats)
+
+    # no valid schedule: the statistics are attached to the error
+    knl = lp.make_kernel(
+            "{ : }",
+            """
+            a = b {id=insn_a,dep=insn_b}
+            b = a {id=insn_b,dep=insn_a}
+            """,
+            [lp.GlobalArg("a,b", np.float32, shape=()), "..."])
+    knl = lp.preprocess_kernel(knl)
+
+    with pytest.raises(RuntimeError) as exc_info:
+        lp.profile_scheduling(knl)
+
+    stats = exc_info.value.statistics
+    assert stats.schedules_found == 0
+    assert stats.dead_ends > 0
+    assert stats.rejections_by_reason["dependency"] > 0
+    assert set(dict(stats.most_backtracked_insns())) == set(["insn_a", "insn_b"])
+
+
 def test_sequential_dependencies(ctx_factory):
     ctx = ctx_factory()
 
@@ -2241,6 +2388,131 @@ def test_tight_loop_bounds_codegen():
     assert for_loop in cgr.device_code()
 
 
+def test_check_bounds():
+    from loopy.check import check_bounds
+
+    knl = lp.make_kernel(
+        "{ [i]: 0 <= i < n }",
+        """
+        out[i] = a[i] + a[n-1-i] {id=insn1}
+        out2[i] = a[i] + a[i+1] {id=insn2}
+        """,
+        [lp.GlobalArg("a", np.float32, shape="n"), "..."])
+    knl = lp.preprocess_kernel(knl)
+
+    with pytest.raises(lp.LoopyError) as exc_info:
+        check_bounds(knl)
+
+    assert "a[i + 1]" in str(exc_info.value)
+    assert "insn2" in str(exc_info.value)
+
+    check_bounds(lp.remove_instructions(knl, set(["insn2"])))
+
+
+def test_pre_schedule_checks_in_processes():
+    knl = lp.make_kernel(
+        "{ [i]: 0 <= i < n }",
+        """
+        out[i] = a[i+1]
+        """,
+        [lp.GlobalArg("a", np.float32, shape="n"), "..."])
+    knl = lp.set_options(knl, check_processes=2)
+
+    with pytest.raises(lp.LoopyError):
+        lp.get_one_scheduled_kernel(lp.preprocess_kernel(knl))
+
+    knl = lp.fix_parameters(knl.copy(args=[
+        arg.copy(shape=(17,)) if arg.name == "a" else arg
+        for arg in knl.args]), n=16)
+    lp.get_one_scheduled_kernel(lp.preprocess_kernel(knl))
+
+
+@pytest.mark.parametrize("check_level", ["none", "cheap", "full"])
+def test_check_levels(check_level):
+    from loopy.check import collect_check_reports
+
+    knl = lp.make_kernel(
+        "{ [i]: 0 <= i < n }",
+        """
+        out[i] = a[i+1]
+        """,
+        [lp.GlobalArg("a", np.float32, shape="n"), "..."],
+        target=lp.CTarget())
+    knl = lp.set_options(knl, check_level=check_level)
+
+    with collect_check_reports() as reports:
+        if check_level == "full":
+            with pytest.raises(lp.LoopyError):
+                lp.generate_code_v2(knl)
+            return
+
+        lp.generate_code_v2(knl)
+
+    assert [report.stage for report in reports] == [
+            "pre_schedule", "pre_codegen", "post_codegen"]
+
+    for report in reports:
+        assert report.check_level == check_level
+        assert "check_bounds" not in [name for name, _ in report.check_times]
+        if check_level == "none":
+            assert not report.check_times
+
+    assert "check_bounds" in reports[0].skipped_checks
+
+
+@pytest.mark.parametrize("verification", ["off", "sampled", "full"])
+def test_codegen_verification(verification):
+    from loopy.check import collect_check_reports, sample_insn_ids
+
+    knl = lp.make_kernel(
+        "{ [i]: 0 <= i < n }",
+        ["out%d[i] = %d*a[i]" % (k, k) for k in range(8)],
+        [lp.GlobalArg("a", np.float32, shape="n"), "..."],
+        target=lp.CTarget())
+    knl = lp.set_options(knl, check_level="cheap",
+            codegen_verification=verification,
+            codegen_verification_sample_size=3)
+
+    with lp.CacheMode(False):
+        with collect_check_reports() as reports:
+            lp.generate_code_v2(knl)
+
+    report, = [report for report in reports if report.stage == "post_codegen"]
+    if verification == "off":
+        assert report.skipped_checks == ["check_implemented_domains"]
+    else:
+        assert [name for name, _ in report.check_times] == [
+                "check_implemented_domains"]
+
+    insn_ids = [insn.id for insn in knl.instructions]
+    sample = sample_insn_ids(insn_ids, 3)
+    assert len(sample) == 3
+    assert sample <= frozenset(insn_ids)
+    assert sample_insn_ids(reversed(insn_ids), 3) == sample
+
+
+def test_domain_queries_shared_across_copies():
+    knl = lp.make_kernel(
+        "{ [i, j]: 0 <= i < n and 0 <= j <= i }",
+        """
+        out[i, j] = 1
+        """,
+        "...")
+
+    inames = frozenset(["i", "j"])
+    domain = knl.get_inames_domain(inames)
+    bounds = knl.get_iname_bounds("j")
+
+    knl_copy = knl.copy(args=knl.args[:])
+    assert knl_copy.get_inames_domain(inames) is domain
+    assert knl_copy.get_iname_bounds("j") is bounds
+
+    # new assumptions must not reuse the bounds
+    knl_assume = lp.assume(knl, "n >= 5")
+    assert knl_assume.get_inames_domain(inames) is domain
+    assert knl_assume.get_iname_bounds("j") is not bounds
+
+
 def test_unscheduled_insn_detection():
     knl = lp.make_kernel(
         "{ [i]: 0 <= i < 10 }",
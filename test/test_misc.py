@@ -24,6 +24,7 @@ THE SOFTWARE.
 
 import six  # noqa
 import pytest
+import numpy as np
 from six.moves import range
 
 import sys
@@ -79,6 +80,60 @@ def test_compute_sccs():
             verify_sccs(graph, compute_sccs(graph))
 
 
+def test_PersistentSet():
+    from loopy.tools import PersistentSet
+    import random
+
+    rng = random.Random(0)
+
+    versions = [(PersistentSet(), frozenset())]
+    for i in range(2000):
+        pset, ref = versions[rng.randrange(len(versions))]
+
+        # Check the version against its reference contents, which forces
+        # changes to be undone/redone across the version tree.
+        assert set(pset) == ref
+        assert len(pset) == len(ref)
+
+        item = rng.randrange(20)
+        assert (item in pset) == (item in ref)
+
+        if rng.randint(0, 1):
+            versions.append((pset.with_item(item), ref | frozenset([item])))
+        else:
+            versions.append((pset.without_item(item), ref - frozenset([item])))
+
+    pset, ref = versions[-1]
+    assert frozenset([1, 2]) - pset == frozenset([1, 2]) - ref
+    assert (ref <= pset) and (pset <= ref)
+
+
+def test_schedule_deep_kernel():
+    import loopy as lp
+
+    # a chain of dependent instructions, longer than the recursion limit
+    ninsns = 2000
+    insns = ["<> t = 0 {id=insn0}"] + [
+            "t = t + 1 {id=insn%d, dep=insn%d}" % (i, i-1)
+            for i in range(1, ninsns)]
+    knl = lp.make_kernel("{:}", insns, target=lp.CTarget())
+
+    orig_recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(1000)
+    try:
+        # not from the cache
+        with lp.CacheMode(False):
+            knl = lp.get_one_scheduled_kernel(lp.preprocess_kernel(knl))
+        assert sys.getrecursionlimit() == 1000
+    finally:
+        sys.setrecursionlimit(orig_recursion_limit)
+
+    from loopy.schedule import RunInstruction
+    assert [sched_item.insn_id for sched_item in knl.schedule
+            if isinstance(sched_item, RunInstruction)] == [
+                    "insn%d" % i for i in range(ninsns)]
+
+
 def test_SetTrie():
     from loopy.kernel.tools import SetTrie
 
@@ -287,6 +342,361 @@ def test_LazilyUnpicklingListWithEqAndPersistentHashing():
     # }}}
 
 
+def test_memory_cache_tier():
+    import loopy as lp
+    from loopy.preprocess import preprocess_kernel
+
+    def make_knl(i):
+        return lp.make_kernel(
+                "{[i]: 0<=i<n}",
+                "out[i] = %d*a[i]" % i,
+                [lp.GlobalArg("a,out", np.float32, shape=("n",)), "..."])
+
+    orig_max_entries = lp.caching._MEMORY_TIER.max_entries
+
+    try:
+        with lp.CacheMode(True):
+            lp.set_memory_cache_params(max_entries=16)
+            lp.reset_cache_stats()
+
+            knl = make_knl(0)
+            preprocess_kernel(knl)
+            stats = lp.get_cache_stats()["preprocess"]
+            assert stats.memory_hits == 0
+            assert stats.persistent_hits + stats.misses == 1
+
+            # an equal (but not identical) kernel hits the in-memory tier
+            preprocess_kernel(make_knl(0))
+            stats = lp.get_cache_stats()["preprocess"]
+            assert stats.memory_hits == 1
+
+            lp.set_memory_cache_params(max_entries=1)
+            preprocess_kernel(make_knl(1))
+            preprocess_kernel(make_knl(2))
+            assert lp.get_cache_stats()["preprocess"].evictions >= 1
+
+            lp.set_memory_cache_params(max_entries=0)
+            preprocess_kernel(make_knl(0))
+            assert lp.get_cache_stats()["preprocess"].memory_hits == 1
+
+            with pytest.raises(ValueError):
+                lp.set_memory_cache_params(eviction_policy="random")
+
+    finally:
+        lp.set_memory_cache_params(max_entries=orig_max_entries)
+
+
+def test_isl_operation_cache():
+    import islpy as isl
+    import loopy as lp
+    from loopy.diagnostic import StaticValueFindingError
+    from loopy.isl_helpers import isl_operation_cache, static_value_of_pw_aff
+    from loopy.kernel.tools import SetOperationCacheManager
+
+    orig_max_entries = isl_operation_cache.max_entries
+    isl_operation_cache.clear()
+    lp.reset_cache_stats()
+
+    try:
+        # equal sets created independently share results
+        upper_bounds = [
+                SetOperationCacheManager().dim_max(
+                    isl.BasicSet("[n] -> {[i]: 0<=i<n}"), 0)
+                for _ in range(2)]
+        assert upper_bounds[0] is upper_bounds[1]
+
+        stats = lp.get_cache_stats()["isl_operations"]
+        assert stats.misses == 1
+        assert stats.memory_hits == 1
+
+        # failures are remembered
+        for _ in range(2):
+            with pytest.raises(StaticValueFindingError):
+                static_value_of_pw_aff(upper_bounds[0], constants_only=True)
+        assert lp.get_cache_stats()["isl_operations"].memory_hits == 2
+
+        isl_operation_cache.set_max_entries(0)
+        assert lp.get_cache_stats()["isl_operations"].evictions == 2
+        assert not isl_operation_cache.entries
+
+    finally:
+        isl_operation_cache.set_max_entries(orig_max_entries)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+        reason="needs module-level __getattr__")
+def test_lazy_import():
+    from subprocess import check_output
+    modules = set(check_output([sys.executable, "-c",
+        "import sys, loopy; print(' '.join(sys.modules))"]).decode().split())
+
+    for module_name in ["pyopencl", "loopy.codegen", "loopy.statistics",
+            "loopy.auto_test", "loopy.frontend.fortran",
+            "loopy.transform.precompute"]:
+        assert module_name not in modules
+
+    import loopy as lp
+    assert lp.split_iname is lp.transform.iname.split_iname
+    assert "split_iname" in dir(lp)
+
+    with pytest.raises(AttributeError):
+        lp.no_such_attribute
+
+    # Importing a submodule binds its name in the package, which would then
+    # shadow a lazily exported name equal to it.
+    import pkgutil
+    submodule_names = set(
+            name for _, name, _ in pkgutil.iter_modules(lp.__path__))
+    assert not submodule_names & set(lp._LAZY_NAME_TO_MODULE)
+
+    from loopy.tuning import AutoTuneResult  # noqa: F401
+    assert lp.auto_tune is lp.tuning.auto_tune
+
+
+def test_compact_schedule_cache_entries():
+    import loopy as lp
+    from loopy.schedule import (schedule_cache, _ScheduleCacheEntry,
+            _get_kernel_from_schedule_cache_entry)
+
+    knl = lp.make_kernel(
+            "{[i]: 0<=i<n}",
+            "out[i] = 3*a[i]",
+            [lp.GlobalArg("a,out", np.float32, shape=("n",)), "..."])
+
+    with lp.CacheMode(True):
+        knl = lp.preprocess_kernel(knl)
+        sched_knl = lp.get_one_scheduled_kernel(knl)
+
+        entry = schedule_cache[knl]
+        assert isinstance(entry, _ScheduleCacheEntry)
+        assert _get_kernel_from_schedule_cache_entry(knl, entry) == sched_knl
+
+        assert lp.get_one_scheduled_kernel(knl) == sched_knl
+
+
+def test_device_program_cache():
+    import loopy as lp
+    from uuid import uuid4
+    from loopy.codegen import device_program_cache
+
+    # The OpenCL target generates code only for the first device program.
+    pytest.importorskip("pyopencl")
+
+    # unique, so that code generation of the whole kernels is never cached
+    name = "device_program_cache_%s" % uuid4().hex
+
+    def generate_code(factor):
+        knl = lp.make_kernel(
+                "{[i,j]: 0<=i,j<n}",
+                """
+                a[i] = %d*b[i] {id=first}
+                ... gbarrier {id=barrier, dep=first}
+                c[j] = 2*a[j] {dep=barrier}
+                """ % factor,
+                [lp.GlobalArg("a,b,c", np.float32, shape=("n",)), "..."],
+                target=lp.PyOpenCLTarget(), name=name)
+        knl = lp.tag_inames(knl, {"i": "g.0", "j": "g.0"})
+        return lp.generate_code_v2(knl)
+
+    with lp.CacheMode(True):
+        code3 = generate_code(3)
+
+        hits_before = device_program_cache.get_stats().memory_hits
+        code5 = generate_code(5)
+        assert device_program_cache.get_stats().memory_hits == hits_before + 1
+
+    assert len(code5.device_programs) == 2
+    dp3_codes = [str(dp.ast) for dp in code3.device_programs]
+    dp5_codes = [str(dp.ast) for dp in code5.device_programs]
+    assert dp3_codes[0] != dp5_codes[0]
+    assert dp3_codes[1] == dp5_codes[1]
+
+    with lp.CacheMode(False):
+        assert generate_code(5).device_code() == code5.device_code()
+
+
+@pytest.mark.parametrize("store_cls", ["DirectoryStore", "SQLiteStore"])
+def test_persistent_store(tmpdir, store_cls):
+    import loopy as lp
+    from loopy.caching import DirectoryStore, SQLiteStore, parse_cache_size
+    from loopy.preprocess import preprocess_kernel
+
+    if store_cls == "DirectoryStore":
+        store = DirectoryStore(str(tmpdir))
+    else:
+        store = SQLiteStore(str(tmpdir.join("cache.sqlite")))
+
+    for i in range(10):
+        store.store_if_not_present("ns%d" % (i % 2), "%040x" % i, b"x" * 100)
+    store.store_if_not_present("ns0", "%040x" % 0, b"y" * 100)
+
+    assert store.fetch("ns0", "%040x" % 0) == b"x" * 100
+    with pytest.raises(KeyError):
+        store.fetch("ns0", "%040x" % 1)
+
+    assert store.get_usage() == {"ns0": (5, 500), "ns1": (5, 500)}
+
+    assert store.prune(600) == 4
+    assert sum(size for _, size in store.get_usage().values()) == 600
+
+    # exceeding max_size on store triggers pruning
+    store.max_size = 500
+    store.store_if_not_present("ns2", "%040x" % 10, b"z" * 100)
+    assert sum(size for _, size in store.get_usage().values()) <= 500
+
+    store.clear("ns0")
+    assert "ns0" not in store.get_usage()
+    store.clear()
+    assert store.get_usage() == {}
+
+    assert parse_cache_size("1.5K") == 1536
+    assert parse_cache_size("0") is None
+
+    # loopy's caches go through the store
+    orig_store = lp.get_persistent_store()
+    store.max_size = None
+    lp.set_persistent_store(store)
+    try:
+        with lp.CacheMode(True):
+            knl = lp.make_kernel(
+                    "{[i]: 0<=i<n}",
+                    "out[i] = 2*a[i]",
+                    [lp.GlobalArg("a,out", np.float32, shape=("n",)), "..."],
+                    name="persistent_store_%s" % store_cls)
+            preprocess_kernel(knl)
+
+        from loopy.preprocess import preprocess_cache
+        assert preprocess_cache.identifier in store.get_usage()
+
+    finally:
+        lp.set_persistent_store(orig_store)
+
+
+@pytest.mark.parametrize("store_cls", ["DirectoryStore", "SQLiteStore"])
+def test_tiered_cache_key_check(tmpdir, store_cls):
+    import loopy as lp
+    from loopy.caching import DirectoryStore, SQLiteStore, TieredCache
+
+    if store_cls == "DirectoryStore":
+        store = DirectoryStore(str(tmpdir))
+    else:
+        store = SQLiteStore(str(tmpdir.join("cache.sqlite")))
+
+    # every key has the same hash
+    def key_builder(key):
+        return "%040x" % 0
+
+    identifier = "key-check-%s" % store_cls
+
+    def make_cache(suffix):
+        # Caches of different names do not share their in-memory entries.
+        return TieredCache("key_check_%s_%s" % (store_cls, suffix),
+                identifier, key_builder)
+
+    orig_store = lp.get_persistent_store()
+    lp.set_persistent_store(store)
+    try:
+        make_cache("writer").store_if_not_present("a", 1)
+
+        reader = make_cache("reader")
+        assert reader["a"] == 1
+
+        reader = make_cache("colliding_reader")
+        with pytest.raises(KeyError):
+            reader["b"]
+        assert reader.get_stats().misses == 1
+
+        # truncated entries are misses
+        data = store.fetch(identifier, key_builder("a"))
+        store.clear()
+        store.store_if_not_present(
+                identifier, key_builder("a"), data[:len(data)//2])
+
+        reader = make_cache("truncated_reader")
+        with pytest.raises(KeyError):
+            reader["a"]
+
+    finally:
+        lp.set_persistent_store(orig_store)
+
+
+def test_default_store_location(tmpdir, monkeypatch):
+    import os
+    from loopy.caching import _make_default_store, DirectoryStore
+
+    monkeypatch.setenv("LOOPY_CACHE_DIR", str(tmpdir))
+    monkeypatch.setenv("LOOPY_CACHE_BACKEND", "directory")
+
+    store = _make_default_store()
+    assert isinstance(store, DirectoryStore)
+
+    # build products in other subdirectories are not taken for namespaces
+    from loopy.target.ispc_execution import ISPCCompiler
+    build_dir = ISPCCompiler().cache_dir
+    os.makedirs(os.path.join(build_dir, "0123"))
+    assert os.path.dirname(build_dir) == str(tmpdir)
+
+    store.store_if_not_present("ns", "%040x" % 0, b"x")
+    assert list(store.get_usage()) == ["ns"]
+
+    store.clear()
+    assert os.path.isdir(os.path.join(build_dir, "0123"))
+
+
+def test_cli_batch(tmpdir):
+    import json
+    from loopy.cli import batch_main
+
+    for name, factor in [("twice", 2), ("thrice", 3)]:
+        tmpdir.join("%s.py" % name).write(
+                "lp_knl = lp.make_kernel('{[i]: 0<=i<n}', 'out[i] = %d*a[i]', "
+                "[lp.GlobalArg('a,out', np.float32, shape=('n',)), '...'], "
+                "name='%s')\n" % (factor, name))
+
+    manifest = tmpdir.join("manifest.json")
+    manifest.write(json.dumps(
+        ["twice.py", {"input": "thrice.py", "target": "c"}]))
+
+    out_dir = tmpdir.join("out")
+    report_file = tmpdir.join("report.json")
+    argv = ["--manifest", str(manifest), "--output-dir", str(out_dir),
+            "--report", str(report_file), "--jobs", "2"]
+
+    batch_main(argv)
+    report = json.loads(report_file.read())
+    assert [result["status"] for result in report["files"]] == [
+            "generated", "generated"]
+    assert out_dir.join("twice.cl").check()
+    assert out_dir.join("thrice.c").check()
+
+    # unchanged inputs are skipped
+    batch_main(argv)
+    report = json.loads(report_file.read())
+    assert [result["status"] for result in report["files"]] == [
+            "skipped", "skipped"]
+
+
+def test_cli_input_file_named_like_subcommand(tmpdir, monkeypatch):
+    import loopy as lp
+    from loopy.cli import main, get_subcommand_main, batch_main
+
+    monkeypatch.chdir(str(tmpdir))
+    assert get_subcommand_main(["batch", "--force"]) is batch_main
+
+    tmpdir.join("batch").write(
+            "lp_knl = lp.make_kernel('{[i]: 0<=i<n}', 'out[i] = 2*a[i]', "
+            "[lp.GlobalArg('a,out', np.float32, shape=('n',)), '...'], "
+            "name='twice')\n")
+    assert get_subcommand_main(["batch", "--force"]) is None
+
+    monkeypatch.setattr(sys, "argv", [
+        "loopy", "batch", "twice.c", "--lang", "loopy", "--target", "c"])
+    # main() sets the default target
+    monkeypatch.setattr(lp, "_DEFAULT_TARGET", lp._DEFAULT_TARGET)
+    main()
+    assert "twice" in tmpdir.join("twice.c").read()
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])
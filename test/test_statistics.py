@@ -24,6 +24,7 @@ THE SOFTWARE.
 
 import six
 import sys
+import pytest
 from pyopencl.tools import (  # noqa
         pytest_generate_tests_for_pyopencl
         as pytest_generate_tests)
@@ -1164,6 +1165,47 @@ def test_strided_footprint():
     assert 2*num < denom
 
 
+def test_compiled_count_maps():
+    knl = lp.make_kernel(
+            "[n,m] -> {[i,j]: 0<=i<n and 0<=j<=i and j<m}",
+            [
+                """
+                c[i, j] = a[i, j]*b[i, j]/3.0 + a[i, j]
+                e[i] = g[i]*h[i]
+                """
+            ],
+            name="compiled_counts", assumptions="n,m >= 1")
+    knl = lp.add_and_infer_dtypes(knl,
+                    dict(a=np.float32, b=np.float32, g=np.float64, h=np.float64))
+    knl = lp.split_iname(knl, "i", 16, outer_tag="g.0", inner_tag="l.0")
+
+    op_map = lp.get_op_map(knl, count_redundant_work=True)
+    mem_map = lp.get_mem_access_map(knl, count_redundant_work=True,
+                                    subgroup_size=32)
+    sync_map = lp.get_synchronization_map(knl)
+
+    n = np.array([1, 5, 16, 17, 100, 1000])
+    m = np.array([[1], [7], [2000]])
+
+    for count_map in [op_map, mem_map, sync_map]:
+        compiled_map = count_map.compile()
+
+        total = compiled_map.eval_and_sum({"n": n, "m": m})
+        counts = compiled_map.eval({"n": n, "m": m})
+        assert total.shape == (len(m), len(n))
+
+        for i_m in range(len(m)):
+            for i_n in range(len(n)):
+                params = {"n": int(n[i_n]), "m": int(m[i_m, 0])}
+                assert total[i_m, i_n] == count_map.eval_and_sum(params)
+                for key, val in count_map.items():
+                    assert counts[key][i_m, i_n] == (
+                            lp.ToCountMap({key: val}).eval_and_sum(params))
+
+    with pytest.raises(ValueError):
+        op_map.compile().eval_and_sum({"n": n, "m": 0})
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])
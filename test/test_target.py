@@ -269,6 +269,47 @@ def test_numba_target():
     print(lp.generate_code_v2(knl).device_code())
 
 
+@pytest.mark.parametrize("parallel", [False, True])
+def test_numba_execution(parallel):
+    pytest.importorskip("numba")
+
+    knl = lp.make_kernel(
+        "{[i,j,k]: 0<=i,j<M and 0<=k<N}",
+        "D[i,j] = sqrt(sum(k, (X[i, k]-X[j, k])**2))",
+        target=lp.NumbaTarget(parallel=parallel))
+
+    knl = lp.add_and_infer_dtypes(knl, {"X": np.float64})
+    knl = lp.split_iname(knl, "i", 4, outer_tag="g.0")
+
+    x = np.random.rand(30, 3)
+    _, (d,) = knl(X=x)
+
+    d_ref = np.sqrt(((x[:, np.newaxis, :] - x[np.newaxis, :, :])**2).sum(axis=-1))
+    assert np.allclose(d, d_ref)
+
+    # the compiled kernel is reused
+    _, (d,) = knl(X=x)
+    assert np.allclose(d, d_ref)
+
+
+def test_numba_source_outside_store(tmpdir, monkeypatch):
+    from loopy.caching import _make_default_store
+    from loopy.target.numba_execution import _get_source_file
+
+    monkeypatch.setenv("LOOPY_CACHE_DIR", str(tmpdir))
+    monkeypatch.setenv("LOOPY_CACHE_BACKEND", "directory")
+
+    fname = _get_source_file("x = 1\n")
+    assert fname.startswith(str(tmpdir))
+
+    store = _make_default_store()
+    assert store.get_usage() == {}
+
+    store.clear()
+    with open(fname) as source_file:
+        assert source_file.read() == "x = 1\n"
+
+
 def test_numba_cuda_target():
     knl = lp.make_kernel(
         "{[i,j,k]: 0<=i,j<M and 0<=k<N}",